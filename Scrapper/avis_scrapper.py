@@ -1,164 +1,205 @@
-import asyncio
+import re
 from datetime import datetime
-from playwright.async_api import async_playwright
+from base_scrapper import baseScrapper
+from fleet_capture import FleetResponseCapture
+from location_catalog import match_location, normalize
 
-PICKUP_LOCATION = "Athens Airport"
-DROPOFF_LOCATION = "Athens Airport"
+AVIS_URL = "https://www.avis.gr/"
 
-PICKUP_DATE = datetime.strptime("15-04-2026", '%d-%m-%Y')
-DROPOFF_DATE = datetime.strptime("20-04-2026", '%d-%m-%Y')
-PICKUP_TIME = "12:00"
-DROPOFF_TIME = "10:00"
+# Autocomplete entries of the location fields (the same for pick-up and drop-off, only the open list is visible)
+SUGGESTION_SELECTOR = "button.booking-widget__results__link"
 
-GREEK_MONTHS = {
-    "ΙΑΝΟΥΑΡΙΟΣ": "January", "ΦΕΒΡΟΥΑΡΙΟΣ": "February", "ΜΑΡΤΙΟΣ": "March",
-    "ΑΠΡΙΛΙΟΣ": "April", "ΜΑΪΟΣ": "May", "ΙΟΥΝΙΟΣ": "June",
-    "ΙΟΥΛΙΟΣ": "July", "ΑΥΓΟΥΣΤΟΣ": "August", "ΣΕΠΤΕΜΒΡΙΟΣ": "September",
-    "ΟΚΤΩΒΡΙΟΣ": "October", "ΝΟΕΜΒΡΙΟΣ": "November", "ΔΕΚΕΜΒΡΙΟΣ": "December"
+# True once the autocomplete shows visible suggestions other than the given ones
+SUGGESTIONS_CHANGED_JS = """
+([selector, previous]) => {
+    const items = Array.from(document.querySelectorAll(selector))
+        .filter(el => el.getClientRects().length > 0).map(el => el.textContent.trim());
+    return items.length > 0 && items.join('|') !== previous;
 }
+"""
 
-async def select_date(page, button_selector, target_date):
-    # Remove overlay if present (adjust selector to your case)
-    await page.evaluate("""
-        const overlay = document.querySelector('#map-flyout-container');
-        if (overlay) overlay.remove();
-    """)
-
-    # Open the calendar widget
-    await page.click(button_selector, timeout=10000)
-
-    # Wait until at least one calendar is visible
-    calendar_tables = await page.query_selector_all("section.calendar-flyout-container .ui-datepicker-calendar")
-    for _ in range(20):  # retry up to ~5 seconds
-        visible_found = False
-        for cal in calendar_tables:
-            if await cal.is_visible():
-                visible_found = True
-                break
-        if visible_found:
-            break
-        await page.wait_for_timeout(250)
-    else:
-        raise Exception("No visible calendar found after opening date picker.")
-
-    # Now loop through calendar months to find and click the target date
-    for attempt in range(36):  # try up to 3 years ahead/back
-        await page.wait_for_timeout(500)  # wait for calendar animation/settle
-
-        month_elements = await page.query_selector_all(".calendar-flyout-container .ui-datepicker-month")
-        year_elements = await page.query_selector_all(".calendar-flyout-container .ui-datepicker-year")
-
-        months_years = []
-        for m_el, y_el in zip(month_elements, year_elements):
-            month_text = (await m_el.text_content()).strip().upper()
-            year_text = (await y_el.text_content()).strip()
-            english_month = GREEK_MONTHS.get(month_text)
-            if not english_month:
-                raise Exception(f"Unknown Greek month: {month_text}")
-            dt = datetime.strptime(f"{english_month} {year_text}", "%B %Y")
-            months_years.append(dt)
-
-        print("Reach Point 1")
-
-        matched_index = None
-        for i, dt in enumerate(months_years):
-            if dt.year == target_date.year and dt.month == target_date.month:
-                matched_index = i
-                break
-
-        if matched_index is not None:
-            day_xpath = (
-                f"(//section[contains(@class,'calendar-flyout-container')]"
-                f"//table[contains(@class,'ui-datepicker-calendar')])[{matched_index + 1}]"
-                f"//a[text()='{target_date.day}']"
-            )
-            await page.wait_for_selector(day_xpath, timeout=5000)
-            await page.click(day_xpath)
-            return  # Date selected successfully!
-
-        print("Reach Point 2")
-
-        # Navigate calendar forward or backward as needed
-        if months_years[-1] < target_date:
-            await page.click(".ui-datepicker-next")
-        elif months_years[0] > target_date:
-            await page.click(".ui-datepicker-prev")
-        else:
-            raise Exception("Target month/year is between displayed months but day not found.")
-
-    raise Exception("Desired month/year not found in calendar.")
-
-async def select_time(page, button_selector, hour_id, minute_id, confirm_button_selector, target_time):
-    await page.click(button_selector)
-    await page.wait_for_selector(hour_id, timeout=5000)
-
-    hour, minute = target_time.split(":")
-    await page.select_option(hour_id, hour.zfill(2))
-    await page.select_option(minute_id, minute.zfill(2))
-
-    await page.click(confirm_button_selector)
-    await page.wait_for_timeout(500)
-
-async def main():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto("https://www.avis.gr/rent-a-car", timeout=60000)
-
-        # Accept cookies
+SUGGESTIONS_JS = """
+selector => Array.from(document.querySelectorAll(selector))
+    .filter(el => el.getClientRects().length > 0).map(el => el.textContent.trim()).join('|')
+"""
+
+INPUT_VALUE_IS_JS = """
+([selector, value]) => {
+    const input = document.querySelector(selector);
+    return input !== null && input.value.trim() === value;
+}
+"""
+
+# Pulls every vehicle card of the results page in one evaluate call
+VEHICLE_EXTRACTION_JS = """
+cards => cards.map(card => {
+    const text = selector => {
+        const el = card.querySelector(selector);
+        return el ? el.textContent.trim() : 'N/A';
+    };
+    const image = card.querySelector('img');
+    return {
+        name: text('.vehicle__specs .vehicle__header .vehicle__header__inner'),
+        image_url: image ? image.getAttribute('data-small') || 'N/A' : 'N/A',
+        price_pay_collection: text('div.vehicle__prices-option[data-payment-type="pay_collection"] p.vehicle__prices-price'),
+        price_pay_online: text('div.vehicle__prices-option.vehicle__prices-option--primary[data-payment-type="pay_online"] p.vehicle__prices-price'),
+        details: Array.from(card.querySelectorAll('ul.vehicle__footer__features li.vehicle__footer__features__item'))
+            .map(li => li.textContent),
+    };
+})
+"""
+
+class avisScrapper(baseScrapper):
+    company = "Avis"
+
+    def steps(self):
+        # (step name, step) in flow order
+        return [
+            ("Open page", self.open_page),
+            ("Accept cookies", self.accept_cookies),
+            ("Close welcome popup", self.close_welcome_popup),
+            ("Select pickup/dropoff", self.select_pickup_and_dropoff_location),
+            ("Select pickup datetime", self.select_pickup_datetime),
+            ("Select dropoff datetime", self.select_dropoff_datetime),
+            ("Search for results", self.search_for_results),
+            ("Scrape results", self.scrape_results),
+        ]
+
+    async def open_page(self, page):
+        async with self.recorder.time("navigation", "Open page", "Avis", traffic=self.timeout_handler.traffic):
+            await page.goto(self.url, wait_until="domcontentloaded")
+        print(f"Opened {self.url}")
+
+    async def dismiss(self, page, selector: str, banner: str, label: str, timeout: int = 7000):
+        # Click a banner away once, skipped when the saved session already did
+        if self.sessions is not None and self.sessions.has_consent("Avis", banner):
+            print(f"{label} dismissed in saved session, skipping...")
+            return
         try:
-            await page.click("#consent_prompt_accept", timeout=10000)
-            print("✅ Cookies accepted.")
-        except:
-            pass
-
-        # Pickup location
-        await page.fill("#hire-search", "")
-        for c in PICKUP_LOCATION:
-            await page.type("#hire-search", c, delay=100)
-        await asyncio.sleep(1.5)
-        await page.keyboard.press("Enter")
-        print("✅ Pickup location.")
-
-        # Dropoff location
-        await page.fill("#return-search", "")
-        for c in DROPOFF_LOCATION:
-            await page.type("#return-search", c, delay=100)
-        await asyncio.sleep(1.5)
-        await page.keyboard.press("Enter")
-        print("✅ Dropoff location.")
-
-        # Pickup date
-        await select_date(page, "#pick-up-date-button", PICKUP_DATE)
-        print(f"✅ Pickup date: {PICKUP_DATE.strftime('%d/%m/%Y')}")
-
-        # Pickup time
-        await select_time(
-            page,
-            "#pick-up-time-button",
-            "#time-from-hours",
-            "#time-from-minutes",
-            "#select-pickUpTime",
-            PICKUP_TIME
-        )
-        print("✅ Pickup time selected.")
-
-        # Dropoff date
-        await select_date(page, "#drop-off-date-button", DROPOFF_DATE)
-        print(f"✅ Dropoff date: {DROPOFF_DATE.strftime('%d/%m/%Y')}")
-
-        # Dropoff time
-        await select_time(
-            page,
-            "#return-time-button",
-            "#time-to-hours",
-            "#time-to-minutes",
-            "#select-returnTime",
-            DROPOFF_TIME
+            await page.wait_for_selector(selector, timeout=timeout)
+            await page.click(selector)
+            print(f"Dismissed {label}")
+            if self.sessions is not None:
+                self.sessions.record_consent("Avis", banner)
+        except Exception:
+            print(f"No {label} found, skipping...")
+
+    async def accept_cookies(self, page):
+        await self.dismiss(page, "#consent_prompt_accept", "cookies", "cookies banner")
+
+    async def close_welcome_popup(self, page):
+        await self.dismiss(page, "#welcome-close", "welcome", "'Θέλω Κράτηση' popup")
+
+    async def select_pickup_and_dropoff_location(self, page):
+        await self.select_location(page, "#hire-search", self.pickup_location, "pickup", "pickup")
+
+        if self.different_drop_off:
+            await self.select_location(page, "#return-search", self.dropoff_location, "dropoff", "drop-off")
+
+    async def select_location(self, page, input_selector, wanted, kind, label):
+        if wanted and self.catalog is not None:
+            wanted = self.catalog.resolve("Avis", self.country, self.city, wanted, kind) or wanted
+        query = wanted or self.city
+
+        # One fill fires a single input event, so the widget makes one autocomplete request
+        await page.wait_for_selector(input_selector)
+        previous = await page.evaluate(SUGGESTIONS_JS, SUGGESTION_SELECTOR)
+        await page.fill(input_selector, query)
+        await page.press(input_selector, "End")
+        await page.wait_for_function(SUGGESTIONS_CHANGED_JS, arg=[SUGGESTION_SELECTOR, previous], timeout=10000)
+
+        suggestions = page.locator(f"{SUGGESTION_SELECTOR}:visible")
+        options = [option.strip() for option in await suggestions.all_text_contents()]
+        chosen = await self.choose_location(options, wanted, kind, label)
+
+        exact_text = re.compile(rf"^\s*{re.escape(chosen)}\s*$")
+        await suggestions.filter(has_text=exact_text).first.click()
+        print(f"Selected {label} location: {chosen}")
+
+    async def choose_location(self, options, wanted, kind, label):
+        names = {normalize(option): option for option in options}
+
+        # Resolve the requested location without user input
+        if wanted:
+            chosen = match_location(wanted, names)
+            if chosen is None:
+                raise ValueError(f"Unknown {label} location '{wanted}'. Options: {options}")
+            return chosen
+
+        return await self.ask_location(options, kind, label)
+
+    async def select_pickup_datetime(self, page):
+        await self.select_date(page, "#date-from-display", self.pickup_datetime)
+        await self.select_time(page, "#time-from-display", self.pickup_datetime)
+        print("Pick-up date/time set")
+
+    async def select_dropoff_datetime(self, page):
+        await self.select_date(page, "#date-to-display", self.dropoff_datetime)
+        await self.select_time(page, "#time-to-display", self.dropoff_datetime)
+        print("Drop-off date/time set")
+
+    async def select_date(self, page, date_selector, target: datetime):
+        # Pikaday: pick year and month from its selects, then click the day
+        await page.click(date_selector)
+        await page.wait_for_selector(".pika-single:visible", timeout=5000)
+
+        await page.select_option(".pika-single:visible .pika-select-year", str(target.year))
+        await page.select_option(".pika-single:visible .pika-select-month", str(target.month - 1))
+
+        day_selector = (
+            f'.pika-single:visible button.pika-button.pika-day[data-pika-year="{target.year}"]'
+            f'[data-pika-month="{target.month - 1}"][data-pika-day="{target.day}"]'
         )
-        print("✅ Dropoff time selected.")
-
-        await asyncio.sleep(10)
-        await browser.close()
-
-asyncio.run(main())
\ No newline at end of file
+        await page.click(day_selector, timeout=5000)
+        await page.wait_for_function(INPUT_VALUE_IS_JS, arg=[date_selector, target.strftime("%d/%m/%Y")],
+                                     timeout=5000)
+        print(f"Selected date {target:%d/%m/%Y}")
+
+    async def select_time(self, page, time_selector, target: datetime):
+        # jquery-timepicker: click the exact entry of the visible list
+        time_text = target.strftime("%H:%M")
+        await page.wait_for_selector(time_selector, state="visible", timeout=7000)
+        await page.click(time_selector)
+
+        options = page.locator(".ui-timepicker-list:visible li")
+        await options.first.wait_for(timeout=5000)
+        option = options.filter(has_text=re.compile(rf"^\s*{re.escape(time_text)}\s*$")).first
+        if await option.count() == 0:
+            raise ValueError(f"Time option '{time_text}' not found in dropdown")
+        await option.scroll_into_view_if_needed()
+        await option.click()
+        await page.wait_for_function(INPUT_VALUE_IS_JS, arg=[time_selector, time_text], timeout=5000)
+        print(f"Selected time: {time_text}")
+
+    async def search_for_results(self, page):
+        # Listen for the vehicle payloads before they are requested
+        if self.capture_responses:
+            if self.capture is not None:
+                self.capture.detach(page)
+            self.capture = FleetResponseCapture()
+            self.capture.attach(page)
+
+        # Submit through the visible "ΒΡΕΙΤΕ ΑΥΤΟΚΙΝΗΤΟ" button, which navigates to the results
+        button = page.locator("div.standard-form__actions button[type='submit']:visible",
+                              has_text="ΒΡΕΙΤΕ ΑΥΤΟΚΙΝΗΤΟ").first
+        await button.scroll_into_view_if_needed()
+        async with page.expect_navigation():
+            await button.click()
+        print("Clicked 'Find a Car' button")
+
+    async def iter_cars(self, page):
+        # Prefer the vehicle JSON the results page fetched, the DOM walk is the fallback
+        if self.capture is not None and await self.capture.wait(timeout=5):
+            cars = self.capture.vehicles()
+            if cars:
+                print(f"Scraped {len(cars)} cars from vehicle responses")
+                for car in cars:
+                    yield car
+                return
+            print("No vehicles in captured responses, falling back to the results page")
+
+        await page.wait_for_selector(".vehicle__inner", timeout=20000)
+        async with self.recorder.time("extraction", "Vehicle cards", "Avis"):
+            cars = await page.locator(".vehicle__inner").evaluate_all(VEHICLE_EXTRACTION_JS)
+        for car in cars:
+            yield car
@@ -0,0 +1,217 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from browser_pool import BrowserPool
+from har_archive import HarArchive
+from location_catalog import LocationCatalog
+from metrics import MetricsRecorder, PageTraffic, default_recorder
+from network_filter import NetworkFilter
+from quote_cache import QuoteCache, search_key
+from session_store import SessionStore
+from timeout import SITE_ERRORS, Timeout
+
+# Steps after which the page holds a state worth resuming from
+CHECKPOINT_STEPS = {"Select dropoff datetime"}
+
+class baseScrapper(ABC):
+    # Search flow shared by the site scrapers, which set company and define steps() and iter_cars()
+    company = None
+
+    def __init__(self, url: str, country: str, city: str, pickup_datetime: datetime,
+                 dropoff_datetime: datetime, duration: int = 0, different_drop_off: bool = False,
+                 max_restarts: int = 2, pool: BrowserPool = None, capture_responses: bool = False,
+                 cache: QuoteCache = None, pickup_location: str = None, dropoff_location: str = None,
+                 catalog: LocationCatalog = None, recorder: MetricsRecorder = None, sink=None,
+                 sessions: SessionStore = None, har: HarArchive = None):
+        self.url = url
+        self.country = country
+        self.city = city
+        self.pickup_datetime = pickup_datetime
+        self.duration = duration
+        self.dropoff_datetime = dropoff_datetime
+        self.different_drop_off = different_drop_off
+        self.pool = pool
+        self.max_restarts = max_restarts
+        self.capture_responses = capture_responses
+        self.capture = None
+        self.cache = cache
+        self.pickup_location = pickup_location
+        self.dropoff_location = dropoff_location
+        self.catalog = catalog
+        self.sink = sink  # NdjsonSink / CsvSink the scraped cars are appended to
+        self.sink_keys = set()  # Cars of the current run already written to the sink
+        # Saved cookies/consent, shared with the pool the pages come from
+        self.sessions = sessions if sessions is not None or pool is None else pool.sessions
+        self.har = har  # Records the session to, or replays it from, a HAR archive
+
+        # Timeout Handler
+        self.recorder = recorder or default_recorder
+        # A replay gets a breaker of its own, broken recordings say nothing about the live site
+        breakers = {} if har is not None and har.mode == "replay" else None
+        self.timeout_handler = Timeout(site=self.company, recorder=self.recorder, breakers=breakers)
+
+    async def start(self):
+        # Serve identical searches from the quote cache before launching anything
+        if self.cache is not None and self.cache_key() is not None:
+            return await self.cache.get_or_fetch(self.cache_key(), self.scrape)
+        return await self.scrape()
+
+    def search_key(self) -> str:
+        return search_key(self.company, self.country, self.city, self.pickup_datetime, self.dropoff_datetime,
+                          self.pickup_location, self.dropoff_location if self.different_drop_off else None)
+
+    def cache_key(self) -> str:
+        # None while a location is still to be picked interactively, any pick would share the key
+        if not self.pickup_location or (self.different_drop_off and not self.dropoff_location):
+            return None
+        return self.search_key()
+
+    def own_pool(self) -> BrowserPool:
+        # The shared pool, or a single-browser pool owned by this run
+        return self.pool or BrowserPool(size=1, network_filter=NetworkFilter(), sessions=self.sessions)
+
+    async def scrape(self):
+        pool = self.own_pool()
+        try:
+            async with self.session(pool) as page:
+                results = await self.run(page)
+
+                # Optionally keep the browser open to inspect the results
+                if self.duration > 0:
+                    await asyncio.sleep(self.duration)
+        finally:
+            if self.pool is None:
+                await pool.stop()
+            print(f"Closed {self.url}")
+        return results
+
+    @abstractmethod
+    def steps(self):
+        # (step name, step) in flow order
+        ...
+
+    async def run(self, page):
+        result = await self.run_steps(page, self.steps())
+
+        # Scrape Data and Print
+        for car in result:
+            print(car)
+        return result
+
+    async def run_steps(self, page, steps):
+        # One traffic counter per page, quote_dropoffs runs the steps on the same page once per dropoff
+        traffic = self.timeout_handler.traffic
+        if traffic is None or traffic.page is not page:
+            if traffic is not None:
+                traffic.detach()
+            self.timeout_handler.traffic = PageTraffic(page)
+        # A new run (e.g. the next dropoff) writes its cars again
+        self.sink_keys = set()
+
+        # Index of the step to resume from after a failure (the form is filled
+        # once the dropoff datetime is selected, so a failed search resumes there)
+        checkpoint = 0
+        restarts = 0
+        while True:
+            try:
+                result = None
+                for index in range(checkpoint, len(steps)):
+                    step_name, step = steps[index]
+                    result = await self.timeout_handler.retry_step(step_name, step, page)
+                    if step_name in CHECKPOINT_STEPS:
+                        checkpoint = index + 1
+                return result
+            except SITE_ERRORS as e:
+                if restarts >= self.max_restarts:
+                    raise
+                restarts += 1
+                print(f"Restarting from '{steps[checkpoint][0]}' after: {e} (restart {restarts}/{self.max_restarts})")
+
+    async def stream(self):
+        # Run the search and yield every vehicle as soon as it is parsed
+        pool = self.own_pool()
+        try:
+            async with self.session(pool) as page:
+                steps = [step for step in self.steps() if step[0] != "Scrape results"]
+                await self.run_steps(page, steps)
+                async for car in self.iter_results(page):
+                    yield car
+        finally:
+            if self.sink is not None:
+                self.sink.flush()
+            if self.pool is None:
+                await pool.stop()
+            print(f"Closed {self.url}")
+
+    @asynccontextmanager
+    async def session(self, pool):
+        # A page of the pool, recorded to or replayed from the HAR archive when one is set
+        if self.har is None:
+            async with pool.page(self.company) as page:
+                yield page
+            return
+
+        key = self.search_key()
+        options = self.har.context_options(self.company, key)
+        try:
+            async with pool.page(self.company, **options) as page:
+                await self.har.prepare(page.context, self.company, key, options.get("record_har_path"))
+                yield page
+        finally:
+            # The HAR is written once the context closes, filed under the search as it was run
+            if options.get("record_har_path"):
+                self.har.finish(self.company, self.search_key(), self.har_search(), options["record_har_path"])
+
+    def har_search(self) -> dict:
+        # Constructor arguments that rebuild this search on replay
+        return {
+            "url": self.url,
+            "country": self.country,
+            "city": self.city,
+            "pickup_datetime": self.pickup_datetime.isoformat(),
+            "dropoff_datetime": self.dropoff_datetime.isoformat(),
+            "different_drop_off": self.different_drop_off,
+            "pickup_location": self.pickup_location,
+            "dropoff_location": self.dropoff_location,
+        }
+
+    async def ask_location(self, options, kind, label):
+        # Interactive fallback, without blocking the event loop
+        print(f"Please choose a {label} location:")
+        for i, opt in enumerate(options, 1):
+            print(f"{i}: {opt}")
+
+        while True:
+            choice = (await asyncio.to_thread(input, f"Enter number (1-{len(options)}): ")).strip()
+            if choice.isdigit() and 1 <= int(choice) <= len(options):
+                chosen = options[int(choice) - 1]
+                print(f"You chose {label} location: {chosen}")
+                # Kept for restarts, the cache and HAR keys, and the recording's replay
+                setattr(self, f"{kind}_location", chosen)
+                return chosen
+            print("Invalid choice, try again.")
+
+    async def scrape_results(self, page):
+        cars = [car async for car in self.iter_results(page)]
+        if self.sink is not None:
+            self.sink.flush()
+        print(f"Scraped {len(cars)} cars")
+        return cars
+
+    async def iter_results(self, page):
+        # Yields every car once, writing it through to the sink if any. A retried or restarted
+        # "Scrape results" yields the cars again, only the ones not written during this run reach the sink
+        async for car in self.iter_cars(page):
+            if self.sink is not None:
+                key = json.dumps(car, sort_keys=True, default=str)
+                if key not in self.sink_keys:
+                    self.sink_keys.add(key)
+                    self.sink.write(car)
+            yield car
+
+    @abstractmethod
+    async def iter_cars(self, page):
+        # Async generator of the cars of the results page, page by page
+        ...
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from avis_scrapper import avisScrapper
+from browser_pool import BrowserPool
+from herz_scrapper import hertzScrapper
+from metrics import MetricsRecorder
+from sys_msg import system_message
+
+REPLICAS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replicas")
+
+MAKES = ["Fiat", "Peugeot", "Toyota", "Opel", "Citroen", "Nissan", "Hyundai", "Kia", "VW", "Renault"]
+MODELS = ["Mini", "Compact", "Hatch", "Sedan", "Estate", "SUV", "Van", "Cabrio"]
+CATEGORIES = ["Mini", "Economy", "Compact", "Intermediate", "Standard", "Full size", "SUV", "Van"]
+AVIS_LOCATIONS = ["Athens Airport", "Athens Downtown", "Piraeus Port", "Thessaloniki Airport", "Heraklion Airport"]
+
+def fleet(size: int) -> list:
+    # Deterministic fleet shared by both replicas
+    vehicles = []
+    for i in range(size):
+        make = MAKES[i % len(MAKES)]
+        model = MODELS[(i // len(MAKES)) % len(MODELS)]
+        vehicles.append({
+            "name": f"{make} {model} {i // (len(MAKES) * len(MODELS)) + 1}",
+            "code": f"V{i:03d}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "passengers": 4 + i % 4,
+            "suitcases": 1 + i % 3,
+            "transmission": "Αυτόματο" if i % 2 else "Χειροκίνητο",
+            "price": {"amount": 30 + (i * 7) % 90 + 0.45, "currency": "EUR"},
+        })
+    return vehicles
+
+class ReplicaHandler(SimpleHTTPRequestHandler):
+    fleet_size = 40
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=REPLICAS_DIR, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, payload):
+        time.sleep(self.latency)
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ("/hertz", "/hertz/"):
+            self.path = "/hertz.html"
+        elif url.path in ("/avis", "/avis/"):
+            self.path = "/avis.html"
+        elif url.path == "/avis/results":
+            self.path = "/avis_results.html"
+        elif url.path == "/api/fleet":
+            return self.send_json({"vehicles": fleet(self.fleet_size)})
+        elif url.path == "/api/avis/locations":
+            query = parse_qs(url.query).get("q", [""])[0].lower()
+            return self.send_json([location for location in AVIS_LOCATIONS if query in location.lower()])
+        elif url.path == "/api/avis/vehicles":
+            vehicles = []
+            for vehicle in fleet(self.fleet_size):
+                amount = vehicle["price"]["amount"]
+                vehicles.append({
+                    "name": vehicle["name"],
+                    "code": vehicle["code"],
+                    "passengers": vehicle["passengers"],
+                    "suitcases": vehicle["suitcases"],
+                    "transmission": vehicle["transmission"],
+                    "price_pay_collection": f"{amount * 1.1:.2f}".replace(".", ","),
+                    "price_pay_online": f"{amount:.2f}".replace(".", ","),
+                })
+            return self.send_json({"vehicles": vehicles})
+        return super().do_GET()
+
+@contextlib.contextmanager
+def replica_server(fleet_size: int, latency: float):
+    handler = type("Handler", (ReplicaHandler,), {"fleet_size": fleet_size, "latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+class RssSampler:
+    # Peak resident memory of this process and every descendant (browsers included)
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.peak_mb = max(self.peak_mb, tree_rss_mb(os.getpid()))
+            self.stopped.wait(self.interval)
+
+def tree_rss_mb(root_pid: int) -> float:
+    children = {}
+    rss = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as status:
+                fields = dict(line.split(":", 1) for line in status if ":" in line)
+        except OSError:
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields["PPid"]), []).append(pid)
+        rss[pid] = int(fields.get("VmRSS", "0 kB").split()[0])
+
+    total_kb = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total_kb += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_kb / 1024
+
+def search_dates():
+    # A pickup a few months out, so calendar navigation is part of the flow
+    pickup = (datetime.now() + timedelta(days=75)).replace(hour=10, minute=30, second=0, microsecond=0)
+    return pickup, pickup + timedelta(days=7, hours=1, minutes=15)
+
+async def run_hertz(base_url: str, pool: BrowserPool, recorder: MetricsRecorder):
+    pickup, dropoff = search_dates()
+    scraper = hertzScrapper(f"{base_url}/hertz/", "Greece", "Athens", pickup, dropoff, different_drop_off=True,
+                            pool=pool, pickup_location="Athens Airport", dropoff_location="Piraeus Port",
+                            recorder=recorder)
+    return await scraper.start()
+
+async def run_avis(base_url: str, pool: BrowserPool, recorder: MetricsRecorder):
+    pickup, dropoff = search_dates()
+    scraper = avisScrapper(f"{base_url}/avis/", "Greece", "Athens", pickup, dropoff.replace(hour=10, minute=0),
+                           different_drop_off=True, pool=pool, pickup_location="Athens Airport",
+                           dropoff_location="Piraeus Port", recorder=recorder)
+    return await scraper.start()
+
+FLOWS = {"Hertz": run_hertz, "Avis": run_avis}
+
+async def benchmark(companies: list, concurrency_levels: list, searches: int, fleet_size: int,
+                    latency: float, verbose: bool) -> dict:
+    report = {"fleet_size": fleet_size, "latency_ms": latency * 1000, "companies": {}}
+    with replica_server(fleet_size, latency) as base_url:
+        for company in companies:
+            flow = FLOWS[company]
+            company_report = {"levels": []}
+            for concurrency in concurrency_levels:
+                recorder = MetricsRecorder()
+                total = max(searches, concurrency)
+                quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                with RssSampler() as sampler, quiet:
+                    async with BrowserPool(size=concurrency, headless=True) as pool:
+                        # Warm the pool so browser launches are not part of the measurement
+                        await asyncio.gather(*(pool_warmup(pool) for _ in range(concurrency)))
+
+                        semaphore = asyncio.Semaphore(concurrency)
+
+                        async def one_search():
+                            async with semaphore:
+                                started = time.perf_counter()
+                                results = await flow(base_url, pool, recorder)
+                                return time.perf_counter() - started, len(results or [])
+
+                        started = time.perf_counter()
+                        runs = await asyncio.gather(*(one_search() for _ in range(total)))
+                        wall = time.perf_counter() - started
+
+                latencies = [elapsed for elapsed, _ in runs]
+                level = {
+                    "concurrency": concurrency,
+                    "searches": total,
+                    "vehicles": runs[0][1],
+                    "wall_s": wall,
+                    "throughput_per_min": total / wall * 60,
+                    "latency_mean_s": statistics.mean(latencies),
+                    "latency_p50_s": statistics.median(latencies),
+                    "latency_max_s": max(latencies),
+                    "peak_rss_mb": sampler.peak_mb,
+                    "steps": step_summary(recorder),
+                }
+                company_report["levels"].append(level)
+                print_level(company, level)
+            report["companies"][company] = company_report
+    return report
+
+async def pool_warmup(pool: BrowserPool):
+    async with pool.page():
+        pass
+
+def step_summary(recorder: MetricsRecorder) -> dict:
+    # Mean seconds per step / navigation / extraction across the level's searches
+    durations = {}
+    for event in recorder.events:
+        durations.setdefault(f"{event.kind}:{event.name}", []).append(event.duration)
+    return {name: statistics.mean(values) for name, values in sorted(durations.items())}
+
+def print_level(company: str, level: dict):
+    print(f"{system_message('S')} {company} x{level['concurrency']}: {level['searches']} searches, "
+          f"{level['vehicles']} vehicles each, {level['throughput_per_min']:.1f}/min, "
+          f"latency p50 {level['latency_p50_s']:.2f}s max {level['latency_max_s']:.2f}s, "
+          f"peak RSS {level['peak_rss_mb']:.0f} MB")
+    for name, seconds in level["steps"].items():
+        print(f"    {name:<40} {seconds * 1000:8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against local replicas of the booking flows")
+    parser.add_argument("--companies", nargs="+", default=list(FLOWS), choices=list(FLOWS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--searches", type=int, default=4, help="Searches per concurrency level")
+    parser.add_argument("--fleet-size", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay added to every replica API response")
+    parser.add_argument("--json", default=None, help="Write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the scrapers' own output")
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args.companies, args.concurrency, args.searches, args.fleet_size,
+                                   args.latency_ms / 1000, args.verbose))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import asyncio
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from network_filter import NetworkFilter
+from session_store import SessionStore
+from sys_msg import system_message
+
+class PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+
+class BrowserPool:
+    def __init__(self, size: int = 1, browser_type: str = "chromium", headless: bool = False,
+                 max_uses: int = 50, max_memory_mb: int = 1024, network_filter: NetworkFilter = None,
+                 sessions: SessionStore = None, controller=None):
+        self.size = size
+        self.browser_type = browser_type
+        self.headless = headless
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.network_filter = network_filter
+        self.sessions = sessions
+        self.controller = controller  # ConcurrencyController watching HTTP statuses
+        self.playwright = None
+        self.idle = None
+        self.browsers = []
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def start(self):
+        async with self.lock:
+            if self.playwright is not None:
+                return
+            self.playwright = await async_playwright().start()
+            self.idle = asyncio.Queue()
+            # Browsers are launched lazily, the first time their slot is handed out
+            for _ in range(self.size):
+                pooled = PooledBrowser(None)
+                self.browsers.append(pooled)
+                self.idle.put_nowait(pooled)
+
+    async def stop(self):
+        async with self.lock:
+            if self.playwright is None:
+                return
+            for pooled in self.browsers:
+                if pooled.browser is None:
+                    continue
+                try:
+                    await pooled.browser.close()
+                except Exception:
+                    pass
+            self.browsers = []
+            await self.playwright.stop()
+            self.playwright = None
+            print(f"{system_message('I')} Browser pool stopped")
+            if self.network_filter is not None:
+                self.network_filter.report()
+
+    async def _launch(self):
+        if self.browser_type == "chromium":
+            browser_launcher = self.playwright.chromium
+        elif self.browser_type == "firefox":
+            browser_launcher = self.playwright.firefox
+        elif self.browser_type == "webkit":
+            browser_launcher = self.playwright.webkit
+        else:
+            raise ValueError(f"Unknown browser type: {self.browser_type}")
+
+        print(f"Launching browser: {self.browser_type}")
+        return await browser_launcher.launch(headless=self.headless)
+
+    async def memory_mb(self, browser):
+        # Resident memory of every process of a Chromium browser, None if unknown
+        if self.browser_type != "chromium":
+            return None
+        try:
+            session = await browser.new_browser_cdp_session()
+            info = await session.send("SystemInfo.getProcessInfo")
+            await session.detach()
+        except Exception:
+            return None
+
+        total_kb = 0
+        for process in info.get("processInfo", []):
+            try:
+                with open(f"/proc/{process['id']}/status") as status:
+                    for line in status:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+            except (OSError, ValueError):
+                continue
+        return total_kb / 1024
+
+    async def is_healthy(self, pooled: PooledBrowser) -> bool:
+        if not pooled.browser.is_connected():
+            return False
+        if pooled.uses >= self.max_uses:
+            return False
+        memory = await self.memory_mb(pooled.browser)
+        if memory is not None and memory > self.max_memory_mb:
+            print(f"{system_message('I')} Browser uses {memory:.0f} MB (limit {self.max_memory_mb} MB)")
+            return False
+        return True
+
+    async def _recycle(self, pooled: PooledBrowser):
+        print(f"{system_message('I')} Recycling browser after {pooled.uses} uses")
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+        pooled.browser = await self._launch()
+        pooled.uses = 0
+
+    @asynccontextmanager
+    async def context(self, company: str = None, **context_options):
+        # Hand out an isolated BrowserContext on one of the pooled browsers
+        await self.start()
+        pooled = await self.idle.get()
+        context = None
+        try:
+            if pooled.browser is None:
+                pooled.browser = await self._launch()
+            elif not await self.is_healthy(pooled):
+                await self._recycle(pooled)
+            # Start from the company's saved cookies and localStorage when there are any
+            if self.sessions is not None and company and "storage_state" not in context_options:
+                state = self.sessions.load(company)
+                if state is not None:
+                    context_options = {**context_options, "storage_state": state}
+            context = await pooled.browser.new_context(**context_options)
+            pooled.uses += 1
+            if self.network_filter is not None:
+                await self.network_filter.attach(context, company)
+            if self.controller is not None:
+                self.controller.attach(context, company)
+            yield context
+
+            # The run went through, keep its session for the next contexts
+            if self.sessions is not None and company and self.sessions.needs_save(company):
+                try:
+                    await self.sessions.save(context, company)
+                except Exception as e:
+                    print(f"{system_message('E')} Could not save {company} session: {e}")
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            self.idle.put_nowait(pooled)
+
+    @asynccontextmanager
+    async def page(self, company: str = None, **context_options):
+        async with self.context(company, **context_options) as context:
+            yield await context.new_page()
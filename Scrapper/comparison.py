@@ -0,0 +1,296 @@
+from datetime import datetime
+import numpy as np
+from location_catalog import normalize
+
+# Common classes every company's categories are mapped onto
+CLASSES = ["unknown", "mini", "economy", "compact", "intermediate", "standard", "fullsize",
+           "premium", "luxury", "suv", "van", "convertible", "electric"]
+
+# Hertz .b-vehicle__groups labels (English and Greek) and ACRISS first letters
+CATEGORY_CLASSES = {
+    "mini": "mini", "μίνι": "mini", "m": "mini",
+    "economy": "economy", "οικονομικό": "economy", "e": "economy",
+    "compact": "compact", "compact elite": "compact", "μικρό": "compact", "c": "compact",
+    "intermediate": "intermediate", "μεσαίο": "intermediate", "i": "intermediate",
+    "standard": "standard", "s": "standard",
+    "full size": "fullsize", "fullsize": "fullsize", "μεγάλο": "fullsize", "f": "fullsize",
+    "premium": "premium", "p": "premium",
+    "luxury": "luxury", "πολυτελές": "luxury", "l": "luxury",
+    "suv": "suv", "jeep": "suv", "4x4": "suv",
+    "van": "van", "minivan": "van", "mini van": "van", "people carrier": "van", "9 seater": "van",
+    "7 seater": "van", "βαν": "van", "επταθέσιο": "van",
+    "convertible": "convertible", "cabrio": "convertible", "καμπριολέ": "convertible",
+    "electric": "electric", "ηλεκτρικό": "electric",
+}
+
+# Model keywords for names without a usable category (the Avis cards)
+MODEL_CLASSES = {
+    "panda": "mini", "500": "mini", "aygo": "mini", "i10": "mini", "picanto": "mini", "up": "mini",
+    "c1": "mini", "108": "mini", "twingo": "mini", "spark": "mini",
+    "yaris": "economy", "208": "economy", "clio": "economy", "polo": "economy", "corsa": "economy",
+    "i20": "economy", "rio": "economy", "ibiza": "economy", "micra": "economy", "fabia": "economy",
+    "c3": "economy", "sandero": "economy",
+    "golf": "compact", "308": "compact", "focus": "compact", "astra": "compact", "i30": "compact",
+    "ceed": "compact", "megane": "compact", "corolla": "compact", "leon": "compact", "octavia": "intermediate",
+    "passat": "standard", "508": "standard", "insignia": "standard", "superb": "fullsize",
+    "qashqai": "suv", "duster": "suv", "tucson": "suv", "sportage": "suv", "3008": "suv", "2008": "suv",
+    "captur": "suv", "t-roc": "suv", "tiguan": "suv", "kona": "suv", "juke": "suv", "c-hr": "suv",
+    "vito": "van", "transporter": "van", "traveller": "van", "caravelle": "van", "zafira": "van",
+    "tourneo": "van", "5008": "van", "sharan": "van",
+    "tesla": "electric", "zoe": "electric", "leaf": "electric", "e-208": "electric",
+}
+
+class CategoryIndex:
+    # Maps (vehicle name, site category) onto a common class code, memoized
+    def __init__(self, category_classes: dict = None, model_classes: dict = None):
+        self.category_classes = {normalize(k): v for k, v in (category_classes or CATEGORY_CLASSES).items()}
+        self.model_classes = {normalize(k): v for k, v in (model_classes or MODEL_CLASSES).items()}
+        self.codes = {name: code for code, name in enumerate(CLASSES)}
+        self.memo = {}
+
+    def classify(self, name: str, category: str) -> int:
+        key = (name, category)
+        if key not in self.memo:
+            self.memo[key] = self.codes[self._classify(name, category)]
+        return self.memo[key]
+
+    def _classify(self, name: str, category: str) -> str:
+        category = normalize(category)
+        if category in self.category_classes:
+            return self.category_classes[category]
+        for word in category.split():
+            if word in self.category_classes and len(word) > 1:
+                return self.category_classes[word]
+        for word in normalize(name).replace("/", " ").split():
+            if word in self.model_classes:
+                return self.model_classes[word]
+        return "unknown"
+
+class Vocabulary:
+    # String <-> integer code, shared by frames that are compared with each other
+    def __init__(self):
+        self.codes = {}
+        self.labels = []
+
+    def code(self, label) -> int:
+        if label not in self.codes:
+            self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return self.codes[label]
+
+    def decode(self, codes) -> list:
+        return [self.labels[code] for code in codes]
+
+def parse_search_key(key: str):
+    # company|country|city|pickup location|dropoff location|pickup|dropoff -> (location, pickup day, rental days)
+    parts = (key or "").split("|")
+    if len(parts) != 7:
+        return "", np.datetime64("NaT"), -1
+    pickup = datetime.strptime(parts[5], "%Y-%m-%dT%H:%M")
+    dropoff = datetime.strptime(parts[6], "%Y-%m-%dT%H:%M")
+    # A rental day is started every 24 hours, like the sites bill it
+    days = max(1, -(-int((dropoff - pickup).total_seconds()) // 86400))
+    location = "/".join(part for part in parts[1:4] if part)
+    return location, np.datetime64(pickup.date(), "D"), days
+
+class QuoteFrame:
+    def __init__(self, columns: dict, vocabulary: Vocabulary, index: CategoryIndex):
+        self.columns = columns
+        self.vocabulary = vocabulary
+        self.index = index
+
+    def __len__(self):
+        return len(self.columns["price_cents"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def from_quotes(cls, quotes, vocabulary: Vocabulary = None, index: CategoryIndex = None) -> "QuoteFrame":
+        vocabulary = vocabulary or Vocabulary()
+        index = index or CategoryIndex()
+        keys = {}
+        company, name, klass, location, payment, price, pickup, days = [], [], [], [], [], [], [], []
+        for quote in quotes:
+            if quote.search_key not in keys:
+                key_location, key_pickup, key_days = parse_search_key(quote.search_key)
+                keys[quote.search_key] = (vocabulary.code(key_location), key_pickup, key_days)
+            key_location, key_pickup, key_days = keys[quote.search_key]
+            company.append(vocabulary.code(quote.company))
+            name.append(vocabulary.code(quote.name))
+            klass.append(index.classify(quote.name, quote.category))
+            location.append(key_location)
+            payment.append(vocabulary.code(quote.payment_type or ""))
+            price.append(-1 if quote.price_cents is None else quote.price_cents)
+            pickup.append(key_pickup)
+            days.append(key_days)
+
+        columns = {
+            "company": np.array(company, dtype=np.int32),
+            "name": np.array(name, dtype=np.int32),
+            "class": np.array(klass, dtype=np.int16),
+            "location": np.array(location, dtype=np.int32),
+            "payment": np.array(payment, dtype=np.int32),
+            "price_cents": np.array(price, dtype=np.int64),
+            "pickup_date": np.array(pickup, dtype="datetime64[D]"),
+            "rental_days": np.array(days, dtype=np.int32),
+        }
+        return cls(columns, vocabulary, index)
+
+    @classmethod
+    def from_columns(cls, columns: dict, labels: dict = None, vocabulary: Vocabulary = None,
+                     index: CategoryIndex = None) -> "QuoteFrame":
+        # From quote_store.QuoteStore.scan() (decoded strings) or scan_codes() (codes plus their labels),
+        # every string is coded and classified once per distinct value instead of once per row
+        vocabulary = vocabulary or Vocabulary()
+        index = index or CategoryIndex()
+        labels = labels or {}
+
+        def distinct(name):
+            # (labels, row -> label id)
+            if name in labels:
+                return labels[name], np.asarray(columns[name])
+            values, inverse = np.unique(np.asarray(columns[name]).astype(str), return_inverse=True)
+            return values.tolist(), inverse.reshape(-1)
+
+        def encode(name):
+            values, ids = distinct(name)
+            return np.array([vocabulary.code(value) for value in values], dtype=np.int32)[ids]
+
+        names, name_ids = distinct("name")
+        categories, category_ids = distinct("category")
+        pairs, pair_ids = group_ids(name_ids, category_ids)
+        classes = np.array([index.classify(names[name], categories[category]) for name, category in pairs],
+                           dtype=np.int16)
+
+        # The store writes -1 for a pickup day it could not parse
+        pickup = np.asarray(columns["pickup_day"]).astype("datetime64[D]")
+        pickup[pickup.astype(np.int64) < 0] = np.datetime64("NaT")
+
+        frame_columns = {
+            "company": encode("company"),
+            "name": encode("name"),
+            "class": classes[pair_ids],
+            "location": encode("location"),
+            "payment": encode("payment_type"),
+            "price_cents": np.asarray(columns["price_cents"]).astype(np.int64),
+            "pickup_date": pickup,
+            "rental_days": np.asarray(columns["rental_days"]).astype(np.int32),
+        }
+        return cls(frame_columns, vocabulary, index)
+
+    def priced(self) -> "QuoteFrame":
+        # Only rows that carry a price
+        mask = self.columns["price_cents"] >= 0
+        return QuoteFrame({key: column[mask] for key, column in self.columns.items()}, self.vocabulary, self.index)
+
+    def class_labels(self, codes) -> list:
+        return [CLASSES[code] for code in codes]
+
+def group_ids(*columns):
+    # Dense group id per row for the combination of the given integer columns
+    columns = [np.asarray(column).astype(np.int64) for column in columns]
+    lows = [column.min() if len(column) else 0 for column in columns]
+    dims = [int(column.max() - low) + 1 if len(column) else 1 for column, low in zip(columns, lows)]
+    if np.prod(dims, dtype=np.float64) >= 2 ** 62:
+        stacked = np.stack(columns, axis=1)
+        keys, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        return keys, inverse.reshape(-1)
+    # Pack the columns into one int64 so a 1-D unique does the grouping
+    packed = np.ravel_multi_index([column - low for column, low in zip(columns, lows)], dims)
+    unique, inverse = np.unique(packed, return_inverse=True)
+    keys = np.stack(np.unravel_index(unique, dims), axis=1) + np.array(lows, dtype=np.int64)
+    return keys, inverse.reshape(-1)
+
+def argmin_per_group(groups, values, n_groups: int):
+    # Row index of the smallest value in every group
+    order = np.lexsort((values, groups))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[order][1:] != groups[order][:-1]
+    best = np.full(n_groups, -1, dtype=np.int64)
+    best[groups[order][first]] = order[first]
+    return best
+
+def cheapest_per_category(frame: QuoteFrame) -> list:
+    # Cheapest offer of every class across companies
+    frame = frame.priced()
+    if not len(frame):
+        return []
+    keys, groups = group_ids(frame["class"])
+    rows = argmin_per_group(groups, frame["price_cents"], len(keys))
+    vocabulary = frame.vocabulary
+    return [{
+        "class": CLASSES[frame["class"][row]],
+        "company": vocabulary.labels[frame["company"][row]],
+        "name": vocabulary.labels[frame["name"][row]],
+        "price_cents": int(frame["price_cents"][row]),
+        "pickup_date": str(frame["pickup_date"][row]),
+        "rental_days": int(frame["rental_days"][row]),
+    } for row in rows]
+
+def price_per_day(frame: QuoteFrame) -> list:
+    # Mean and minimum price per day for every class, company and rental length
+    frame = frame.priced()
+    if not len(frame):
+        return []
+    daily = frame["price_cents"] / np.maximum(frame["rental_days"], 1)
+    keys, groups = group_ids(frame["class"], frame["company"], frame["rental_days"])
+    counts = np.bincount(groups, minlength=len(keys))
+    means = np.bincount(groups, weights=daily, minlength=len(keys)) / counts
+    minimums = np.full(len(keys), np.inf)
+    np.minimum.at(minimums, groups, daily)
+    return [{
+        "class": CLASSES[klass],
+        "company": frame.vocabulary.labels[company],
+        "rental_days": int(days),
+        "quotes": int(count),
+        "mean_cents_per_day": float(mean),
+        "min_cents_per_day": float(minimum),
+    } for (klass, company, days), count, mean, minimum in zip(keys, counts, means, minimums)]
+
+def best_pickup_date(frame: QuoteFrame) -> list:
+    # Pickup date with the lowest price per day for every class, location and rental length in a sweep
+    frame = frame.priced()
+    if not len(frame):
+        return []
+    daily = frame["price_cents"] / np.maximum(frame["rental_days"], 1)
+    keys, groups = group_ids(frame["class"], frame["location"], frame["rental_days"])
+    rows = argmin_per_group(groups, daily, len(keys))
+    return [{
+        "class": CLASSES[klass],
+        "location": frame.vocabulary.labels[location],
+        "rental_days": int(days),
+        "pickup_date": str(frame["pickup_date"][row]),
+        "company": frame.vocabulary.labels[frame["company"][row]],
+        "cents_per_day": float(daily[row]),
+    } for (klass, location, days), row in zip(keys, rows)]
+
+def price_deltas(current: QuoteFrame, previous: QuoteFrame) -> dict:
+    # Price change of every current offer against the same offer in the previous run (frames
+    # must share a Vocabulary); delta is NaN for offers that are new in this run
+    if current.vocabulary is not previous.vocabulary:
+        raise ValueError("Frames must be built with the same Vocabulary to be compared")
+    current, previous = current.priced(), previous.priced()
+    key_columns = ("company", "name", "location", "payment", "pickup_date", "rental_days")
+
+    def key_arrays(frame):
+        return [frame[column].astype("int64") for column in key_columns]
+
+    combined = [np.concatenate(pair) for pair in zip(key_arrays(current), key_arrays(previous))]
+    keys, groups = group_ids(*combined)
+    current_groups, previous_groups = groups[:len(current)], groups[len(current):]
+
+    previous_price = np.full(len(keys), np.inf)
+    np.minimum.at(previous_price, previous_groups, previous["price_cents"].astype(np.float64))
+    previous_price[np.isinf(previous_price)] = np.nan
+
+    before = previous_price[current_groups]
+    return {
+        "company": current.vocabulary.decode(current["company"]),
+        "name": current.vocabulary.decode(current["name"]),
+        "pickup_date": current["pickup_date"],
+        "rental_days": current["rental_days"],
+        "price_cents": current["price_cents"],
+        "previous_cents": before,
+        "delta_cents": current["price_cents"] - before,
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from metrics import MetricsRecorder, TimingEvent, default_recorder
+from sys_msg import system_message
+
+# Statuses sites answer with when they throttle or block a client
+THROTTLE_STATUSES = {403, 429, 503}
+
+class AdaptiveLimiter:
+    # AIMD limit on in-flight searches for one site, plus a minimum spacing between search starts
+    def __init__(self, company: str, initial: float = 2, min_limit: int = 1, max_limit: int = 8,
+                 min_interval: float = 2.0, max_interval: float = 60.0, decrease: float = 0.5,
+                 latency_tolerance: float = 2.0, cooldown: float = 30.0):
+        self.company = company
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.base_interval = min_interval
+        self.interval = min_interval
+        self.max_interval = max_interval
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+
+        self.in_flight = 0
+        self.last_start = 0.0
+        self.last_decrease = 0.0
+        self.condition = asyncio.Condition()
+
+        # Smoothed step latency per step name, and the lowest it has been (the uncongested baseline)
+        self.latency = {}
+        self.baseline = {}
+
+    @property
+    def permits(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        async with self.condition:
+            while True:
+                await self.condition.wait_for(lambda: self.in_flight < self.permits)
+                delay = self.last_start + self.interval - time.monotonic()
+                if delay <= 0:
+                    break
+                # Another search may take the slot while this one sleeps, so check again
+                self.condition.release()
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    await self.condition.acquire()
+            self.in_flight += 1
+            self.last_start = time.monotonic()
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        # Additive increase: about one more permit per window of successful searches
+        self.limit = min(self.max_limit, self.limit + 1 / self.permits)
+        self.interval = max(self.base_interval, self.interval * 0.9)
+        self._wake()
+
+    def on_congestion(self, reason: str, throttled: bool = False):
+        # Multiplicative decrease, at most once per cooldown so one burst is not punished repeatedly
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        if throttled:
+            self.interval = min(self.max_interval, self.interval * 2)
+        print(f"{system_message('I')} {self.company}: {reason}, "
+              f"{self.permits} concurrent searches, {self.interval:.1f}s apart")
+
+    def observe_latency(self, name: str, duration: float):
+        smoothed = self.latency.get(name)
+        smoothed = duration if smoothed is None else 0.8 * smoothed + 0.2 * duration
+        self.latency[name] = smoothed
+        baseline = min(self.baseline.get(name, smoothed), smoothed)
+        self.baseline[name] = baseline
+        if baseline > 0 and smoothed > self.latency_tolerance * baseline:
+            self.on_congestion(f"'{name}' slowed to {smoothed:.1f}s (baseline {baseline:.1f}s)")
+
+    def _wake(self):
+        # Let waiters re-check a raised limit without blocking the caller
+        async def notify():
+            async with self.condition:
+                self.condition.notify_all()
+        try:
+            asyncio.get_running_loop().create_task(notify())
+        except RuntimeError:
+            pass
+
+    def stats(self) -> dict:
+        return {"permits": self.permits, "in_flight": self.in_flight, "interval": round(self.interval, 2)}
+
+class ConcurrencyController:
+    # Per-site AdaptiveLimiters fed by the step/search events of a recorder and HTTP statuses of the pages
+    def __init__(self, recorder: MetricsRecorder = None, **limiter_options):
+        self.limiter_options = limiter_options
+        self.limiters = {}
+        self.recorder = recorder or default_recorder
+        self.recorder.add_listener(self.on_event)
+
+    def close(self):
+        # Stop listening, the recorder is usually the process-wide default_recorder
+        self.recorder.remove_listener(self.on_event)
+
+    def limiter(self, company: str) -> AdaptiveLimiter:
+        if company not in self.limiters:
+            self.limiters[company] = AdaptiveLimiter(company, **self.limiter_options)
+        return self.limiters[company]
+
+    @asynccontextmanager
+    async def permit(self, company: str):
+        limiter = self.limiter(company)
+        await limiter.acquire()
+        try:
+            yield
+        finally:
+            await limiter.release()
+
+    def on_event(self, event: TimingEvent):
+        if not event.company:
+            return
+        limiter = self.limiter(event.company)
+        if event.outcome in ("timeout", "circuit_open"):
+            limiter.on_congestion(f"{event.kind} '{event.name}' {event.outcome}")
+        elif event.kind == "search" and event.outcome == "ok":
+            limiter.on_success()
+        elif event.kind in ("step", "navigation") and event.outcome == "ok":
+            limiter.observe_latency(event.name, event.duration)
+
+    def on_status(self, company: str, status: int, url: str = ""):
+        if status in THROTTLE_STATUSES:
+            self.limiter(company).on_congestion(f"HTTP {status} from {url}", throttled=True)
+
+    def attach(self, context, company: str):
+        # Watch the document/API responses of every page of the context (assets are not the site talking)
+        def on_response(response):
+            if response.request.resource_type in ("document", "xhr", "fetch"):
+                self.on_status(company, response.status, response.url)
+
+        if company:
+            context.on("response", on_response)
+
+    def stats(self) -> dict:
+        return {company: limiter.stats() for company, limiter in self.limiters.items()}
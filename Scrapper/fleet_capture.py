@@ -0,0 +1,158 @@
+import asyncio
+import re
+import time
+from sys_msg import system_message
+
+# Background requests that carry fleet / availability data
+DEFAULT_URL_PATTERN = r"fleet|availab|vehicle|rates|search"
+
+NAME_KEYS = ("vehicleName", "modelName", "name", "model", "title", "description")
+CATEGORY_KEYS = ("category", "categoryName", "group", "groupName", "vehicleGroup", "carGroup", "acriss", "sipp")
+PASSENGER_KEYS = ("passengers", "passengerQuantity", "maxPassengers", "seats")
+SUITCASE_KEYS = ("suitcases", "baggageQuantity", "luggage", "baggage", "bags")
+PRICE_KEYS = ("totalPrice", "estimatedTotalAmount", "price", "total", "amount", "rate")
+CURRENCY_KEYS = ("currency", "currencyCode")
+
+def first_value(item: dict, keys):
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return None
+
+def as_text(value):
+    # Nested {"name": ...} / {"code": ...} objects are common for categories
+    if isinstance(value, dict):
+        value = first_value(value, ("name", "description", "code", "value"))
+    return None if value is None else str(value).strip()
+
+def as_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.search(r"\d+", str(value)) if value is not None else None
+    return int(match.group()) if match else None
+
+def looks_like_vehicle(item) -> bool:
+    if not isinstance(item, dict):
+        return False
+    if first_value(item, NAME_KEYS) is None:
+        return False
+    return first_value(item, CATEGORY_KEYS + PRICE_KEYS + PASSENGER_KEYS) is not None
+
+def parse_vehicle(item: dict) -> dict:
+    name = as_text(first_value(item, NAME_KEYS)) or "Unknown"
+    name = name.replace("or similar", "").strip() or "Unknown"
+    passengers = as_int(first_value(item, PASSENGER_KEYS))
+    suitcases = as_int(first_value(item, SUITCASE_KEYS))
+
+    vehicle = {
+        "name": name,
+        "category": as_text(first_value(item, CATEGORY_KEYS)) or "Unknown",
+        "passengers": passengers if passengers is not None else "Unknown",
+        "suitcases": suitcases if suitcases is not None else "Unknown",
+    }
+
+    price = first_value(item, PRICE_KEYS)
+    currency = first_value(item, CURRENCY_KEYS)
+    if isinstance(price, dict):
+        currency = currency or first_value(price, CURRENCY_KEYS)
+        price = first_value(price, ("amount", "value", "total"))
+    if price is not None:
+        vehicle["price"] = price
+        vehicle["currency"] = currency
+    return vehicle
+
+def find_vehicles(payload) -> list:
+    # Walk a JSON payload and parse every list of vehicle-like objects in it
+    vehicles = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            if node and all(looks_like_vehicle(item) for item in node):
+                vehicles.extend(parse_vehicle(item) for item in node)
+            else:
+                stack.extend(reversed(node))
+    return vehicles
+
+class FleetResponseCapture:
+    def __init__(self, url_pattern: str = DEFAULT_URL_PATTERN):
+        self.url_pattern = re.compile(url_pattern, re.IGNORECASE)
+        self.payloads = []
+        self.received = asyncio.Event()
+        # Matching requests not answered yet and responses still being parsed
+        self.pending = set()
+        self.parsing = 0
+        self.last_activity = 0.0
+
+    def attach(self, page):
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_request_done)
+        page.on("requestfailed", self._on_request_done)
+        page.on("response", self._on_response)
+
+    def detach(self, page):
+        page.remove_listener("request", self._on_request)
+        page.remove_listener("requestfinished", self._on_request_done)
+        page.remove_listener("requestfailed", self._on_request_done)
+        page.remove_listener("response", self._on_response)
+
+    def matches(self, request) -> bool:
+        return request.resource_type in ("xhr", "fetch") and self.url_pattern.search(request.url) is not None
+
+    def _on_request(self, request):
+        if self.matches(request):
+            self.pending.add(request)
+            self.last_activity = time.monotonic()
+
+    def _on_request_done(self, request):
+        if request in self.pending:
+            self.pending.discard(request)
+            self.last_activity = time.monotonic()
+
+    async def _on_response(self, response):
+        if not self.matches(response.request):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        self.parsing += 1
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        finally:
+            self.parsing -= 1
+            self.last_activity = time.monotonic()
+        if find_vehicles(payload):
+            self.payloads.append(payload)
+            self.received.set()
+
+    async def wait(self, timeout: float = 20, settle: float = 1.0) -> bool:
+        # First fleet payload, then until no fleet request has been open for settle seconds,
+        # fleets split over several responses (pages, vehicle groups) arrive in full
+        deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self.received.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        while time.monotonic() < deadline:
+            if not self.pending and not self.parsing and time.monotonic() - self.last_activity >= settle:
+                break
+            await asyncio.sleep(0.1)
+        return True
+
+    def vehicles(self) -> list:
+        vehicles = []
+        seen_names = set()
+        for payload in self.payloads:
+            for vehicle in find_vehicles(payload):
+                if vehicle["name"] in seen_names:
+                    continue
+                seen_names.add(vehicle["name"])
+                vehicles.append(vehicle)
+        print(f"{system_message('I')} Parsed {len(vehicles)} vehicles from {len(self.payloads)} captured responses")
+        return vehicles
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime
+from browser_pool import BrowserPool
+from sys_msg import system_message
+
+class HarArchive:
+    # Records scraper sessions to HAR files (mode "record") or serves them back offline (mode "replay")
+    def __init__(self, directory: str = "recordings", mode: str = "record", path: str = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown HAR mode: {mode}. Expected 'record' or 'replay'.")
+        self.directory = directory
+        self.mode = mode
+        self.path = path  # Replay exactly this recording instead of the latest one of the search
+
+    def stem(self, company: str, key: str) -> str:
+        # Readable and unique per search: <directory>/<company>/<search>-<hash>
+        slug = re.sub(r"[^a-z0-9]+", "-", key.lower()).strip("-")[:120]
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.directory, company.lower(), f"{slug}-{digest}")
+
+    def recordings(self, company: str, key: str) -> list:
+        return sorted(glob.glob(f"{glob.escape(self.stem(company, key))}-*.har"))
+
+    def context_options(self, company: str, key: str) -> dict:
+        # new_context() options, recording writes the HAR when the context closes
+        options = {"service_workers": "block"}  # Service workers would bypass both recording and routing
+        if self.mode == "record":
+            path = f"{self.stem(company, key)}-{datetime.now():%Y%m%dT%H%M%S}.har"
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            options.update(record_har_path=path, record_har_content="embed", record_har_mode="full")
+        return options
+
+    async def prepare(self, context, company: str, key: str, record_path: str = None):
+        if self.mode == "record":
+            print(f"{system_message('I')} Recording {company} session to {record_path}")
+            return
+
+        path = self.path
+        if path is None:
+            recordings = self.recordings(company, key)
+            if not recordings:
+                raise FileNotFoundError(f"No HAR recording of {key} in {self.directory}")
+            path = recordings[-1]
+        # Anything the recording does not hold is aborted, the network is never used
+        await context.route_from_har(path, not_found="abort")
+        print(f"{system_message('I')} Replaying {company} session from {path}")
+
+    def finish(self, company: str, key: str, search: dict, record_path: str) -> str:
+        # After the context closed: move the HAR under the final key (locations picked on the page change it)
+        # and write the sidecar with the search, so a replay can rebuild the scraper without asking
+        if not os.path.exists(record_path):
+            return None
+        path = f"{self.stem(company, key)}-{record_path.rsplit('-', 1)[1]}"
+        if path != record_path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(record_path, path)
+        with open(f"{path[:-len('.har')]}.json", "w", encoding="utf-8") as meta_file:
+            json.dump({"company": company, "key": key, "recorded_at": time.time(), "search": search},
+                      meta_file, ensure_ascii=False, indent=1, default=str)
+        print(f"{system_message('I')} Recorded {company} session to {path}")
+        return path
+
+def scraper_for(meta: dict, archive: HarArchive, pool: BrowserPool):
+    # Rebuild the recorded scraper (imported here, the scrapers themselves depend on this module)
+    from avis_scrapper import avisScrapper
+    from herz_scrapper import hertzScrapper
+
+    scrapers = {"Hertz": hertzScrapper, "Avis": avisScrapper}
+    search = dict(meta["search"])
+    search["pickup_datetime"] = datetime.fromisoformat(search["pickup_datetime"])
+    search["dropoff_datetime"] = datetime.fromisoformat(search["dropoff_datetime"])
+    return scrapers[meta["company"]](pool=pool, har=archive, **search)
+
+async def replay_directory(directory: str, output_path: str, companies: list = None, concurrency: int = 2,
+                           headless: bool = True) -> dict:
+    # Re-run every recording with the current extraction code, one JSON line per recording
+    paths = sorted(glob.glob(os.path.join(directory, "**", "*.har"), recursive=True))
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with BrowserPool(size=concurrency, headless=headless) as pool:
+        async def replay(path, output):
+            try:
+                with open(f"{path[:-len('.har')]}.json", encoding="utf-8") as meta_file:
+                    meta = json.load(meta_file)
+            except (OSError, ValueError):
+                print(f"{system_message('U')} No search metadata next to {path}, skipping...")
+                counts["skipped"] += 1
+                return
+            if companies and meta["company"] not in companies:
+                counts["skipped"] += 1
+                return
+
+            record = {"har": path, "company": meta["company"], "key": meta["key"], "status": "ok", "error": None}
+            started = time.perf_counter()
+            async with semaphore:
+                try:
+                    scraper = scraper_for(meta, HarArchive(directory, mode="replay", path=path), pool)
+                    record["results"] = await scraper.scrape()
+                except Exception as e:
+                    record["status"] = "error"
+                    record["error"] = str(e)
+                    record["results"] = []
+            record["elapsed"] = time.perf_counter() - started
+            counts[record["status"]] += 1
+            output.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            output.flush()
+
+        with open(output_path, "w", encoding="utf-8") as output:
+            await asyncio.gather(*(replay(path, output) for path in paths))
+
+    print(f"{system_message('S')} Replayed {len(paths)} recordings: {counts}")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded scraper sessions offline")
+    parser.add_argument("directory", nargs="?", default="recordings")
+    parser.add_argument("--output", default="replayed.jsonl")
+    parser.add_argument("--companies", nargs="+", default=None)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    args = parser.parse_args()
+    asyncio.run(replay_directory(args.directory, args.output, args.companies, args.concurrency, not args.headed))
+
+if __name__ == "__main__":
+    main()
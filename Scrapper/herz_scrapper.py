@@ -1,82 +1,169 @@
-import asyncio
 import re
 from datetime import datetime
-from playwright.async_api import async_playwright
-from timeout import Timeout
-
-class hertzScrapper:
-    def __init__(self, url: str, country: str, city: str, pickup_datetime: datetime,
-                 dropoff_datetime: datetime, duration: int = 5, browser_type: str = "chromium",
-                 different_drop_off: bool = False, max_restarts: int = 2):
-        self.url = url
-        self.country = country
-        self.city = city
-        self.pickup_datetime = pickup_datetime
-        self.duration = duration
-        self.dropoff_datetime = dropoff_datetime
-        self.browser_type = browser_type
-        self.different_drop_off = different_drop_off
-        self.playwright = None
-        
-        # Timeout Handler
-        self.timeout_handler = Timeout()
-
-    async def start(self):
-        # Create Page
-        self.playwright = await async_playwright().start()
-
-        if self.browser_type == "chromium":
-            browser_launcher = self.playwright.chromium
-        elif self.browser_type == "firefox":
-            browser_launcher = self.playwright.firefox
-        elif self.browser_type == "webkit":
-            browser_launcher = self.playwright.webkit
-        else:
-            raise ValueError(f"Unknown browser type: {self.browser_type}")
+from base_scrapper import baseScrapper
+from fleet_capture import FleetResponseCapture
+from location_catalog import match_location, normalize
+from timeout import TIMEOUT_ERRORS
+
+# Pulls the raw fields of every fleet card in one evaluate call,
+# parsing is left to hertzScrapper.parse_card
+CARD_EXTRACTION_JS = """
+cards => cards.map(card => {
+    const title = card.querySelector('.b-vehicle__title');
+    const passengerIcon = card.querySelector('.pair.bold i.icon-passenger');
+    const suitcaseIcon = card.querySelector('.icon-suitcase');
+    return {
+        title: title ? title.textContent : null,
+        groups: Array.from(card.querySelectorAll('.b-vehicle__groups li')).map(li => ({
+            class: li.getAttribute('class'),
+            toggle: li.getAttribute('data-bs-toggle'),
+            text: li.textContent,
+        })),
+        passengers: passengerIcon && passengerIcon.parentElement ? passengerIcon.parentElement.textContent : null,
+        suitcases: suitcaseIcon && suitcaseIcon.nextElementSibling ? suitcaseIcon.nextElementSibling.textContent : null,
+    };
+})
+"""
+
+# Identifies the fleet page currently shown (card titles + pagination marker)
+GRID_SIGNATURE_JS = """
+() => {
+    const titles = Array.from(document.querySelectorAll('.b-vehicle__body .b-vehicle__title'))
+        .map(el => el.textContent.trim()).join('|');
+    const pagination = document.querySelector('.b-pagination');
+    return titles + '#' + (pagination ? pagination.textContent.trim() : '');
+}
+"""
+
+# True once the first month title of the calendar differs from the given one
+CALENDAR_TITLE_CHANGED_JS = """
+([calendarSelector, previousTitle]) => {
+    const title = document.querySelector(`${calendarSelector} .vc-title`);
+    return title !== null && title.textContent !== previousTitle;
+}
+"""
+
+# Moves a v-calendar (Vue 3 or Vue 2) to the given month through its move() API
+CALENDAR_MOVE_JS = """
+([calendarSelector, year, month]) => {
+    const root = document.querySelector(`${calendarSelector} .vc-container`);
+    for (let el = root; el; el = el.parentElement) {
+        let component = el.__vueParentComponent;
+        while (component) {
+            const api = component.exposed || component.proxy;
+            if (api && typeof api.move === 'function') {
+                api.move({ month, year });
+                return true;
+            }
+            component = component.parent;
+        }
+        if (el.__vue__ && typeof el.__vue__.move === 'function') {
+            el.__vue__.move({ month, year });
+            return true;
+        }
+    }
+    return false;
+}
+"""
+
+# True once any pane of the calendar shows the given "Month YYYY" title
+CALENDAR_SHOWS_JS = """
+([calendarSelector, monthYear]) => Array.from(document.querySelectorAll(`${calendarSelector} .vc-title`))
+    .some(title => title.textContent.trim() === monthYear)
+"""
+
+# Steps quote_dropoffs runs once per dropoff instead of once per session
+RESEARCH_STEPS = {"Select dropoff datetime", "Search for results", "Scrape results"}
+
+class hertzScrapper(baseScrapper):
+    company = "Hertz"
+
+    def __init__(self, *args, batch_extract: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_extract = batch_extract
+
+    def steps(self):
+        # (step name, step) in flow order
+        return [
+            ("Open page", self.open_page),
+            ("Accept cookies", self.accept_cookies),
+            ("Change to network mode", self.change_to_network_mode),
+            ("Select country", self.select_country),
+            ("Select city", self.select_city),
+            ("Select pickup/dropoff", self.select_pickup_and_dropoff_location),
+            ("Select pickup datetime", self.select_pickup_datetime),
+            ("Select dropoff datetime", self.select_dropoff_datetime),
+            ("Search for results", self.search_for_results),
+            ("Scrape results", self.scrape_results),
+        ]
+
+    async def quote_dropoffs(self, dropoff_datetimes: list, quotes: dict = None) -> dict:
+        # Fill the pickup side once, then only change the return and search again: {dropoff datetime: cars}
+        # quotes is filled in as each dropoff finishes, so a caller keeps them if a later one fails
+        original_dropoff = self.dropoff_datetime
+        quotes = {} if quotes is None else quotes
+        missing = []
+        for dropoff in dropoff_datetimes:
+            self.dropoff_datetime = dropoff
+            cached = self.cache.get(self.cache_key()) if self.cache is not None and self.cache_key() else None
+            if cached is not None:
+                quotes[dropoff] = cached
+            else:
+                missing.append(dropoff)
+        if not missing:
+            self.dropoff_datetime = original_dropoff
+            return quotes
 
-        print(f"Launching browser: {self.browser_type}")
-        browser = await browser_launcher.launch(headless=False)
-        page = await browser.new_page()
-        await page.goto(self.url, wait_until="domcontentloaded")
+        pool = self.own_pool()
+        try:
+            async with self.session(pool) as page:
+                self.dropoff_datetime = missing[0]
+                form_steps = [step for step in self.steps() if step[0] not in RESEARCH_STEPS]
+                await self.run_steps(page, form_steps)
+
+                for dropoff in missing:
+                    self.dropoff_datetime = dropoff
+                    async with self.recorder.time("search", "Re-search", "Hertz"):
+                        cars = await self.run_steps(page, self.research_steps())
+                    quotes[dropoff] = cars
+                    print(f"Dropoff {dropoff:%d/%m/%Y %H:%M}: {len(cars)} cars")
+                    if self.cache is not None and self.cache_key() and cars:
+                        self.cache.put(self.cache_key(), cars)
+        finally:
+            self.dropoff_datetime = original_dropoff
+            if self.pool is None:
+                await pool.stop()
+            print(f"Closed {self.url}")
+        return {dropoff: quotes[dropoff] for dropoff in dropoff_datetimes}
+
+    def research_steps(self):
+        # The steps repeated for every dropoff of quote_dropoffs
+        return [
+            ("Back to search form", self.back_to_form),
+            ("Select dropoff datetime", self.select_dropoff_datetime),
+            ("Search again", self.search_again),
+            ("Scrape results", self.scrape_results),
+        ]
+
+    async def open_page(self, page):
+        async with self.recorder.time("navigation", "Open page", "Hertz", traffic=self.timeout_handler.traffic):
+            await page.goto(self.url, wait_until="domcontentloaded")
         print(f"Opened {self.url}")
 
-        # Accept cookies first
-        await self.timeout_handler.retry_step("Accept cookies", self.accept_cookies, page)
-
-        # Network mode
-        await self.timeout_handler.retry_step("Change to network mode", self.change_to_network_mode, page)
-
-        # Country / City selection
-        await self.timeout_handler.retry_step("Select country", self.select_country, page)
-        await self.timeout_handler.retry_step("Select city", self.select_city, page)
-
-        # Pickup / Dropoff locations
-        await self.timeout_handler.retry_step("Select pickup/dropoff", self.select_pickup_and_dropoff_location, page)
-
-        # Pick-up / Drop-off date & time
-        await self.timeout_handler.retry_step("Select pickup datetime", self.select_pickup_datetime, page)
-        await self.timeout_handler.retry_step("Select dropoff datetime", self.select_dropoff_datetime, page)
-        
-        # Search Results
-        await self.timeout_handler.retry_step("Search for results", self.search_for_results, page)
-        
-        # Scrape Data and Print
-        results = await self.timeout_handler.retry_step("Scrape results", self.scrape_results, page)
-        for result in results:
-            print(result)
-
-        await asyncio.sleep(self.duration)
-        await browser.close()
-        print(f"Closed {self.url}")
-        await self.playwright.stop()
-        
     async def accept_cookies(self, page):
+        # The saved session already answered the banner
+        if self.sessions is not None and self.sessions.has_consent("Hertz"):
+            print("Cookies accepted in saved session, skipping...")
+            return
+
         # Check for cookies banner and accept it if present.
         try:
             # Wait briefly for the cookie banner to appear
             await page.wait_for_selector('#onetrust-accept-btn-handler', timeout=3000)
             await page.click('#onetrust-accept-btn-handler')
             print("Accepted cookies banner")
+            if self.sessions is not None:
+                self.sessions.record_consent("Hertz")
         except:
             print("No cookies banner found, skipping...")
     
@@ -111,42 +198,8 @@ class hertzScrapper:
             print("No city options found!")
             
     async def select_pickup_and_dropoff_location(self, page):
-        # Departure location: click to show options, ask user to pick
-        await page.wait_for_selector('#departurelocation')
-        await page.click('#departurelocation')
-        print("Clicked departure location input, waiting for options...")
-
-        await page.wait_for_selector('#departurelocation-multiselect-options li')
-        dep_loc_elements = await page.query_selector_all('#departurelocation-multiselect-options li')
-        dep_locations = [ (await el.text_content()).strip() for el in dep_loc_elements ]
-
-        if not dep_locations:
-            print("No departure location options found!")
-        else:
-            print("Please choose a departure location:")
-            for i, opt in enumerate(dep_locations, 1):
-                print(f"{i}: {opt}")
-
-            while True:
-                choice = input(f"Enter number (1-{len(dep_locations)}): ").strip()
-                if choice.isdigit() and 1 <= int(choice) <= len(dep_locations):
-                    chosen_idx = int(choice) - 1
-                    break
-                print("Invalid choice, try again.")
-
-            chosen_dep_location = dep_locations[chosen_idx]
-            print(f"You chose departure location: {chosen_dep_location}")
-
-            await page.fill('#departurelocation', chosen_dep_location)
-            # Confirm by clicking matching dropdown item
-            await page.wait_for_selector('#departurelocation-multiselect-options li')
-            dep_loc_elements = await page.query_selector_all('#departurelocation-multiselect-options li')
-            for el in dep_loc_elements:
-                text = (await el.text_content()).strip()
-                if text == chosen_dep_location:
-                    await el.click()
-                    print(f"Selected departure location: {chosen_dep_location}")
-                    break
+        # Departure location
+        await self.select_location(page, '#departurelocation', self.pickup_location, "pickup", "departure")
 
         # Handle different drop off location
         if self.different_drop_off:
@@ -154,41 +207,44 @@ class hertzScrapper:
             await page.check('#differentReturn')
             print("Enabled different drop off location")
 
-            await page.wait_for_selector('#searchLocationReturn')
-            await page.click('#searchLocationReturn')
-            print("Clicked drop-off location input, waiting for options...")
+            await self.select_location(page, '#searchLocationReturn', self.dropoff_location, "dropoff", "drop-off")
 
-            await page.wait_for_selector('#searchLocationReturn-multiselect-options li')
-            dropoff_elements = await page.query_selector_all('#searchLocationReturn-multiselect-options li')
-            dropoff_options = [ (await el.text_content()).strip() for el in dropoff_elements ]
+    async def select_location(self, page, input_selector, wanted, kind, label):
+        options_selector = f'{input_selector}-multiselect-options li'
 
-            if not dropoff_options:
-                print("No drop-off location options found!")
-            else:
-                print("Please choose a drop-off location:")
-                for i, opt in enumerate(dropoff_options, 1):
-                    print(f"{i}: {opt}")
-
-                while True:
-                    choice = input(f"Enter number (1-{len(dropoff_options)}): ").strip()
-                    if choice.isdigit() and 1 <= int(choice) <= len(dropoff_options):
-                        chosen_idx = int(choice) - 1
-                        break
-                    print("Invalid choice, try again.")
-
-                chosen_dropoff = dropoff_options[chosen_idx]
-                print(f"You chose drop-off location: {chosen_dropoff}")
-
-                await page.fill('#searchLocationReturn', chosen_dropoff)
-
-                await page.wait_for_selector('#searchLocationReturn-multiselect-options li')
-                dropoff_elements = await page.query_selector_all('#searchLocationReturn-multiselect-options li')
-                for el in dropoff_elements:
-                    text = (await el.text_content()).strip()
-                    if text == chosen_dropoff:
-                        await el.click()
-                        print(f"Selected drop-off location: {chosen_dropoff}")
-                        break
+        # Click to show options
+        await page.wait_for_selector(input_selector)
+        await page.click(input_selector)
+        print(f"Clicked {label} location input, waiting for options...")
+
+        await page.wait_for_selector(options_selector)
+        options = [option.strip() for option in await page.locator(options_selector).all_text_contents()]
+        if not options:
+            print(f"No {label} location options found!")
+            return
+
+        chosen = await self.choose_location(options, wanted, kind, label)
+
+        await page.fill(input_selector, chosen)
+        # Confirm by clicking matching dropdown item
+        await page.wait_for_selector(options_selector)
+        exact_text = re.compile(rf"^\s*{re.escape(chosen)}\s*$")
+        await page.locator(options_selector).filter(has_text=exact_text).first.click()
+        print(f"Selected {label} location: {chosen}")
+
+    async def choose_location(self, options, wanted, kind, label):
+        names = {normalize(option): option for option in options}
+
+        # Resolve the requested location without user input
+        if wanted:
+            if self.catalog is not None:
+                wanted = self.catalog.resolve("Hertz", self.country, self.city, wanted, kind) or wanted
+            chosen = match_location(wanted, names)
+            if chosen is None:
+                raise ValueError(f"Unknown {label} location '{wanted}'. Options: {options}")
+            return chosen
+
+        return await self.ask_location(options, kind, label)
 
     async def select_pickup_datetime(self, page):
         await self.select_date_time(
@@ -207,6 +263,9 @@ class hertzScrapper:
         print("Drop-off calendar is now active")
 
     async def select_dropoff_datetime(self, page):
+        # Right after the pickup the return calendar is already open (it is clicked closed and open
+        # again), on a re-search it is closed and one click opens it
+        widget_click = await page.locator('.dropdown-menu.dropdown-menu-end.show').count() > 0
         await self.select_date_time(
         page,
         dropdown_selector='#dropdownMenureturn',
@@ -214,7 +273,7 @@ class hertzScrapper:
         target_datetime=self.dropoff_datetime,
         hour_selector='#hourreturndesktop',
         minute_selector='#minutesreturndesktop',
-        widget_click=True,
+        widget_click=widget_click,
         label="Drop-off"
     )
 
@@ -242,19 +301,17 @@ class hertzScrapper:
         # Wait for calendar to render
         await calendar_container.locator('.vc-title').first.wait_for()
 
-        while True:
+        # Read the visible months once and jump straight to the target month
+        titles = [t.strip() for t in await calendar_container.locator('.vc-title').all_text_contents()]
+        if target_month_year not in titles:
+            await self.jump_to_month(page, calendar_selector, titles[0], year, month, target_month_year)
             titles = [t.strip() for t in await calendar_container.locator('.vc-title').all_text_contents()]
-            if target_month_year in titles:
-                index = titles.index(target_month_year)
-                panel = calendar_container.locator('.vc-pane').nth(index)
-                day_locator = panel.locator(f'.vc-day:not(.is-disabled):has-text("{int(day)}")')
-                await day_locator.first.click()
-                print(f"{label}: Selected day {day} in {target_month_year}")
-                break
 
-            next_arrow = calendar_container.locator('.vc-arrow.vc-next')
-            await next_arrow.first.click(force=True)
-            await page.wait_for_timeout(25)
+        index = titles.index(target_month_year)
+        panel = calendar_container.locator('.vc-pane').nth(index)
+        day_locator = panel.locator(f'.vc-day:not(.is-disabled):has-text("{int(day)}")')
+        await day_locator.first.click()
+        print(f"{label}: Selected day {day} in {target_month_year}")
 
         hour = target_datetime.hour
         minute = target_datetime.minute
@@ -273,13 +330,78 @@ class hertzScrapper:
         await page.click(f'{calendar_selector} button.btn.btn-primary.btn-full-width')
         print(f"{label}: Confirmed date and time selection")
         
+    async def jump_to_month(self, page, calendar_selector, first_title, year, month, target_month_year):
+        calendar_container = page.locator(calendar_selector)
+        shown = datetime.strptime(first_title, "%B %Y")
+        offset = (year - shown.year) * 12 + (month - shown.month)
+
+        # Preferred: the calendar's own move() API
+        if await page.evaluate(CALENDAR_MOVE_JS, [calendar_selector, year, month]):
+            try:
+                await page.wait_for_function(
+                    CALENDAR_SHOWS_JS, arg=[calendar_selector, target_month_year], timeout=2000)
+                print(f"Jumped {offset} months to {target_month_year}")
+                return
+            except Exception:
+                print("Calendar move() did not reach the target month, using the arrows")
+
+        # Fallback: one arrow click per month, waiting for each render
+        arrow = calendar_container.locator('.vc-arrow.vc-next' if offset > 0 else '.vc-arrow.vc-prev').first
+        for _ in range(abs(offset) + 1):
+            titles = await calendar_container.locator('.vc-title').all_text_contents()
+            if target_month_year in [t.strip() for t in titles]:
+                return
+            await arrow.click(force=True)
+
+            # Wait for the calendar to render the next month
+            await page.wait_for_function(
+                CALENDAR_TITLE_CHANGED_JS,
+                arg=[calendar_selector, titles[0]],
+                timeout=5000,
+            )
+        raise ValueError(f"Could not navigate the calendar to {target_month_year}")
+
     async def search_for_results(self, page):
+        # Listen for the fleet payloads before they are requested
+        if self.capture_responses:
+            if self.capture is not None:
+                self.capture.detach(page)
+            self.capture = FleetResponseCapture()
+            self.capture.attach(page)
+
         # Click the search button
         await page.wait_for_selector('button.btn.btn-outline-primary.btn-full-width.submit-button')
         await page.click('button.btn.btn-outline-primary.btn-full-width.submit-button')
         print("Clicked 'Find your vehicle' button")
         
-    async def scrape_results(self, page):
+    async def back_to_form(self, page):
+        # The results may replace the search form, step back to it keeping the filled pickup side
+        if await page.locator('#dropdownMenureturn').is_visible():
+            return
+        await page.go_back(wait_until="domcontentloaded")
+        await page.wait_for_selector('#dropdownMenureturn', state="visible", timeout=10000)
+        print("Back on the search form")
+
+    async def search_again(self, page):
+        await self.search_for_results(page)
+        if not self.capture_responses:
+            # The grid of the previous dropoff stays up until the new fleet has arrived
+            try:
+                await page.wait_for_load_state("networkidle", timeout=10000)
+            except TIMEOUT_ERRORS:
+                pass
+
+    async def iter_cars(self, page):
+        # Prefer the fleet JSON the page fetched, the DOM walk is the fallback
+        if self.capture is not None and await self.capture.wait(timeout=10):
+            cars = self.capture.vehicles()
+            if cars:
+                print(f"Scraped {len(cars)} cars from fleet responses")
+                for car in cars:
+                    yield car
+                return
+            print("No vehicles in fleet responses, falling back to the results grid")
+
         # Wait for the visible fleet grid
         await page.wait_for_selector('.s-booking-fleet__grid:visible', timeout=20000)
         grid = page.locator('.s-booking-fleet__grid:visible').first
@@ -292,66 +414,27 @@ class hertzScrapper:
         visible_count = await visible_cards.count()
         print(f"Car nodes in DOM (in grid): {total_nodes}, visible cards counted: {visible_count}")
 
-        cars = []
         seen_titles = set()
 
         while True:
             # Wait for grid and visible car cards
             await page.wait_for_selector('.s-booking-fleet__grid')
             visible_cards = page.locator('.b-vehicle__body')
-            visible_count = await visible_cards.count()
 
-            for i in range(visible_count):
-                card = visible_cards.nth(i)
+            async with self.recorder.time("extraction", "Extract cards", "Hertz"):
+                if self.batch_extract:
+                    raw_cards = await self.extract_cards_batch(visible_cards)
+                else:
+                    raw_cards = await self.extract_cards_per_field(visible_cards)
 
-                # Car name (strip "or similar")
-                raw_title = await card.locator('.b-vehicle__title').text_content()
-                title = (raw_title or '').replace('or similar', '').strip() or 'Unknown'
+            for raw_card in raw_cards:
+                car = self.parse_card(raw_card)
 
                 # De-dup
-                if title in seen_titles:
+                if car['name'] in seen_titles:
                     continue
-                seen_titles.add(title)
-
-                # Category
-                li_elements = await card.locator('.b-vehicle__groups li').all()
-                category = 'Unknown'
-                for li in li_elements:
-                    attrs = await li.get_attribute("class")
-                    data_toggle = await li.get_attribute("data-bs-toggle")
-
-                    if data_toggle or (attrs and "separator" in attrs):
-                        continue
-
-                    text = (await li.text_content() or "").strip()
-                    if text:
-                        category = text
-                        break
-                    
-                # Passengers
-                passenger_locator = card.locator('.pair.bold i.icon-passenger')
-                passengers = "Unknown"
-                if await passenger_locator.count() > 0:
-                    passengers_text = await passenger_locator.nth(0).locator("xpath=..").text_content()
-                    if passengers_text:
-                        passengers = passengers_text.strip().replace("\n", " ")
-                        
-                # Suitcases
-                suitcase_locator = card.locator('.icon-suitcase')
-                suitcases = "Unknown"
-                if await suitcase_locator.count() > 0:
-                    # get the sibling span next to <i class="icon-suitcase">
-                    suitcase_text = await suitcase_locator.nth(0).evaluate("el => el.nextElementSibling?.textContent")
-                    if suitcase_text:
-                        match = re.search(r"\d+", suitcase_text)
-                        suitcases = int(match.group()) if match else "Unknown"
-
-                cars.append({
-                    'name': title,
-                    'category': category,
-                    'passengers': passengers,
-                    'suitcases': suitcases,
-                })
+                seen_titles.add(car['name'])
+                yield car
 
             # Check if "Next" button is disabled
             next_button = page.locator('button.b-pagination__btn--next')
@@ -359,9 +442,83 @@ class hertzScrapper:
                 print("Reached last page of results.")
                 break
 
-            # Go to next page
+            # Go to next page and wait for the grid to show different cards
+            signature = await page.evaluate(GRID_SIGNATURE_JS)
             await next_button.click()
-            await page.wait_for_timeout(2000)  # wait for results to reload
+            await page.wait_for_function(
+                f"previous => ({GRID_SIGNATURE_JS})() !== previous",
+                arg=signature,
+                timeout=20000,
+            )
+
+    async def extract_cards_batch(self, cards):
+        # Read every card on the page in a single round trip
+        return await cards.evaluate_all(CARD_EXTRACTION_JS)
+
+    async def extract_cards_per_field(self, cards):
+        # Read every card field with its own Playwright call (slow path)
+        raw_cards = []
+        for i in range(await cards.count()):
+            card = cards.nth(i)
+
+            groups = []
+            for li in await card.locator('.b-vehicle__groups li').all():
+                groups.append({
+                    'class': await li.get_attribute("class"),
+                    'toggle': await li.get_attribute("data-bs-toggle"),
+                    'text': await li.text_content(),
+                })
+
+            passengers = None
+            passenger_locator = card.locator('.pair.bold i.icon-passenger')
+            if await passenger_locator.count() > 0:
+                passengers = await passenger_locator.nth(0).locator("xpath=..").text_content()
+
+            suitcases = None
+            suitcase_locator = card.locator('.icon-suitcase')
+            if await suitcase_locator.count() > 0:
+                # get the sibling span next to <i class="icon-suitcase">
+                suitcases = await suitcase_locator.nth(0).evaluate("el => el.nextElementSibling?.textContent")
+
+            raw_cards.append({
+                'title': await card.locator('.b-vehicle__title').text_content(),
+                'groups': groups,
+                'passengers': passengers,
+                'suitcases': suitcases,
+            })
+        return raw_cards
+
+    @staticmethod
+    def parse_card(raw_card: dict) -> dict:
+        # Car name (strip "or similar")
+        title = (raw_card.get('title') or '').replace('or similar', '').strip() or 'Unknown'
+
+        # Category (skip separators and tooltip items)
+        category = 'Unknown'
+        for group in raw_card.get('groups') or []:
+            attrs = group.get('class')
+            if group.get('toggle') or (attrs and "separator" in attrs):
+                continue
+
+            text = (group.get('text') or "").strip()
+            if text:
+                category = text
+                break
 
-        print(f"Scraped {len(cars)} cars")
-        return cars
\ No newline at end of file
+        # Passengers
+        passengers = "Unknown"
+        if raw_card.get('passengers'):
+            passengers = raw_card['passengers'].strip().replace("\n", " ")
+
+        # Suitcases
+        suitcases = "Unknown"
+        if raw_card.get('suitcases'):
+            match = re.search(r"\d+", raw_card['suitcases'])
+            suitcases = int(match.group()) if match else "Unknown"
+
+        return {
+            'name': title,
+            'category': category,
+            'passengers': passengers,
+            'suitcases': suitcases,
+        }
@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import bisect
+import difflib
+import json
+import os
+import time
+import unicodedata
+from browser_pool import BrowserPool
+from network_filter import NetworkFilter
+from session_store import SessionStore
+from sys_msg import system_message
+
+def normalize(text: str) -> str:
+    # Case, accent and whitespace insensitive form used by every lookup
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+class LocationCatalog:
+    def __init__(self, path: str = "locations.json", max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+
+        # company -> country -> city -> {"pickup": [...], "dropoff": [...], "updated_at": ts}
+        self.data = {}
+        self.countries = {}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as catalog_file:
+                saved = json.load(catalog_file)
+            self.data = saved.get("locations", {})
+            self.countries = saved.get("countries", {})
+        self.build_index()
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as catalog_file:
+            json.dump({"countries": self.countries, "locations": self.data}, catalog_file, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def build_index(self):
+        # Exact lookup, sorted keys for prefix lookup and the key list for fuzzy lookup
+        self.exact = {}
+        for company, countries in self.data.items():
+            for country, cities in countries.items():
+                for city, entry in cities.items():
+                    for kind in ("pickup", "dropoff"):
+                        for name in entry.get(kind, []):
+                            scope = (company, normalize(country), normalize(city), kind)
+                            self.exact.setdefault(scope, {})[normalize(name)] = name
+        self.sorted_keys = {scope: sorted(names) for scope, names in self.exact.items()}
+
+    def set_city(self, company: str, country: str, city: str, pickup: list, dropoff: list):
+        entry = {"pickup": pickup, "dropoff": dropoff, "updated_at": time.time()}
+        self.data.setdefault(company, {}).setdefault(country, {})[city] = entry
+        self.build_index()
+
+    def locations(self, company: str, country: str, city: str, kind: str = "pickup") -> list:
+        return list(self.exact.get((company, normalize(country), normalize(city), kind), {}).values())
+
+    def stale_cities(self, company: str, now: float = None) -> list:
+        now = now or time.time()
+        stale = []
+        for country, cities in self.data.get(company, {}).items():
+            for city, entry in cities.items():
+                if now - entry.get("updated_at", 0) > self.max_age:
+                    stale.append((country, city))
+        return stale
+
+    def resolve(self, company: str, country: str, city: str, query: str, kind: str = "pickup"):
+        # Exact, then prefix, then fuzzy match of a location name, None if nothing fits
+        scope = (company, normalize(country), normalize(city), kind)
+        names = self.exact.get(scope)
+        if not names:
+            return None
+        return match_location(query, names, self.sorted_keys[scope])
+
+def match_location(query: str, names: dict, sorted_keys: list = None):
+    # names maps normalized -> display name
+    key = normalize(query)
+    if key in names:
+        return names[key]
+
+    sorted_keys = sorted_keys if sorted_keys is not None else sorted(names)
+    start = bisect.bisect_left(sorted_keys, key)
+    if start < len(sorted_keys) and sorted_keys[start].startswith(key):
+        return names[sorted_keys[start]]
+
+    close = difflib.get_close_matches(key, sorted_keys, n=1, cutoff=0.6)
+    if close:
+        return names[close[0]]
+
+    # Substring as the last resort ("airport" -> "Athens Airport")
+    for candidate in sorted_keys:
+        if key in candidate:
+            return names[candidate]
+    return None
+
+class HertzLocationCrawler:
+    def __init__(self, url: str, catalog: LocationCatalog):
+        self.url = url
+        self.catalog = catalog
+
+    async def read_options(self, page, input_selector: str) -> list:
+        await page.wait_for_selector(input_selector)
+        await page.click(input_selector)
+        await page.wait_for_selector(f'{input_selector}-multiselect-options li')
+        options = await page.locator(f'{input_selector}-multiselect-options li').all_text_contents()
+        return [option.strip() for option in options if option.strip()]
+
+    async def open_form(self, page, scraper):
+        await page.goto(self.url, wait_until="domcontentloaded")
+        await scraper.accept_cookies(page)
+        await scraper.change_to_network_mode(page)
+
+    async def crawl_city(self, page, scraper, country: str, city: str):
+        await self.open_form(page, scraper)
+        scraper.country = country
+        scraper.city = city
+        await scraper.select_country(page)
+        await scraper.select_city(page)
+        pickup = await self.read_options(page, '#departurelocation')
+
+        await page.wait_for_selector('#differentReturn')
+        await page.check('#differentReturn')
+        dropoff = await self.read_options(page, '#searchLocationReturn')
+
+        self.catalog.set_city("Hertz", country, city, pickup, dropoff)
+        self.catalog.save()
+        print(f"{system_message('S')} Catalogued {country}/{city}: {len(pickup)} pickup, {len(dropoff)} drop-off locations")
+
+    async def crawl_cities(self, page, scraper, country: str) -> list:
+        await self.open_form(page, scraper)
+        scraper.country = country
+        await scraper.select_country(page)
+        return await self.read_options(page, '#departurecity')
+
+    async def refresh(self, pool, countries: list = None, full: bool = False):
+        # Only cities that are missing or older than max_age are crawled again
+        # (imported here, herz_scrapper itself depends on this module)
+        from herz_scrapper import hertzScrapper
+
+        async with pool.page("Hertz") as page:
+            scraper = hertzScrapper(self.url, "", "", None, None, pool=pool)
+            if countries is None:
+                await self.open_form(page, scraper)
+                countries = await self.read_options(page, '#departurecountry')
+                self.catalog.countries["Hertz"] = countries
+                self.catalog.save()
+
+            stale = set(self.catalog.stale_cities("Hertz"))
+            for country in countries:
+                known = self.catalog.data.get("Hertz", {}).get(country, {})
+                for city in await self.crawl_cities(page, scraper, country):
+                    if full or city not in known or (country, city) in stale:
+                        await self.crawl_city(page, scraper, country, city)
+
+    async def refresh_periodically(self, pool, interval: float, countries: list = None):
+        while True:
+            try:
+                await self.refresh(pool, countries)
+            except Exception as e:
+                print(f"{system_message('E')} Location catalog refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+async def refresh_catalog(url: str, path: str, countries: list = None, full: bool = False, headless: bool = True):
+    catalog = LocationCatalog(path)
+    async with BrowserPool(size=1, headless=headless, network_filter=NetworkFilter(),
+                           sessions=SessionStore()) as pool:
+        await HertzLocationCrawler(url, catalog).refresh(pool, countries, full=full)
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl the Hertz location dropdowns into a local catalog")
+    parser.add_argument("--url", default="https://www.hertz.gr/en/car-rental/")
+    parser.add_argument("--path", default="locations.json")
+    parser.add_argument("--countries", nargs="+", default=None, help="Only crawl these countries")
+    parser.add_argument("--full", action="store_true", help="Crawl every city, not only stale ones")
+    parser.add_argument("--headed", action="store_true", help="Show the browser")
+    args = parser.parse_args()
+    asyncio.run(refresh_catalog(args.url, args.path, args.countries, full=args.full, headless=not args.headed))
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 import asyncio
 from datetime import datetime
-from herz_scrapper import hertzScrapper
+from browser_pool import BrowserPool
+from har_archive import HarArchive
+from location_catalog import LocationCatalog
+from metrics import default_recorder
+from network_filter import NetworkFilter
+from orchestrator import SearchRequest, default_orchestrator
+from quote_cache import QuoteCache
+from quote_store import QuoteStore
 from safeguards import SafeGuards
+from session_store import SessionStore
 
 async def main():
-    hertz_url = "https://www.hertz.gr/en/car-rental/"
-    
     # Pick Up (and Optional Drop-Off) Country and City
     different_drop_off = True
     country = "Greece"  # Desired country
     city = "Athens"      # Desired city
+    pickup_location = None   # e.g. "Athens Airport", asked interactively when None
+    dropoff_location = None
     
     # Pick-Up and Drop-Off Date and Time
     pickup_datetime = datetime.strptime("12/09/2025 16:45", "%d/%m/%Y %H:%M")
@@ -17,13 +25,41 @@ async def main():
     
     # Companies To Use
     companies_list = ["Hertz", "Avis", "NoName"]
+
+    # Record every session for offline replay (python har_archive.py recordings)
+    record_sessions = False
     
     # Validate Date and Time
     safeguard = SafeGuards(companies_list, pickup_datetime, dropoff_datetime)
-    await safeguard.safeguard()
+    companies_list = safeguard.safeguard()
+    if not companies_list:
+        raise ValueError("No company accepts this Pick-Up/Drop-Off")
     
-    hertz_manager = hertzScrapper(hertz_url, country, city, pickup_datetime, dropoff_datetime, duration=15, browser_type="chromium", different_drop_off=different_drop_off)
-    await hertz_manager.start()
+    # Repeated searches are served from the local quote cache
+    cache = QuoteCache()
+
+    # Search every company at once, sharing one browser per company
+    request = SearchRequest(country, city, pickup_datetime, dropoff_datetime, different_drop_off=different_drop_off,
+                            pickup_location=pickup_location, dropoff_location=dropoff_location)
+    async with BrowserPool(size=len(companies_list), browser_type="chromium",
+                           network_filter=NetworkFilter(), sessions=SessionStore()) as pool:
+        orchestrator = default_orchestrator(pool=pool, cache=cache, catalog=LocationCatalog(),
+                                            har=HarArchive("recordings") if record_sessions else None)
+        outcomes = await orchestrator.search(request, companies_list)
+    print(f"Quote cache: {cache.stats()}")
+    cache.close()
+
+    # Keep every quote for later comparisons (quote_store.QuoteStore().scan(...))
+    store = QuoteStore()
+    await store.append_async([quote for outcome in outcomes for quote in outcome["quotes"]])
+    await store.flush_async()
+
+    # Export step timings
+    default_recorder.write_prometheus("metrics.prom")
+    default_recorder.write_jsonl("metrics.jsonl")
+    for outcome in outcomes:
+        for result in outcome["results"]:
+            print(outcome["company"], result)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
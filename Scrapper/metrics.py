@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+
+# Seconds, from a quick DOM read up to a full search
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+@dataclass
+class TimingEvent:
+    kind: str  # step | navigation | extraction | search
+    name: str
+    company: str
+    duration: float
+    outcome: str  # ok | timeout | error | cancelled | circuit_open
+    attempt: int = 1
+    requests: int = None
+    bytes: int = None
+    timestamp: float = field(default_factory=time.time)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+class PageTraffic:
+    # Requests and response bytes seen by a page, bytes from Content-Length when the server sends it
+    def __init__(self, page):
+        self.page = page
+        self.requests = 0
+        self.bytes = 0
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+
+    def detach(self):
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("response", self._on_response)
+
+    def _on_request(self, request):
+        self.requests += 1
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes += int(length)
+
+    def snapshot(self):
+        return self.requests, self.bytes
+
+class MetricsRecorder:
+    def __init__(self, buckets=DEFAULT_BUCKETS, max_events: int = 10000):
+        self.buckets = buckets
+        self.events = deque(maxlen=max_events)
+        self.histograms = {}
+        self.requests = {}
+        self.bytes = {}
+        self.listeners = []
+
+    def add_listener(self, listener):
+        # Called with every TimingEvent as it is recorded
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def record(self, event: TimingEvent):
+        self.events.append(event)
+        labels = (event.kind, event.name, event.company or "", event.outcome)
+        if labels not in self.histograms:
+            self.histograms[labels] = Histogram(self.buckets)
+        self.histograms[labels].observe(event.duration)
+        if event.requests is not None:
+            self.requests[labels] = self.requests.get(labels, 0) + event.requests
+        if event.bytes is not None:
+            self.bytes[labels] = self.bytes.get(labels, 0) + event.bytes
+        for listener in self.listeners:
+            listener(event)
+
+    @asynccontextmanager
+    async def time(self, kind: str, name: str, company: str = None, attempt: int = 1, traffic: PageTraffic = None):
+        # Record the wrapped block as one event, outcome taken from how it exits
+        requests_before, bytes_before = traffic.snapshot() if traffic else (None, None)
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Cut short from outside (a deadline, a shutdown), not an outcome of the step itself
+            outcome = "cancelled"
+            raise
+        except Exception as e:
+            outcome = outcome_of(e)
+            raise
+        finally:
+            event = TimingEvent(kind, name, company, time.perf_counter() - started, outcome, attempt)
+            if traffic is not None:
+                requests_after, bytes_after = traffic.snapshot()
+                event.requests = requests_after - requests_before
+                event.bytes = bytes_after - bytes_before
+            self.record(event)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP scraper_duration_seconds Duration of scraper steps, navigations, extractions and searches.",
+            "# TYPE scraper_duration_seconds histogram",
+        ]
+        for labels, histogram in sorted(self.histograms.items()):
+            label_text = format_labels(labels)
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'scraper_duration_seconds_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'scraper_duration_seconds_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+            lines.append(f"scraper_duration_seconds_sum{{{label_text}}} {histogram.sum}")
+            lines.append(f"scraper_duration_seconds_count{{{label_text}}} {histogram.count}")
+
+        for metric, totals, help_text in (
+            ("scraper_requests_total", self.requests, "Requests made by the page during the event."),
+            ("scraper_response_bytes_total", self.bytes, "Response bytes received by the page during the event."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, total in sorted(totals.items()):
+                lines.append(f"{metric}{{{format_labels(labels)}}} {total}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as output:
+            output.write(self.to_prometheus())
+
+    def write_jsonl(self, path: str):
+        # Append the buffered events, then drop them from memory
+        with open(path, "a", encoding="utf-8") as output:
+            while self.events:
+                output.write(json.dumps(asdict(self.events.popleft())) + "\n")
+
+def outcome_of(error: Exception) -> str:
+    # Imported here, timeout itself records through this module
+    from timeout import TIMEOUT_ERRORS, CircuitOpenError
+
+    if isinstance(error, TIMEOUT_ERRORS):
+        return "timeout"
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    return "error"
+
+def format_labels(labels) -> str:
+    kind, name, company, outcome = labels
+    values = {"kind": kind, "name": name, "company": company, "outcome": outcome}
+    return ",".join(f'{key}="{escape(value)}"' for key, value in values.items())
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+# Process-wide recorder used by default
+default_recorder = MetricsRecorder()
@@ -0,0 +1,102 @@
+from urllib.parse import urlparse
+from sys_msg import system_message
+
+# Nothing is read from these, the scrapers only need the DOM text
+DEFAULT_BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+DEFAULT_DENIED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "bing.com",
+    "criteo.com",
+    "criteo.net",
+    "tiktok.com",
+    "linkedin.com",
+    "adnxs.com",
+    "taboola.com",
+]
+
+# Domains serving the booking widgets, never blocked by domain rules
+DEFAULT_ALLOWED_DOMAINS = {
+    "Hertz": ["hertz.gr", "hertz.com", "cookielaw.org", "onetrust.com"],
+    "Avis": ["avis.gr", "avis.com", "tiqcdn.com"],
+}
+
+def host_matches(host: str, domains) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+class NetworkFilter:
+    def __init__(self, blocked_resource_types=None, denied_domains=None, allowed_domains=None,
+                 block_third_party_scripts: bool = False, measure_bytes: bool = False):
+        self.blocked_resource_types = set(DEFAULT_BLOCKED_RESOURCE_TYPES if blocked_resource_types is None else blocked_resource_types)
+        self.denied_domains = list(DEFAULT_DENIED_DOMAINS if denied_domains is None else denied_domains)
+        self.allowed_domains = dict(DEFAULT_ALLOWED_DOMAINS if allowed_domains is None else allowed_domains)
+        self.block_third_party_scripts = block_third_party_scripts
+        self.measure_bytes = measure_bytes
+
+        # Counters
+        self.allowed_requests = 0
+        self.allowed_bytes = 0
+        self.blocked_requests = 0
+        self.blocked_by_reason = {}
+
+    def block_reason(self, url: str, resource_type: str, company: str = None):
+        # Reason the request is blocked, None if it may go through
+        if resource_type in self.blocked_resource_types:
+            return f"type:{resource_type}"
+
+        host = (urlparse(url).hostname or "").lower()
+        if not host:
+            return None
+        allowed = self.allowed_domains.get(company, [])
+        if host_matches(host, allowed):
+            return None
+        if self.block_third_party_scripts and allowed and resource_type == "script":
+            return "third-party-script"
+        if host_matches(host, self.denied_domains):
+            return "domain"
+        return None
+
+    async def attach(self, context, company: str = None):
+        # Apply the filter to every page of a BrowserContext
+        async def handle(route):
+            request = route.request
+            reason = self.block_reason(request.url, request.resource_type, company)
+            if reason is None:
+                self.allowed_requests += 1
+                await route.continue_()
+                return
+            self.blocked_requests += 1
+            self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+            await route.abort("blockedbyclient")
+
+        await context.route("**/*", handle)
+
+        if self.measure_bytes:
+            context.on("requestfinished", self._count_bytes)
+
+    async def _count_bytes(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.allowed_bytes += sizes["requestHeadersSize"] + sizes["requestBodySize"]
+        self.allowed_bytes += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+
+    def stats(self) -> dict:
+        return {
+            "allowed_requests": self.allowed_requests,
+            "allowed_bytes": self.allowed_bytes,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+        }
+
+    def report(self):
+        print(f"{system_message('I')} Network filter blocked {self.blocked_requests} requests "
+              f"({self.blocked_by_reason}), allowed {self.allowed_requests}")
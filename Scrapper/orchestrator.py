@@ -0,0 +1,159 @@
+import asyncio
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from avis_scrapper import AVIS_URL, avisScrapper
+from browser_pool import BrowserPool
+from har_archive import HarArchive
+from herz_scrapper import hertzScrapper
+from location_catalog import LocationCatalog
+from metrics import TimingEvent, default_recorder
+from quote import to_quotes
+from quote_cache import QuoteCache, search_key
+from sys_msg import system_message
+
+HERTZ_URL = "https://www.hertz.gr/en/car-rental/"
+
+@dataclass
+class SearchRequest:
+    country: str
+    city: str
+    pickup_datetime: datetime
+    dropoff_datetime: datetime
+    different_drop_off: bool = False
+    pickup_location: str = None  # Asked interactively when not given
+    dropoff_location: str = None
+
+def hertz_factory(request: SearchRequest, pool: BrowserPool = None, cache: QuoteCache = None,
+                  catalog: LocationCatalog = None, har: HarArchive = None):
+    return hertzScrapper(HERTZ_URL, request.country, request.city, request.pickup_datetime,
+                         request.dropoff_datetime, different_drop_off=request.different_drop_off,
+                         pool=pool, cache=cache, pickup_location=request.pickup_location,
+                         dropoff_location=request.dropoff_location, catalog=catalog, har=har)
+
+def avis_factory(request: SearchRequest, pool: BrowserPool = None, cache: QuoteCache = None,
+                 catalog: LocationCatalog = None, har: HarArchive = None):
+    return avisScrapper(AVIS_URL, request.country, request.city, request.pickup_datetime,
+                        request.dropoff_datetime, different_drop_off=request.different_drop_off,
+                        pool=pool, cache=cache, pickup_location=request.pickup_location,
+                        dropoff_location=request.dropoff_location, catalog=catalog, har=har)
+
+def request_key(company: str, request: SearchRequest) -> str:
+    return search_key(company, request.country, request.city, request.pickup_datetime, request.dropoff_datetime,
+                      request.pickup_location, request.dropoff_location if request.different_drop_off else None)
+
+class SearchOrchestrator:
+    def __init__(self, deadline: float = 180, pool: BrowserPool = None, cache: QuoteCache = None,
+                 catalog: LocationCatalog = None, har: HarArchive = None):
+        # Company name -> factory building a scraper (with a start() coroutine) for a request
+        self.scrapers = {}
+        self.deadline = deadline
+        # Shared resources handed to every scraper factory
+        self.resources = {"pool": pool, "cache": cache, "catalog": catalog, "har": har}
+
+    def register(self, company: str, factory):
+        self.scrapers[company] = factory
+
+    def supports_dropoffs(self, company: str, request: SearchRequest) -> bool:
+        # Whether the company's scraper re-searches one filled form for several dropoffs
+        if company not in self.scrapers:
+            return False
+        return hasattr(self.scrapers[company](request, **self.resources), "quote_dropoffs")
+
+    async def _run_company(self, company: str, request: SearchRequest, deadline: float, on_result=None):
+        started = time.perf_counter()
+        outcome = {"company": company, "status": "ok", "results": [], "quotes": [], "error": None}
+        try:
+            scraper = self.scrapers[company](request, **self.resources)
+            outcome["results"] = await asyncio.wait_for(scraper.start(), timeout=deadline) or []
+            outcome["quotes"] = to_quotes(company, outcome["results"], request_key(company, request))
+            print(f"{system_message('S')} {company}: {len(outcome['results'])} results")
+        except asyncio.TimeoutError:
+            outcome["status"] = "timeout"
+            outcome["error"] = f"No results within {deadline}s"
+            print(f"{system_message('E')} {company}: {outcome['error']}")
+        except Exception as e:
+            outcome["status"] = "error"
+            outcome["error"] = str(e)
+            print(f"{system_message('E')} {company}: {e}")
+        outcome["elapsed"] = time.perf_counter() - started
+        default_recorder.record(TimingEvent("search", "End to end", company, outcome["elapsed"], outcome["status"]))
+
+        # Hand results over as soon as this company is done
+        if on_result is not None:
+            on_result(outcome)
+        return outcome
+
+    async def search(self, request: SearchRequest, companies: list = None, deadlines: dict = None, on_result=None):
+        # Fan the request out to every registered company at once
+        companies = companies if companies is not None else list(self.scrapers)
+        deadlines = deadlines or {}
+
+        finished = []
+        def collect(outcome):
+            finished.append(outcome)
+            if on_result is not None:
+                on_result(outcome)
+
+        tasks = []
+        for company in companies:
+            if company not in self.scrapers:
+                print(f"{system_message('U')} No scraper registered for {company}, skipping...")
+                continue
+            deadline = deadlines.get(company, self.deadline)
+            tasks.append(self._run_company(company, request, deadline, collect))
+
+        await asyncio.gather(*tasks)
+
+        # Merged results, ordered by completion time
+        return finished
+
+    async def search_dropoffs(self, request: SearchRequest, dropoff_datetimes: list, company: str,
+                              deadline: float = None) -> list:
+        # One outcome per dropoff datetime, re-using one filled form when the scraper supports it
+        requests = [replace(request, dropoff_datetime=dropoff) for dropoff in dropoff_datetimes]
+        scraper = self.scrapers[company](request, **self.resources)
+        if not hasattr(scraper, "quote_dropoffs"):
+            return [(await self.search(dropoff_request, [company], {company: deadline} if deadline else None))[0]
+                    for dropoff_request in requests]
+
+        # The deadline covers the whole session, one search per dropoff
+        deadline = (deadline or self.deadline) * len(requests)
+        started = time.perf_counter()
+        # Filled in by the scraper as it goes, the dropoffs finished before a failure are kept
+        status, error, quotes = "ok", None, {}
+        try:
+            await asyncio.wait_for(scraper.quote_dropoffs(dropoff_datetimes, quotes), timeout=deadline)
+        except asyncio.TimeoutError:
+            status, error = "timeout", f"No results within {deadline}s"
+        except Exception as e:
+            status, error = "error", str(e)
+        elapsed = time.perf_counter() - started
+        if error:
+            print(f"{system_message('E')} {company}: {error} ({len(quotes)}/{len(requests)} dropoffs done)")
+        else:
+            print(f"{system_message('S')} {company}: {sum(len(cars or []) for cars in quotes.values())} results "
+                  f"for {len(requests)} dropoffs")
+
+        outcomes = []
+        for dropoff_request in requests:
+            # Only the dropoffs the session did not reach share its failure
+            done = dropoff_request.dropoff_datetime in quotes
+            results = quotes.get(dropoff_request.dropoff_datetime) or []
+            outcomes.append({
+                "company": company,
+                "status": "ok" if done else status,
+                "results": results,
+                "quotes": to_quotes(company, results, request_key(company, dropoff_request)),
+                "error": None if done else error,
+                "elapsed": elapsed / len(requests),
+            })
+        default_recorder.record(TimingEvent("search", "Multi-quote", company, elapsed, status))
+        return outcomes
+
+def default_orchestrator(deadline: float = 180, pool: BrowserPool = None, cache: QuoteCache = None,
+                         catalog: LocationCatalog = None, har: HarArchive = None) -> SearchOrchestrator:
+    orchestrator = SearchOrchestrator(deadline=deadline, pool=pool, cache=cache, catalog=catalog, har=har)
+    orchestrator.register("Hertz", hertz_factory)
+    orchestrator.register("Avis", avis_factory)
+    return orchestrator
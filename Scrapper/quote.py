@@ -0,0 +1,146 @@
+import re
+from dataclasses import asdict, dataclass
+
+CURRENCY_SYMBOLS = {"€": "EUR", "$": "USD", "£": "GBP"}
+CURRENCY_WORDS = {"eur": "EUR", "ευρώ": "EUR", "euro": "EUR", "usd": "USD", "gbp": "GBP"}
+
+PRICE_NUMBER = re.compile(r"\d[\d.,\s ']*")
+FIRST_INT = re.compile(r"\d+")
+
+# Words next to the numbers in the Avis feature list
+PASSENGER_WORDS = ("θέσεις", "θέσης", "επιβάτες", "seats", "passengers")
+SUITCASE_WORDS = ("βαλίτσ", "αποσκευ", "suitcase", "bags", "luggage")
+
+@dataclass(slots=True)
+class Quote:
+    company: str
+    name: str
+    category: str
+    passengers: int  # None when unknown
+    suitcases: int
+    price_cents: int  # None when the site shows no price
+    currency: str
+    payment_type: str  # pay_online | pay_collection | "" when the site has one price
+    search_key: str
+
+    @property
+    def price(self) -> float:
+        return None if self.price_cents is None else self.price_cents / 100
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Quote":
+        return cls(**{name: data.get(name) for name in cls.__dataclass_fields__})
+
+def parse_price(text, default_currency: str = "EUR"):
+    # "€1.234,56", "1,234.56 EUR", "123,45 €", 99 -> (cents, currency), (None, None) when there is no price
+    if text is None:
+        return None, None
+    if isinstance(text, (int, float)):
+        return round(text * 100), default_currency
+
+    currency = None
+    lowered = text.lower()
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in text:
+            currency = code
+            break
+    if currency is None:
+        for word, code in CURRENCY_WORDS.items():
+            if word in lowered:
+                currency = code
+                break
+
+    match = PRICE_NUMBER.search(text)
+    if match is None:
+        return None, None
+    number = re.sub(r"[\s ']", "", match.group()).rstrip(".,")
+
+    last_dot = number.rfind(".")
+    last_comma = number.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        # Both used: whichever comes last is the decimal separator
+        decimal = "." if last_dot > last_comma else ","
+    elif last_dot >= 0 or last_comma >= 0:
+        separator = "." if last_dot >= 0 else ","
+        # A single separator followed by 1-2 digits is decimal ("123,45"), otherwise grouping ("1.234")
+        decimals = len(number) - number.rfind(separator) - 1
+        decimal = separator if number.count(separator) == 1 and decimals in (1, 2) else None
+    else:
+        decimal = None
+
+    if decimal is None:
+        whole, fraction = re.sub(r"[.,]", "", number), ""
+    else:
+        whole, _, fraction = number.rpartition(decimal)
+        whole = re.sub(r"[.,]", "", whole)
+    cents = int(whole or "0") * 100 + int((fraction + "00")[:2])
+    return cents, currency or default_currency
+
+def parse_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = FIRST_INT.search(str(value)) if value is not None else None
+    return int(match.group()) if match else None
+
+def count_in_details(details: list, words) -> int:
+    for detail in details or []:
+        text = (detail or "").lower()
+        if any(word in text for word in words):
+            return parse_int(text)
+    return None
+
+def from_hertz(car: dict, search_key: str = "") -> Quote:
+    price_cents, currency = parse_price(car.get("price"), car.get("currency") or "EUR")
+    return Quote(
+        company="Hertz",
+        name=car.get("name") or "Unknown",
+        category=car.get("category") or "Unknown",
+        passengers=parse_int(car.get("passengers")),
+        suitcases=parse_int(car.get("suitcases")),
+        price_cents=price_cents,
+        currency=currency,
+        payment_type="",
+        search_key=search_key,
+    )
+
+def from_avis(vehicle: dict, search_key: str = "") -> list:
+    # One quote per payment type the card offers
+    details = vehicle.get("details")
+    # 0 is a real count, only a missing one falls back to the feature list
+    passengers = parse_int(vehicle.get("passengers"))
+    if passengers is None:
+        passengers = count_in_details(details, PASSENGER_WORDS)
+    suitcases = parse_int(vehicle.get("suitcases"))
+    if suitcases is None:
+        suitcases = count_in_details(details, SUITCASE_WORDS)
+
+    quotes = []
+    for payment_type, key in (("pay_online", "price_pay_online"), ("pay_collection", "price_pay_collection")):
+        price_cents, currency = parse_price(vehicle.get(key))
+        if price_cents is None:
+            continue
+        quotes.append(Quote("Avis", vehicle.get("name") or "Unknown", vehicle.get("category") or "Unknown",
+                            passengers, suitcases, price_cents, currency, payment_type, search_key))
+    if not quotes:
+        price_cents, currency = parse_price(vehicle.get("price"), vehicle.get("currency") or "EUR")
+        quotes.append(Quote("Avis", vehicle.get("name") or "Unknown", vehicle.get("category") or "Unknown",
+                            passengers, suitcases, price_cents, currency, "", search_key))
+    return quotes
+
+def to_quotes(company: str, results: list, search_key: str = "") -> list:
+    quotes = []
+    for result in results or []:
+        if isinstance(result, Quote):
+            quotes.append(result)
+        elif company == "Avis":
+            quotes.extend(from_avis(result, search_key))
+        else:
+            quote = from_hertz(result, search_key)
+            quote.company = company
+            quotes.append(quote)
+    return quotes
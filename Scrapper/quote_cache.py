@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from sys_msg import system_message
+
+def search_key(company: str, country: str, city: str, pickup_datetime: datetime, dropoff_datetime: datetime,
+               pickup_location: str = None, dropoff_location: str = None) -> str:
+    # Normalized search tuple, identical searches map to the same key
+    def normalize(value):
+        return " ".join((value or "").split()).lower()
+
+    return "|".join([
+        normalize(company),
+        normalize(country),
+        normalize(city),
+        normalize(pickup_location),
+        normalize(dropoff_location),
+        pickup_datetime.strftime("%Y-%m-%dT%H:%M"),
+        dropoff_datetime.strftime("%Y-%m-%dT%H:%M"),
+    ])
+
+class QuoteCache:
+    def __init__(self, path: str = "quote_cache.sqlite3", ttl: float = 3600, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # Searches currently being scraped, shared by concurrent callers
+        self.in_flight = {}
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Worker processes share the file, WAL lets readers run next to the writer and timeout waits out the lock
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS quotes (
+                key TEXT PRIMARY KEY,
+                results TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS quotes_accessed_at ON quotes (accessed_at)")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, key: str):
+        now = time.time()
+        row = self.connection.execute("SELECT results, created_at FROM quotes WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        results, created_at = row
+        if now - created_at > self.ttl:
+            self.connection.execute("DELETE FROM quotes WHERE key = ?", (key,))
+            self.connection.commit()
+            self.misses += 1
+            return None
+
+        self.connection.execute("UPDATE quotes SET accessed_at = ? WHERE key = ?", (now, key))
+        self.connection.commit()
+        self.hits += 1
+        return json.loads(results)
+
+    def put(self, key: str, results: list):
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO quotes (key, results, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(results, default=str), now, now),
+        )
+        self._evict(now)
+        self.connection.commit()
+
+    def _evict(self, now: float):
+        # Expired entries first, then the least recently used ones above max_entries
+        expired = self.connection.execute("DELETE FROM quotes WHERE created_at < ?", (now - self.ttl,)).rowcount
+        overflow = self.connection.execute("""
+            DELETE FROM quotes WHERE key IN (
+                SELECT key FROM quotes ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,)).rowcount
+        self.evictions += expired + overflow
+
+    async def get_or_fetch(self, key: str, fetch):
+        # Serve from the cache, join an identical search in flight or run fetch() and write through
+        cached = self.get(key)
+        if cached is not None:
+            print(f"{system_message('I')} Quote cache hit for {key}")
+            return cached
+
+        entry = self.in_flight.get(key)
+        if entry is not None:
+            self.coalesced += 1
+            print(f"{system_message('I')} Joining in-flight search for {key}")
+        else:
+            async def fetch_and_store():
+                results = await fetch()
+                if results:
+                    self.put(key, results)
+                return results
+
+            entry = self.in_flight[key] = {"task": asyncio.ensure_future(fetch_and_store()), "waiters": 0}
+            entry["task"].add_done_callback(
+                lambda _: self.in_flight.pop(key) if self.in_flight.get(key) is entry else None)
+
+        # Every caller shares the search, which is cancelled once the last one goes away (e.g. its deadline)
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                entry["task"].cancel()
+
+    def stats(self) -> dict:
+        entries = self.connection.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "entries": entries,
+        }
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import json
+import signal
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+from browser_pool import BrowserPool
+from concurrency import ConcurrencyController
+from location_catalog import LocationCatalog
+from metrics import default_recorder
+from network_filter import NetworkFilter
+from orchestrator import SearchRequest, default_orchestrator, request_key
+from quote import to_quotes
+from quote_cache import QuoteCache
+from safeguards import SafeGuards
+from session_store import SessionStore
+from sys_msg import system_message
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+MAX_BODY = 64 * 1024
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: dict = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+def parse_datetime(value: str, field: str) -> datetime:
+    # ISO 8601 or the DD/MM/YYYY HH:MM used by main.py
+    for parse in (datetime.fromisoformat, lambda text: datetime.strptime(text, "%d/%m/%Y %H:%M")):
+        try:
+            return parse(value)
+        except (TypeError, ValueError):
+            pass
+    raise HttpError(400, f"Invalid {field}: {value!r}. Expected ISO 8601 or DD/MM/YYYY HH:MM.")
+
+def parse_search(params: dict, registered: list):
+    # JSON body or query string -> (SearchRequest, valid companies, {rejected company: reason})
+    missing = [field for field in ("country", "city", "pickup_location", "pickup_datetime", "dropoff_datetime")
+               if not params.get(field)]
+    if missing:
+        # Locations are asked interactively when missing, which a service can not do
+        raise HttpError(400, f"Missing {', '.join(missing)}")
+    different_drop_off = str(params.get("different_drop_off", "")).lower() in ("1", "true", "yes")
+    if different_drop_off and not params.get("dropoff_location"):
+        raise HttpError(400, "Missing dropoff_location")
+
+    companies = params.get("companies") or registered
+    if isinstance(companies, str):
+        companies = [company.strip() for company in companies.split(",") if company.strip()]
+    unknown = [company for company in companies if company not in registered]
+    if unknown:
+        raise HttpError(400, f"No scraper registered for {', '.join(unknown)}")
+
+    request = SearchRequest(params["country"], params["city"],
+                            parse_datetime(params["pickup_datetime"], "pickup_datetime"),
+                            parse_datetime(params["dropoff_datetime"], "dropoff_datetime"),
+                            different_drop_off=different_drop_off, pickup_location=params["pickup_location"],
+                            dropoff_location=params.get("dropoff_location") if different_drop_off else None)
+    # check() only returns the verdicts, the per-company lines are printed by the CLI's safeguard()
+    valid, reasons = SafeGuards(companies, request.pickup_datetime, request.dropoff_datetime).check()
+    rejected = {company: reason for company, ok, reason in zip(companies, valid, reasons) if not ok}
+    if len(rejected) == len(companies):
+        raise HttpError(400, "; ".join(f"{company}: {reason}" for company, reason in rejected.items()))
+    return request, [company for company in companies if company not in rejected], rejected
+
+class SearchFailed(Exception):
+    # A queued search that ended without results, carries its outcome to every caller sharing it
+    def __init__(self, outcome: dict):
+        super().__init__(outcome["error"])
+        self.outcome = outcome
+
+class QuoteService:
+    # Long-running quote lookups: cache first, identical searches coalesced, misses queued for the warm pool
+    def __init__(self, orchestrator, cache: QuoteCache, workers: int = 2, queue_size: int = 32,
+                 controller: ConcurrencyController = None):
+        self.orchestrator = orchestrator
+        self.cache = cache
+        self.controller = controller
+        self.workers = workers
+        # Bounded, a full queue answers 429 instead of piling up scrapes
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Search key -> future of the outcome, shared by every caller asking for the same search
+        self.in_flight = {}
+        self.tasks = []
+        self.stopping = False
+        self.started_at = time.time()
+
+        # Counters
+        self.requests = 0
+        self.hits = 0
+        self.coalesced = 0
+        self.scrapes = 0
+        self.rejected = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Requests still being read after this fail fast instead of queueing for no worker
+        self.stopping = True
+        # Taken first, a cancelled worker drops its search from in_flight
+        futures = list(self.in_flight.values())
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for future in futures:
+            if not future.done():
+                future.set_exception(HttpError(503, "Service is shutting down"))
+
+    async def work(self):
+        while True:
+            key, company, request, future = await self.queue.get()
+            try:
+                if self.controller is not None:
+                    async with self.controller.permit(company):
+                        outcomes = await self.orchestrator.search(request, [company])
+                else:
+                    outcomes = await self.orchestrator.search(request, [company])
+                self.scrapes += 1
+                if not future.done():
+                    future.set_result(outcomes[0])
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.in_flight.pop(key, None)
+                self.queue.task_done()
+
+    def submit(self, company: str, request: SearchRequest) -> asyncio.Future:
+        if self.stopping:
+            raise HttpError(503, "Service is shutting down")
+        key = request_key(company, request)
+        if key in self.in_flight:
+            self.coalesced += 1
+            return self.in_flight[key]
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((key, company, request, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HttpError(429, f"Too many searches queued ({self.queue.maxsize}), retry later",
+                            {"Retry-After": "30"})
+        self.in_flight[key] = future
+        return future
+
+    async def lookup(self, company: str, request: SearchRequest) -> dict:
+        # The one pass through the cache: a hit, an identical search in flight, or a queued scrape written through
+        key = request_key(company, request)
+        scraped = {}
+
+        async def fetch():
+            # shield: the cache cancelling its fetch must not cancel a search other callers are waiting for
+            scraped.update(await asyncio.shield(self.submit(company, request)))
+            if scraped["status"] != "ok":
+                raise SearchFailed(scraped)
+            return scraped["results"]
+
+        joining = key in self.cache.in_flight
+        results = await self.cache.get_or_fetch(key, fetch)
+        if scraped:
+            return dict(scraped, cached=False)
+        if joining:
+            self.coalesced += 1
+        else:
+            self.hits += 1
+        return {"company": company, "status": "ok", "results": results, "quotes": to_quotes(company, results, key),
+                "error": None, "cached": not joining}
+
+    async def quote(self, request: SearchRequest, companies: list) -> list:
+        self.requests += 1
+        results = await asyncio.gather(*(self.lookup(company, request) for company in companies),
+                                       return_exceptions=True)
+        # Shutting down, or every search turned away: the whole request fails so the client retries it
+        for result in results:
+            if isinstance(result, HttpError) and result.status != 429:
+                raise result
+        if all(isinstance(result, HttpError) for result in results):
+            raise results[0]
+
+        outcomes = []
+        for company, result in zip(companies, results):
+            if isinstance(result, SearchFailed):
+                result = dict(result.outcome, cached=False)
+            elif isinstance(result, HttpError):
+                # Searches already queued for this request still run for the callers sharing them
+                result = {"company": company, "status": "rejected", "results": [], "quotes": [],
+                          "error": "Queue full", "cached": False}
+            elif isinstance(result, Exception):
+                result = {"company": company, "status": "error", "results": [], "quotes": [], "error": str(result),
+                          "cached": False}
+            outcomes.append(result)
+        return outcomes
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "uptime": round(time.time() - self.started_at, 1),
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "in_flight": len(self.in_flight),
+            "workers": sum(not task.done() for task in self.tasks),
+            "cache": self.cache.stats(),
+            "limits": self.controller.stats() if self.controller is not None else {},
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [default_recorder.to_prometheus().rstrip("\n")]
+        for metric, kind, value, help_text in (
+            ("quote_service_requests_total", "counter", self.requests, "Search requests answered."),
+            ("quote_service_cache_hits_total", "counter", self.hits, "Company searches served from the cache."),
+            ("quote_service_coalesced_total", "counter", self.coalesced,
+             "Company searches that joined an identical search in flight."),
+            ("quote_service_scrapes_total", "counter", self.scrapes, "Company searches scraped."),
+            ("quote_service_rejected_total", "counter", self.rejected, "Company searches rejected, queue full."),
+            ("quote_service_queue_depth", "gauge", self.queue.qsize(), "Company searches waiting for a browser."),
+            ("quote_service_in_flight", "gauge", len(self.in_flight), "Company searches queued or running."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def route(self, method: str, target: str, body: bytes):
+        # -> (status, content type, payload)
+        url = urlsplit(target)
+        if url.path == "/healthz":
+            return 200, "application/json", self.health()
+        if url.path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.to_prometheus()
+        if url.path != "/search":
+            raise HttpError(404, f"No route for {url.path}")
+
+        if method == "GET":
+            params = dict(parse_qsl(url.query))
+        elif method == "POST":
+            try:
+                params = json.loads(body or b"{}")
+            except ValueError:
+                raise HttpError(400, "Body is not valid JSON")
+            if not isinstance(params, dict):
+                raise HttpError(400, "Body must be a JSON object")
+        else:
+            raise HttpError(405, f"{method} not allowed on /search", {"Allow": "GET, POST"})
+
+        request, companies, rejected = parse_search(params, list(self.orchestrator.scrapers))
+        outcomes = await self.quote(request, companies)
+        # Companies whose booking rules reject the search are answered without scraping
+        outcomes += [{"company": company, "status": "rejected", "error": reason, "cached": False, "quotes": []}
+                     for company, reason in rejected.items()]
+        return 200, "application/json", {
+            "request": {"country": request.country, "city": request.city,
+                        "pickup_location": request.pickup_location, "dropoff_location": request.dropoff_location,
+                        "pickup_datetime": request.pickup_datetime, "dropoff_datetime": request.dropoff_datetime},
+            "outcomes": [{
+                "company": outcome["company"],
+                "status": outcome["status"],
+                "error": outcome["error"],
+                "cached": outcome["cached"],
+                "quotes": [quote.to_dict() for quote in outcome["quotes"]],
+            } for outcome in outcomes],
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One request per connection, enough for local tools and curl
+        headers = {}
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=30)
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ValueError):
+                raise HttpError(400, "Malformed HTTP request")
+            if length > MAX_BODY:
+                raise HttpError(413, f"Body larger than {MAX_BODY} bytes")
+            body = await reader.readexactly(length) if length else b""
+            status, content_type, payload = await self.route(method.upper(), target, body)
+            extra = {}
+        except HttpError as e:
+            status, content_type, payload, extra = e.status, "application/json", {"error": str(e)}, e.headers
+        except Exception as e:
+            print(f"{system_message('E')} Quote service: {e}")
+            status, content_type, payload, extra = 500, "application/json", {"error": str(e)}, {}
+
+        if not isinstance(payload, str):
+            payload = json.dumps(payload, default=str, ensure_ascii=False)
+        data = payload.encode("utf-8")
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}", f"Content-Type: {content_type}; charset=utf-8",
+                 f"Content-Length: {len(data)}", "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def serve(host: str = "127.0.0.1", port: int = 8080, concurrency: int = 2, queue_size: int = 32,
+                deadline: float = 180, headless: bool = True):
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+
+    cache = QuoteCache()
+    controller = ConcurrencyController(max_limit=concurrency)
+    # The browsers stay up between requests, only the first search of each slot pays for a launch
+    async with BrowserPool(size=concurrency, headless=headless, network_filter=NetworkFilter(),
+                           sessions=SessionStore(), controller=controller) as pool:
+        # No cache for the scrapers, the service looks every search up once itself and writes the results through
+        orchestrator = default_orchestrator(deadline=deadline, pool=pool, catalog=LocationCatalog())
+        service = QuoteService(orchestrator, cache, workers=concurrency, queue_size=queue_size,
+                               controller=controller)
+        service.start()
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"{system_message('S')} Quote service listening on http://{host}:{port}")
+        async with server:
+            await stopping.wait()
+            print(f"{system_message('I')} Quote service stopping...")
+            # Stop listening, then answer the waiting handlers 503: on 3.12+ closing the server waits for them
+            server.close()
+            await service.stop()
+    controller.close()
+    cache.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve car rental quotes over HTTP on this machine")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=2, help="Browsers, and searches scraped at once")
+    parser.add_argument("--queue-size", type=int, default=32, help="Searches waiting before answering 429")
+    parser.add_argument("--deadline", type=float, default=180, help="Seconds allowed per search")
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.concurrency, args.queue_size, args.deadline, not args.headed))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import asyncio
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+from datetime import date, datetime
+import numpy as np
+from comparison import QuoteFrame, parse_search_key
+from quote import Quote
+from sys_msg import system_message
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Column -> numpy dtype, strings are dictionary encoded on disk, -1 marks a missing number
+SCHEMA = {
+    "company": "str",
+    "name": "str",
+    "category": "str",
+    "passengers": "int32",
+    "suitcases": "int32",
+    "price_cents": "int64",
+    "currency": "str",
+    "payment_type": "str",
+    "location": "str",  # country/city/location of the search
+    "pickup_day": "int32",  # Days since 1970-01-01
+    "rental_days": "int32",
+    "scraped_at": "int64",  # Unix seconds
+    "search_key": "str",
+}
+
+MAGIC = b"QCOL1\n"
+
+# The columns QuoteFrame.from_columns reads
+FRAME_COLUMNS = ["company", "name", "category", "location", "payment_type", "price_cents", "pickup_day",
+                 "rental_days"]
+
+def as_set(value):
+    if value is None:
+        return None
+    return {value} if isinstance(value, str) else set(value)
+
+def number(value: int) -> int:
+    # -1 marks a missing number on disk
+    return None if value < 0 else value
+
+def as_day(value) -> int:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - date(1970, 1, 1)).days
+
+def to_columns(quotes: list, scraped_at: float) -> dict:
+    keys = {}
+    rows = {name: [] for name in SCHEMA}
+    for quote in quotes:
+        if quote.search_key not in keys:
+            location, pickup, days = parse_search_key(quote.search_key)
+            keys[quote.search_key] = (location, -1 if np.isnat(pickup) else int(pickup.astype(np.int64)), days)
+        location, pickup_day, rental_days = keys[quote.search_key]
+        rows["company"].append(quote.company or "")
+        rows["name"].append(quote.name or "")
+        rows["category"].append(quote.category or "")
+        rows["passengers"].append(-1 if quote.passengers is None else quote.passengers)
+        rows["suitcases"].append(-1 if quote.suitcases is None else quote.suitcases)
+        rows["price_cents"].append(-1 if quote.price_cents is None else quote.price_cents)
+        rows["currency"].append(quote.currency or "")
+        rows["payment_type"].append(quote.payment_type or "")
+        rows["location"].append(location)
+        rows["pickup_day"].append(pickup_day)
+        rows["rental_days"].append(rental_days)
+        rows["scraped_at"].append(int(scraped_at))
+        rows["search_key"].append(quote.search_key or "")
+    return {name: np.array(values, dtype=object if SCHEMA[name] == "str" else SCHEMA[name])
+            for name, values in rows.items()}
+
+def write_qcol(path: str, columns: dict):
+    # MAGIC | header length (uint64) | JSON header | data, every column 8-byte aligned
+    rows = len(columns["company"])
+    header = {"rows": rows, "columns": {}, "stats": {}}
+    blobs = []
+    offset = 0
+    for name, values in columns.items():
+        entry = {}
+        if SCHEMA[name] == "str":
+            dictionary, codes = np.unique(values.astype(str), return_inverse=True)
+            entry["dictionary"] = dictionary.tolist()
+            values = codes.astype(np.int32)
+        values = np.ascontiguousarray(values.astype(values.dtype.newbyteorder("<")))
+        entry.update(dtype=values.dtype.str, offset=offset)
+        header["columns"][name] = entry
+        blobs.append(values.tobytes())
+        offset += -(-values.nbytes // 8) * 8
+    # Lets scans skip the whole file
+    header["stats"]["pickup_day"] = [int(columns["pickup_day"].min()), int(columns["pickup_day"].max())]
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(MAGIC)
+        output.write(np.uint64(len(header_bytes)).tobytes())
+        output.write(header_bytes)
+        output.write(b"\0" * (-output.tell() % 8))
+        for blob in blobs:
+            output.write(blob)
+            output.write(b"\0" * (-len(blob) % 8))
+    os.replace(temporary, path)
+
+def read_qcol(path: str, filters: dict, columns: list):
+    # -> (columns, dictionaries), string columns stay codes into their file's dictionary
+    with open(path, "rb") as source, mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a quote store file")
+        # Slices copy, so nothing points into the mapping until the views below
+        header_length = int.from_bytes(mapped[len(MAGIC):len(MAGIC) + 8], "little")
+        header_end = len(MAGIC) + 8 + header_length
+        header = json.loads(mapped[len(MAGIC) + 8:header_end])
+        data_start = header_end + (-header_end % 8)
+        rows = header["rows"]
+
+        # Prune on the header alone: the stats and the string dictionaries
+        low, high = header["stats"]["pickup_day"]
+        if (filters.get("pickup_from") is not None and high < filters["pickup_from"]) or \
+                (filters.get("pickup_to") is not None and low > filters["pickup_to"]):
+            return None
+        wanted_codes = {}
+        for name in ("company", "category", "location"):
+            wanted = filters.get(name)
+            if wanted is None:
+                continue
+            dictionary = header["columns"][name]["dictionary"]
+            wanted_codes[name] = [code for code, label in enumerate(dictionary) if label in wanted]
+            if not wanted_codes[name]:
+                return None
+
+        views = {}
+        def view(name):
+            if name not in views:
+                entry = header["columns"][name]
+                views[name] = np.frombuffer(mapped, np.dtype(entry["dtype"]), rows, data_start + entry["offset"])
+            return views[name]
+
+        try:
+            mask = np.ones(rows, dtype=bool)
+            for name, codes in wanted_codes.items():
+                mask &= np.isin(view(name), codes)
+            if filters.get("pickup_from") is not None:
+                mask &= view("pickup_day") >= filters["pickup_from"]
+            if filters.get("pickup_to") is not None:
+                mask &= view("pickup_day") <= filters["pickup_to"]
+
+            result = {name: view(name)[mask] for name in columns}  # Copies out of the mapping
+            dictionaries = {name: header["columns"][name]["dictionary"] for name in columns
+                            if "dictionary" in header["columns"][name]}
+            return result, dictionaries
+        finally:
+            # The mapping can only close once no array points into it
+            views.clear()
+
+def read_parquet(path: str, filters: dict, columns: list):
+    # -> (columns, {}), string columns come back decoded
+    expressions = []
+    for name in ("company", "category", "location"):
+        if filters.get(name) is not None:
+            expressions.append((name, "in", sorted(filters[name])))
+    if filters.get("pickup_from") is not None:
+        expressions.append(("pickup_day", ">=", filters["pickup_from"]))
+    if filters.get("pickup_to") is not None:
+        expressions.append(("pickup_day", "<=", filters["pickup_to"]))
+    table = pq.read_table(path, columns=columns, filters=expressions or None, memory_map=True)
+    if table.num_rows == 0:
+        return None
+    return {name: table.column(name).to_numpy(zero_copy_only=False).astype(
+                object if SCHEMA[name] == "str" else SCHEMA[name]) for name in columns}, {}
+
+class QuoteStore:
+    # Append-only quotes, partitioned as <root>/company=<company>/date=<scrape date>/part-*.parquet|qcol
+    def __init__(self, root: str = "quote_store", file_format: str = None, batch_size: int = 1000):
+        if file_format is None:
+            file_format = "parquet" if pq is not None else "qcol"
+        if file_format == "parquet" and pq is None:
+            raise ValueError("Parquet needs pyarrow, install it or use file_format='qcol'")
+        if file_format not in ("parquet", "qcol"):
+            raise ValueError(f"Unknown quote store format: {file_format}. Expected 'parquet' or 'qcol'.")
+        self.root = root
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.pending = []
+        self.lock = threading.Lock()
+        self.parts = 0
+        os.makedirs(root, exist_ok=True)
+
+    def append(self, quotes: list):
+        # Buffer quotes, writing a part file whenever a batch is full
+        with self.lock:
+            self.pending.extend(quotes)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            quotes, self.pending = self.pending, []
+        if not quotes:
+            return
+        scraped_at = time.time()
+        scrape_date = datetime.fromtimestamp(scraped_at).strftime("%Y-%m-%d")
+        by_company = {}
+        for quote in quotes:
+            by_company.setdefault(quote.company, []).append(quote)
+
+        for company, company_quotes in by_company.items():
+            directory = os.path.join(self.root, f"company={company}", f"date={scrape_date}")
+            os.makedirs(directory, exist_ok=True)
+            with self.lock:
+                self.parts += 1
+                part = self.parts
+            path = os.path.join(directory, f"part-{int(scraped_at * 1000)}-{os.getpid()}-{part}.{self.file_format}")
+            columns = to_columns(company_quotes, scraped_at)
+            if self.file_format == "parquet":
+                table = pa.table({name: values.tolist() if SCHEMA[name] == "str" else values
+                                  for name, values in columns.items()})
+                pq.write_table(table, f"{path}.tmp", compression="zstd")
+                os.replace(f"{path}.tmp", path)
+            else:
+                write_qcol(path, columns)
+        print(f"{system_message('I')} Stored {len(quotes)} quotes in {self.root}")
+
+    # Disk writes run in a worker thread so the scrapers' event loop keeps going
+    async def append_async(self, quotes: list):
+        await asyncio.to_thread(self.append, quotes)
+
+    async def flush_async(self):
+        await asyncio.to_thread(self.flush)
+
+    def files(self, companies: set = None) -> list:
+        # Company partitions are pruned by directory name before any file is opened
+        pattern = os.path.join(self.root, "company=*", "date=*", "part-*")
+        paths = []
+        for path in sorted(glob.glob(pattern)):
+            if path.endswith(".tmp"):
+                continue
+            company = os.path.basename(os.path.dirname(os.path.dirname(path)))[len("company="):]
+            if companies is None or company in companies:
+                paths.append(path)
+        return paths
+
+    def _read_parts(self, company, category, location, pickup_from, pickup_to, columns) -> list:
+        # (columns, dictionaries) of every part file with matching rows
+        filters = {
+            "company": as_set(company),
+            "category": as_set(category),
+            "location": as_set(location),
+            "pickup_from": as_day(pickup_from),
+            "pickup_to": as_day(pickup_to),
+        }
+        parts = []
+        for path in self.files(filters["company"]):
+            reader = read_parquet if path.endswith(".parquet") else read_qcol
+            part = reader(path, filters, columns)
+            if part is not None:
+                parts.append(part)
+        return parts
+
+    def scan(self, company=None, category=None, location=None, pickup_from: date = None, pickup_to: date = None,
+             columns: list = None) -> dict:
+        # Matching rows as numpy columns, strings decoded, pickup_day converted to datetime64[D]
+        columns = columns or list(SCHEMA)
+        parts = self._read_parts(company, category, location, pickup_from, pickup_to, columns)
+        result = {}
+        for name in columns:
+            dtype = object if SCHEMA[name] == "str" else SCHEMA[name]
+            chunks = [np.array(dictionaries[name], dtype=object)[part[name]] if name in dictionaries else part[name]
+                      for part, dictionaries in parts]
+            result[name] = np.concatenate(chunks) if chunks else np.array([], dtype=dtype)
+        if "pickup_day" in result:
+            result["pickup_day"] = result["pickup_day"].astype("datetime64[D]")
+        return result
+
+    def scan_codes(self, company=None, category=None, location=None, pickup_from: date = None,
+                   pickup_to: date = None, columns: list = None):
+        # Like scan(), but string columns stay int32 codes: (columns, {column: labels of its codes})
+        columns = columns or list(SCHEMA)
+        parts = self._read_parts(company, category, location, pickup_from, pickup_to, columns)
+        result, labels = {}, {}
+        for name in columns:
+            if SCHEMA[name] != "str":
+                chunks = [part[name] for part, _ in parts]
+                result[name] = np.concatenate(chunks) if chunks else np.array([], dtype=SCHEMA[name])
+                continue
+            # Each file's small dictionary is remapped onto one shared for the whole scan
+            merged = {}
+            chunks = []
+            for part, dictionaries in parts:
+                if name in dictionaries:
+                    dictionary, codes = dictionaries[name], part[name]
+                else:
+                    dictionary, codes = np.unique(part[name].astype(str), return_inverse=True)
+                    dictionary = dictionary.tolist()
+                lookup = np.array([merged.setdefault(label, len(merged)) for label in dictionary], dtype=np.int32)
+                chunks.append(lookup[codes.reshape(-1)])
+            result[name] = np.concatenate(chunks) if chunks else np.array([], dtype=np.int32)
+            labels[name] = list(merged)
+        if "pickup_day" in result:
+            result["pickup_day"] = result["pickup_day"].astype("datetime64[D]")
+        return result, labels
+
+    def frame(self, vocabulary=None, index=None, **filters):
+        # The matching rows as a comparison.QuoteFrame, without decoding a string per row
+        columns, labels = self.scan_codes(columns=FRAME_COLUMNS, **filters)
+        return QuoteFrame.from_columns(columns, labels, vocabulary, index)
+
+    def read_quotes(self, **filters) -> list:
+        # Scan results back as Quote records, comparisons should use frame() instead
+        columns = self.scan(**filters)
+        names = ("company", "name", "category", "passengers", "suitcases", "price_cents", "currency",
+                 "payment_type", "search_key")
+        return [Quote(company, name, category, number(passengers), number(suitcases), number(price_cents),
+                      currency or None, payment_type, key)
+                for company, name, category, passengers, suitcases, price_cents, currency, payment_type, key
+                in zip(*(columns[name].tolist() for name in names))]
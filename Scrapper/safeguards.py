@@ -1,69 +1,90 @@
-import asyncio
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import numpy as np
 from sys_msg import system_message
 
+@dataclass(frozen=True)
+class CompanyRules:
+    minute_step: int = 15  # Times the pickers offer, in minutes past the hour
+    min_lead: timedelta = timedelta(0)  # How long after now the earliest pick-up is
+    max_rental_days: int = 90
+
+# Per-company booking rules, DEFAULT_RULES for companies without an entry
+COMPANY_RULES = {
+    "Hertz": CompanyRules(minute_step=15),
+    "Avis": CompanyRules(minute_step=30),  # The Avis timepicker lists half hours
+}
+DEFAULT_RULES = CompanyRules()
+
+def to_minutes(datetimes):
+    # datetimes (list of datetime or datetime64 array) -> (datetime64[m], mask of rows the cast truncated)
+    exact = np.asarray(datetimes, dtype="datetime64[us]")
+    minutes = exact.astype("datetime64[m]")
+    return minutes, ~np.isnat(exact) & (exact != minutes)
+
+def validate_batch(company: str, pickup_datetimes, dropoff_datetimes, now: datetime = None,
+                   rules: CompanyRules = None):
+    # Check many searches of one company at once: (mask of valid rows, reason per row, "" when valid)
+    rules = rules or COMPANY_RULES.get(company, DEFAULT_RULES)
+    pickups, pickup_seconds = to_minutes(pickup_datetimes)
+    dropoffs, dropoff_seconds = to_minutes(dropoff_datetimes)
+    if pickups.shape != dropoffs.shape:
+        raise ValueError(f"Got {len(pickups)} pick-ups but {len(dropoffs)} drop-offs")
+
+    # One "now" for the whole batch
+    earliest = np.datetime64(now or datetime.now(), "m") + np.timedelta64(rules.min_lead)
+    rental = dropoffs - pickups
+    missing = np.isnat(pickups) | np.isnat(dropoffs)
+
+    checks = [
+        (missing, "Missing date"),
+        # The pickers only offer whole minutes, the minute checks below would not see 10:30:45
+        (pickup_seconds, "Pick-Up: seconds must be 0"),
+        (dropoff_seconds, "Drop-Off: seconds must be 0"),
+        (~missing & (pickups.astype(np.int64) % 60 % rules.minute_step != 0),
+         f"Pick-Up: minutes must be a multiple of {rules.minute_step}"),
+        (~missing & (dropoffs.astype(np.int64) % 60 % rules.minute_step != 0),
+         f"Drop-Off: minutes must be a multiple of {rules.minute_step}"),
+        (~missing & (pickups < earliest), f"Pick-Up: must not be before {earliest.astype(datetime):%d/%m/%Y %H:%M}"),
+        (~missing & (rental <= np.timedelta64(0, "m")), "Drop-Off: must be after Pick-Up"),
+        (~missing & (rental > np.timedelta64(rules.max_rental_days, "D")),
+         f"Rental longer than {rules.max_rental_days} days"),
+    ]
+
+    valid = np.ones(pickups.shape, dtype=bool)
+    reasons = np.full(pickups.shape, "", dtype=object)
+    for failed, reason in checks:
+        if not failed.any():
+            continue
+        # Rows failing several checks list every reason
+        reasons[failed] = np.where(reasons[failed] == "", reason, reasons[failed] + "; " + reason)
+        valid &= ~failed
+    return valid, reasons
+
 class SafeGuards:
     def __init__(self, companies_list: list, pickup_datetime: datetime, dropoff_datetime: datetime):
         self.companies_list = companies_list
         self.pickup_datetime = pickup_datetime
         self.dropoff_datetime = dropoff_datetime
-    
-    async def _validate_time(self, time_datetime: datetime, label: str, company: str):
-        print(f"{system_message('I')} Validating {label} Time for {company}")
-        
-        # Validate time format HH:MM with allowed values.
-        try:
-            hour = time_datetime.hour
-            minute = time_datetime.minute
-        except ValueError:
-            raise ValueError(f"{label}: Invalid format '{time_datetime}'. Expected HH:MM.")
-
-        # Validate Time
-        allowed_minutes = [00, 15, 30, 45]
-        current_datetime = datetime.now()
-        if (time_datetime.time() < current_datetime.time() and time_datetime.date() == current_datetime.date()):
-            for cur_minute in allowed_minutes:
-                if (cur_minute > current_datetime.minute):
-                    raise ValueError(f"{label}: Invalid time {time_datetime.hour}:{time_datetime.minute}. Time must at least be {current_datetime.hour}:{cur_minute}")
-                    break
-                
-        print(f"{system_message('S')} Valid {label} Time")
 
-        # Validate Hour
-        if not (isinstance(hour, (int))) or not (0 <= int(hour) <= 23):
-            raise ValueError(f"{label}: Invalid hour '{hour}'. Must be between 00 and 23.")
+    def check(self, now: datetime = None):
+        # The search against every company's rules: (mask of valid companies, reason per company, "" when valid)
+        now = now or datetime.now()
+        valid = np.ones(len(self.companies_list), dtype=bool)
+        reasons = np.full(len(self.companies_list), "", dtype=object)
+        for index, company in enumerate(self.companies_list):
+            company_valid, company_reasons = validate_batch(company, [self.pickup_datetime],
+                                                            [self.dropoff_datetime], now)
+            valid[index], reasons[index] = company_valid[0], company_reasons[0]
+        return valid, reasons
 
-        # Validate Minute
-        if minute not in allowed_minutes:
-            raise ValueError(f"{label}: Invalid minute '{minute}'. Must be one of {sorted(allowed_minutes)}.")
-        
-    async def _validate_date(self, time_datetime: datetime, label: str, company: str):
-        print(f"{system_message('I')} Validating {label} Date for {company}")
-        
-        # Validate time format HH:MM with allowed values.
-        try:
-            day = time_datetime.day
-            month = time_datetime.month
-            year = time_datetime.year
-        except ValueError:
-            raise ValueError(f"{label}: Invalid format '{time_datetime}'. Expected DD/MM/YYYY.")
-        
-        # Validate Day
-        current_datetime = datetime.now()
-        today = current_datetime.date()
-        if (time_datetime.date() < today):
-            raise ValueError(f"{label}: Invalid date '{day}/{month}/{year}'. Date must be greater or equal to {today.day}/{today.month}/{today.year}")
-        
-        print(f"{system_message('S')} Valid {label} Date")
-        
-    async def safeguard(self):
-        for company in self.companies_list:
-            # Validate Hertz
-            if (company == "Hertz"):
-                # Validate Time
-                await self._validate_time(self.pickup_datetime, "Pick-Up", company)
-                await self._validate_time(self.dropoff_datetime, "Drop-Off", company)
-                
-                # # Validate Date
-                await self._validate_date(self.pickup_datetime, "Pick-Up", company)
-                await self._validate_date(self.dropoff_datetime, "Drop-Off", company)
\ No newline at end of file
+    def safeguard(self) -> list:
+        # Companies the search is valid for, the others are reported and left out
+        valid, reasons = self.check()
+        for company, ok, reason in zip(self.companies_list, valid, reasons):
+            if ok:
+                print(f"{system_message('S')} Valid Pick-Up/Drop-Off for {company}")
+            else:
+                print(f"{system_message('E')} Skipping {company}: {reason} "
+                      f"(Pick-Up {self.pickup_datetime:%d/%m/%Y %H:%M}, Drop-Off {self.dropoff_datetime:%d/%m/%Y %H:%M})")
+        return [company for company, ok in zip(self.companies_list, valid) if ok]
@@ -0,0 +1,92 @@
+import json
+import os
+import time
+from sys_msg import system_message
+
+# Cookies the sites set once their consent banner is answered
+CONSENT_COOKIES = {
+    "hertz": ("OptanonAlertBoxClosed", "OptanonConsent"),
+    "avis": ("CONSENTMGR",),
+}
+
+class SessionStore:
+    def __init__(self, directory: str = "sessions", ttl: float = 12 * 3600, refresh_after: float = None):
+        self.directory = directory
+        self.ttl = ttl
+        # Saved states older than this are overwritten after the next successful run
+        self.refresh_after = refresh_after if refresh_after is not None else ttl / 2
+
+        # Company -> {"saved_at", "consent", "state"} as loaded from disk
+        self.entries = {}
+        # Company -> banners dismissed since the last save
+        self.pending = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, company: str) -> str:
+        return os.path.join(self.directory, f"{company.lower()}.json")
+
+    def entry(self, company: str):
+        entry = self.entries.get(company)
+        if entry is None:
+            try:
+                with open(self.path(company), encoding="utf-8") as state_file:
+                    entry = json.load(state_file)
+            except (OSError, ValueError):
+                return None
+            self.entries[company] = entry
+
+        if time.time() - entry.get("saved_at", 0) > self.ttl:
+            print(f"{system_message('I')} Saved {company} session expired")
+            self.invalidate(company)
+            return None
+        return entry
+
+    def load(self, company: str):
+        # storage_state for new_context(), None when nothing fresh is saved
+        entry = self.entry(company)
+        return entry["state"] if entry is not None else None
+
+    def has_consent(self, company: str, banner: str = "cookies") -> bool:
+        # True when the banner was dismissed in the saved session and its cookie is still valid
+        entry = self.entry(company)
+        if entry is None or banner not in entry.get("consent", []):
+            return False
+        names = CONSENT_COOKIES.get(company.lower())
+        if banner != "cookies" or not names:
+            return True
+        now = time.time()
+        return any(cookie["name"] in names and (cookie.get("expires", -1) < 0 or cookie["expires"] > now)
+                   for cookie in entry["state"].get("cookies", []))
+
+    def record_consent(self, company: str, banner: str = "cookies"):
+        self.pending.setdefault(company, set()).add(banner)
+
+    def needs_save(self, company: str) -> bool:
+        entry = self.entry(company)
+        if entry is None or self.pending.get(company):
+            return True
+        return time.time() - entry["saved_at"] > self.refresh_after
+
+    async def save(self, context, company: str):
+        # Persist cookies and localStorage of a context after a successful run
+        state = await context.storage_state()
+        previous = self.entry(company)
+        consent = set(previous.get("consent", [])) if previous is not None else set()
+        consent |= self.pending.pop(company, set())
+        entry = {"saved_at": time.time(), "consent": sorted(consent), "state": state}
+
+        path = self.path(company)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as state_file:
+            json.dump(entry, state_file)
+        os.replace(temporary, path)
+        self.entries[company] = entry
+        print(f"{system_message('I')} Saved {company} session ({len(state.get('cookies', []))} cookies)")
+
+    def invalidate(self, company: str):
+        self.entries.pop(company, None)
+        try:
+            os.remove(self.path(company))
+        except OSError:
+            pass
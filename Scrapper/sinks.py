@@ -0,0 +1,65 @@
+import csv
+import json
+import os
+import time
+
+class NdjsonSink:
+    # Appends one JSON object per line, flushing every flush_every records or flush_interval seconds
+    def __init__(self, path: str, flush_every: int = 20, flush_interval: float = 2.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.file = open(path, "a", encoding="utf-8", newline="")
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write_record(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def write(self, record: dict):
+        self.write_record(record)
+        self.written += 1
+        self.pending += 1
+        if self.pending >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+class CsvSink(NdjsonSink):
+    # Same flushing as NdjsonSink, columns fixed by the first record unless given
+    def __init__(self, path: str, fields: list = None, flush_every: int = 20, flush_interval: float = 2.0):
+        has_header = os.path.exists(path) and os.path.getsize(path) > 0
+        super().__init__(path, flush_every, flush_interval)
+        self.fields = fields
+        self.writer = None
+        self.has_header = has_header
+
+    def write_record(self, record: dict):
+        if self.writer is None:
+            self.fields = self.fields or list(record)
+            self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction="ignore")
+            if not self.has_header:
+                self.writer.writeheader()
+        self.writer.writerow(record)
+
+def open_sink(path: str, **options):
+    # Sink picked from the file extension
+    if path.endswith(".csv"):
+        return CsvSink(path, **options)
+    return NdjsonSink(path, **options)
@@ -0,0 +1,266 @@
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from browser_pool import BrowserPool
+from concurrency import ConcurrencyController
+from location_catalog import LocationCatalog
+from metrics import default_recorder
+from network_filter import NetworkFilter
+from orchestrator import SearchRequest, default_orchestrator
+from quote_cache import QuoteCache
+from quote_store import QuoteStore
+from safeguards import validate_batch
+from session_store import SessionStore
+from sys_msg import system_message
+
+@dataclass
+class SweepSpec:
+    start_date: datetime
+    days: int
+    rental_lengths: list
+    locations: list  # (country, city, pickup location) tuples
+    companies: list
+    pickup_time: str = "10:00"
+    dropoff_time: str = None  # Same as pickup_time when not given
+    different_drop_off: bool = False
+    dropoff_location: str = None  # Required with different_drop_off, there is no one to ask
+
+@dataclass
+class SweepJob:
+    company: str
+    request: SearchRequest
+    reason: str = None
+
+def expand(spec: SweepSpec) -> list:
+    # Every pickup date x rental length x location x company
+    if spec.different_drop_off and not spec.dropoff_location:
+        raise ValueError("A different drop-off needs a dropoff location")
+    pickup_hour, pickup_minute = map(int, spec.pickup_time.split(":"))
+    dropoff_hour, dropoff_minute = map(int, (spec.dropoff_time or spec.pickup_time).split(":"))
+
+    jobs = []
+    for day in range(spec.days):
+        pickup_datetime = (spec.start_date + timedelta(days=day)).replace(
+            hour=pickup_hour, minute=pickup_minute, second=0, microsecond=0)
+        for length in spec.rental_lengths:
+            dropoff_datetime = (pickup_datetime + timedelta(days=length)).replace(
+                hour=dropoff_hour, minute=dropoff_minute)
+            for country, city, location in spec.locations:
+                request = SearchRequest(country, city, pickup_datetime, dropoff_datetime,
+                                        different_drop_off=spec.different_drop_off, pickup_location=location,
+                                        dropoff_location=spec.dropoff_location if spec.different_drop_off else None)
+                for company in spec.companies:
+                    jobs.append(SweepJob(company, request))
+    return jobs
+
+def validate(jobs: list) -> list:
+    # Drop jobs the company's booking rules reject, keeping the reason on the job (one batch per company)
+    now = datetime.now()
+    by_company = {}
+    for job in jobs:
+        by_company.setdefault(job.company, []).append(job)
+
+    accepted = set()
+    for company, company_jobs in by_company.items():
+        mask, reasons = validate_batch(company, [job.request.pickup_datetime for job in company_jobs],
+                                       [job.request.dropoff_datetime for job in company_jobs], now)
+        for job, ok, reason in zip(company_jobs, mask, reasons):
+            if ok:
+                accepted.add(id(job))
+            else:
+                job.reason = reason
+    return [job for job in jobs if id(job) in accepted]
+
+def job_record(job: SweepJob, outcome: dict) -> dict:
+    # One output line per finished job
+    return {
+        "company": job.company,
+        "country": job.request.country,
+        "city": job.request.city,
+        "location": job.request.pickup_location,
+        "dropoff_location": job.request.dropoff_location,
+        "pickup_datetime": job.request.pickup_datetime.isoformat(),
+        "dropoff_datetime": job.request.dropoff_datetime.isoformat(),
+        "status": outcome["status"],
+        "error": outcome["error"],
+        "elapsed": outcome["elapsed"],
+        "results": outcome["results"],
+    }
+
+def rejected_records(jobs: list) -> list:
+    # Output lines of the jobs validate() dropped, with the reason as the error
+    return [job_record(job, {"status": "rejected", "error": job.reason, "elapsed": 0.0, "results": []})
+            for job in jobs if job.reason]
+
+class RateLimiter:
+    def __init__(self, min_interval: float):
+        # Minimum number of seconds between two job starts on the same site
+        self.min_interval = min_interval
+        self.lock = asyncio.Lock()
+        self.last_start = 0.0
+
+    async def wait(self):
+        async with self.lock:
+            delay = self.last_start + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.last_start = time.monotonic()
+
+class SweepScheduler:
+    def __init__(self, orchestrator, concurrency: int = 4, site_interval: float = 5.0,
+                 controller: ConcurrencyController = None, group_dropoffs: bool = True, store: QuoteStore = None):
+        self.orchestrator = orchestrator
+        # Every scraped quote is also appended to the columnar store when given
+        self.store = store
+        # Jobs differing only in the dropoff share one filled form (one session per group)
+        self.group_dropoffs = group_dropoffs
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.site_interval = site_interval
+        # Adapts per-site concurrency and spacing, fixed site_interval spacing when None
+        self.controller = controller
+        self.rate_limiters = {}
+        self.completed = 0
+        self.failed = 0
+
+    def rate_limiter(self, company: str) -> RateLimiter:
+        if company not in self.rate_limiters:
+            self.rate_limiters[company] = RateLimiter(self.site_interval)
+        return self.rate_limiters[company]
+
+    async def search(self, jobs: list):
+        # One outcome per job, a group of several dropoffs goes through search_dropoffs
+        company, request = jobs[0].company, jobs[0].request
+
+        async def search():
+            if len(jobs) > 1:
+                dropoffs = [job.request.dropoff_datetime for job in jobs]
+                return await self.orchestrator.search_dropoffs(request, dropoffs, company)
+            return await self.orchestrator.search(request, [company])
+
+        # The site's turn first, then a global slot: a job throttled by its site holds no slot another site could use
+        if self.controller is not None:
+            async with self.controller.permit(company):
+                async with self.semaphore:
+                    return await search()
+        await self.rate_limiter(company).wait()
+        async with self.semaphore:
+            return await search()
+
+    async def run_jobs(self, jobs: list, output):
+        outcomes = await self.search(jobs)
+        if self.store is not None:
+            await self.store.append_async([quote for outcome in outcomes for quote in outcome["quotes"]])
+
+        for job, outcome in zip(jobs, outcomes):
+            if outcome["status"] == "ok":
+                self.completed += 1
+            else:
+                self.failed += 1
+            record = job_record(job, outcome)
+
+            # Stream every finished job to disk straight away
+            output.write(json.dumps(record, default=str) + "\n")
+            output.flush()
+
+    def groups(self, jobs: list) -> list:
+        if not self.group_dropoffs:
+            return [[job] for job in jobs]
+        groups = {}
+        supported = {}
+        for job in jobs:
+            # Scrapers without quote_dropoffs would run the group one search after another in one slot
+            if job.company not in supported:
+                supported[job.company] = self.orchestrator.supports_dropoffs(job.company, job.request)
+            if not supported[job.company]:
+                groups[id(job)] = [job]
+                continue
+            key = (job.company, replace(job.request, dropoff_datetime=None))
+            groups.setdefault(repr(key), []).append(job)
+        return list(groups.values())
+
+    async def run(self, jobs: list, output_path: str):
+        started = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as output:
+            await asyncio.gather(*(self.run_jobs(group, output) for group in self.groups(jobs)))
+        if self.store is not None:
+            await self.store.flush_async()
+        elapsed = time.perf_counter() - started
+        print(f"{system_message('S')} Sweep finished: {self.completed} ok, {self.failed} failed "
+              f"in {elapsed:.1f}s ({len(jobs) / elapsed if elapsed else 0:.2f} jobs/s)")
+
+async def run_sweep(spec: SweepSpec, output_path: str, concurrency: int = 4, site_interval: float = 5.0,
+                    deadline: float = 180, headless: bool = True, store_path: str = "quote_store"):
+    jobs = expand(spec)
+    valid_jobs = validate(jobs)
+    print(f"{system_message('I')} Sweep expanded to {len(jobs)} jobs, {len(valid_jobs)} valid")
+    rejected = rejected_records(jobs)
+    if rejected:
+        with open(output_path, "a", encoding="utf-8") as output:
+            for record in rejected:
+                output.write(json.dumps(record, default=str) + "\n")
+        print(f"{system_message('E')} {len(rejected)} jobs rejected, reasons written to {output_path}")
+
+    cache = QuoteCache()
+    # Each site starts at one search every site_interval seconds and finds its own pace from there
+    controller = ConcurrencyController(initial=1, max_limit=concurrency, min_interval=site_interval)
+    async with BrowserPool(size=concurrency, headless=headless, network_filter=NetworkFilter(),
+                           sessions=SessionStore(), controller=controller) as pool:
+        orchestrator = default_orchestrator(deadline=deadline, pool=pool, cache=cache, catalog=LocationCatalog())
+        scheduler = SweepScheduler(orchestrator, concurrency=concurrency, site_interval=site_interval,
+                                   controller=controller, store=QuoteStore(store_path) if store_path else None)
+        await scheduler.run(valid_jobs, output_path)
+    print(f"{system_message('I')} Site limits: {controller.stats()}")
+    controller.close()
+    cache.close()
+    default_recorder.write_prometheus(f"{output_path}.prom")
+
+def parse_location(value: str):
+    parts = [part.strip() for part in value.split("/")]
+    if len(parts) != 3 or not all(parts):
+        raise argparse.ArgumentTypeError(f"Invalid location '{value}'. Expected Country/City/Location.")
+    return tuple(parts)
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--start", required=True, help="First pickup date, DD/MM/YYYY")
+    parser.add_argument("--days", type=int, default=90, help="Number of pickup dates")
+    parser.add_argument("--lengths", type=int, nargs="+", default=[7], help="Rental lengths in days")
+    parser.add_argument("--locations", type=parse_location, nargs="+", required=True, help="Country/City/Location, e.g. Greece/Athens/Airport")
+    parser.add_argument("--companies", nargs="+", default=["Hertz"])
+    parser.add_argument("--pickup-time", default="10:00")
+    parser.add_argument("--dropoff-time", default=None)
+    parser.add_argument("--different-drop-off", action="store_true")
+    parser.add_argument("--dropoff-location", default=None, help="Drop-off location, required with --different-drop-off")
+
+def spec_from_args(args) -> SweepSpec:
+    return SweepSpec(
+        start_date=datetime.strptime(args.start, "%d/%m/%Y"),
+        days=args.days,
+        rental_lengths=args.lengths,
+        locations=args.locations,
+        companies=args.companies,
+        pickup_time=args.pickup_time,
+        dropoff_time=args.dropoff_time,
+        different_drop_off=args.different_drop_off,
+        dropoff_location=args.dropoff_location,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep car rental prices over a grid of searches")
+    add_spec_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--site-interval", type=float, default=5.0, help="Seconds between searches on one site")
+    parser.add_argument("--deadline", type=float, default=180, help="Seconds allowed per search")
+    parser.add_argument("--output", default="sweep.jsonl")
+    parser.add_argument("--store", default="quote_store", help="Quote store directory, '' to skip storing")
+    parser.add_argument("--headed", action="store_true", help="Show the browsers")
+    args = parser.parse_args()
+
+    spec = spec_from_args(args)
+    asyncio.run(run_sweep(spec, args.output, concurrency=args.concurrency, site_interval=args.site_interval,
+                          deadline=args.deadline, headless=not args.headed, store_path=args.store))
+
+if __name__ == "__main__":
+    main()
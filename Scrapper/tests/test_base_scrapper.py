@@ -0,0 +1,183 @@
+import asyncio
+import json
+from datetime import datetime
+import pytest
+import timeout
+from playwright.async_api import Error as PlaywrightError
+from base_scrapper import baseScrapper
+from har_archive import HarArchive
+from metrics import MetricsRecorder
+from sinks import CsvSink, NdjsonSink
+from timeout import Timeout
+
+class FakePage:
+    def __init__(self):
+        self.listeners = []
+
+    def on(self, event, listener):
+        self.listeners.append((event, listener))
+
+    def remove_listener(self, event, listener):
+        self.listeners.remove((event, listener))
+
+class FlowScrapper(baseScrapper):
+    company = "Flow"
+
+    def __init__(self, failures: dict, **kwargs):
+        super().__init__("https://example.test", "Greece", "Athens", datetime(2026, 11, 1, 10),
+                         datetime(2026, 11, 3, 10), recorder=MetricsRecorder(), **kwargs)
+        self.failures = dict(failures)  # step name -> failures left
+        self.calls = []
+
+    def step(self, name, result=None):
+        async def run(page):
+            self.calls.append(name)
+            if self.failures.get(name):
+                self.failures[name] -= 1
+                raise PlaywrightError(f"{name} broke")
+            return result
+        return name, run
+
+    def steps(self):
+        return [
+            self.step("Open page"),
+            self.step("Select dropoff datetime"),
+            self.step("Search for results"),
+            self.step("Scrape results", ["car"]),
+        ]
+
+    async def iter_cars(self, page):
+        yield {"name": "car"}
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    monkeypatch.setattr(Timeout, "breakers", {})
+
+def test_restart_resumes_after_the_checkpoint():
+    scrapper = FlowScrapper({"Search for results": 1})
+    result = asyncio.run(scrapper.run_steps(FakePage(), scrapper.steps()))
+    assert result == ["car"]
+    # The form steps before the checkpoint ran once
+    assert scrapper.calls == ["Open page", "Select dropoff datetime", "Search for results",
+                              "Search for results", "Scrape results"]
+
+def test_failure_before_the_checkpoint_restarts_from_the_start():
+    scrapper = FlowScrapper({"Select dropoff datetime": 1})
+    asyncio.run(scrapper.run_steps(FakePage(), scrapper.steps()))
+    assert scrapper.calls == ["Open page", "Select dropoff datetime", "Open page", "Select dropoff datetime",
+                              "Search for results", "Scrape results"]
+
+def test_restarts_are_bounded():
+    scrapper = FlowScrapper({"Search for results": 5}, max_restarts=2)
+    with pytest.raises(PlaywrightError):
+        asyncio.run(scrapper.run_steps(FakePage(), scrapper.steps()))
+    assert scrapper.calls.count("Search for results") == 3
+    assert scrapper.calls.count("Open page") == 1
+
+def test_input_errors_are_not_restarted():
+    scrapper = FlowScrapper({})
+
+    async def bad_input(page):
+        raise ValueError("Unknown location")
+
+    steps = [scrapper.step("Open page"), ("Select pickup/dropoff", bad_input)]
+    with pytest.raises(ValueError):
+        asyncio.run(scrapper.run_steps(FakePage(), steps))
+    assert scrapper.calls == ["Open page"]
+
+def test_traffic_listeners_are_attached_once_per_page():
+    scrapper = FlowScrapper({})
+    page = FakePage()
+    for _ in range(3):
+        asyncio.run(scrapper.run_steps(page, scrapper.steps()))
+    assert len(page.listeners) == 2
+
+    # A new page moves the counter over
+    other = FakePage()
+    asyncio.run(scrapper.run_steps(other, scrapper.steps()))
+    assert page.listeners == [] and len(other.listeners) == 2
+
+class SinkScrapper(FlowScrapper):
+    # Scrape results fails once after writing part of the cars, with the given error
+    def __init__(self, error, **kwargs):
+        super().__init__({}, **kwargs)
+        self.error = error
+        self.attempts = 0
+
+    def steps(self):
+        return [self.step("Open page"), self.step("Select dropoff datetime"),
+                ("Scrape results", self.scrape_results)]
+
+    async def iter_cars(self, page):
+        self.attempts += 1
+        yield {"name": "Fiat Panda", "price_pay_online": "€ 120,50"}
+        yield {"name": "VW Polo", "price_pay_online": "€ 140,00"}
+        if self.attempts == 1:
+            raise self.error
+        yield {"name": "Toyota Yaris", "price_pay_online": "€ 150,00"}
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    async def sleep(delay):
+        pass
+    monkeypatch.setattr(timeout.asyncio, "sleep", sleep)
+
+@pytest.mark.parametrize("error", [asyncio.TimeoutError(), PlaywrightError("page crashed")],
+                         ids=["step retry", "checkpoint restart"])
+def test_retried_scrape_writes_each_car_once(tmp_path, no_sleep, error):
+    path = tmp_path / "cars.ndjson"
+    with NdjsonSink(str(path)) as sink:
+        scrapper = SinkScrapper(error, sink=sink)
+        cars = asyncio.run(scrapper.run_steps(FakePage(), scrapper.steps()))
+
+    assert scrapper.attempts == 2
+    assert [car["name"] for car in cars] == ["Fiat Panda", "VW Polo", "Toyota Yaris"]
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [row["name"] for row in rows] == ["Fiat Panda", "VW Polo", "Toyota Yaris"]
+
+def test_retried_scrape_writes_each_csv_row_once(tmp_path, no_sleep):
+    path = tmp_path / "cars.csv"
+    with CsvSink(str(path)) as sink:
+        scrapper = SinkScrapper(asyncio.TimeoutError(), sink=sink)
+        asyncio.run(scrapper.run_steps(FakePage(), scrapper.steps()))
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "name,price_pay_online"
+    assert [line.split(",")[0] for line in lines[1:]] == ["Fiat Panda", "VW Polo", "Toyota Yaris"]
+
+def test_next_run_writes_its_cars_again(tmp_path):
+    path = tmp_path / "cars.ndjson"
+    with NdjsonSink(str(path)) as sink:
+        scrapper = SinkScrapper(None, sink=sink)
+        scrapper.attempts = 1
+        page = FakePage()
+        for _ in range(2):
+            asyncio.run(scrapper.run_steps(page, scrapper.steps()))
+
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 6
+
+def test_site_hooks_are_abstract():
+    class NoCars(baseScrapper):
+        company = "NoCars"
+
+        def steps(self):
+            return []
+
+    with pytest.raises(TypeError, match="iter_cars"):
+        NoCars("https://example.test", "Greece", "Athens", datetime(2026, 11, 1, 10), datetime(2026, 11, 3, 10))
+
+def test_replays_do_not_share_the_live_breaker(tmp_path):
+    live = FlowScrapper({})
+    recording = FlowScrapper({}, har=HarArchive(str(tmp_path), mode="record"))
+    replays = [FlowScrapper({}, har=HarArchive(str(tmp_path), mode="replay")) for _ in range(2)]
+
+    assert recording.timeout_handler.breaker is live.timeout_handler.breaker
+    assert replays[0].timeout_handler.breaker is not live.timeout_handler.breaker
+    assert replays[0].timeout_handler.breaker is not replays[1].timeout_handler.breaker
+
+    # Broken recordings open their own circuit only
+    for _ in range(5):
+        replays[0].timeout_handler.breaker.record_failure()
+    assert replays[0].timeout_handler.breaker.state == "open"
+    assert live.timeout_handler.breaker.state == "closed"
+    assert replays[1].timeout_handler.breaker.state == "closed"
@@ -0,0 +1,85 @@
+import pytest
+from quote import Quote, from_avis, from_hertz, parse_int, parse_price, to_quotes
+
+@pytest.mark.parametrize("text, expected", [
+    # Greek: dot groups thousands, comma marks decimals
+    ("€1.234,56", (123456, "EUR")),
+    ("1.234,56 €", (123456, "EUR")),
+    ("123,45 €", (12345, "EUR")),
+    ("1.234 €", (123400, "EUR")),
+    ("120,5 ευρώ", (12050, "EUR")),
+    # English: comma groups thousands, dot marks decimals
+    ("$1,234.56", (123456, "USD")),
+    ("1,234.56 EUR", (123456, "EUR")),
+    ("£99.99", (9999, "GBP")),
+    ("1,234 usd", (123400, "USD")),
+    # Spaces and apostrophes as grouping
+    ("1 234,56 €", (123456, "EUR")),
+    ("1'234.50 €", (123450, "EUR")),
+    # No currency falls back to the default
+    ("250", (25000, "EUR")),
+    ("Total: 250.00.", (25000, "EUR")),
+])
+def test_parse_price(text, expected):
+    assert parse_price(text) == expected
+
+def test_parse_price_numbers_and_missing():
+    assert parse_price(99) == (9900, "EUR")
+    assert parse_price(12.345, "USD") == (1234, "USD")
+    assert parse_price(None) == (None, None)
+    assert parse_price("N/A") == (None, None)
+    assert parse_price("€ 10", "USD") == (1000, "EUR")
+
+def test_parse_int():
+    assert parse_int("5 Passengers") == 5
+    assert parse_int(0) == 0
+    assert parse_int(True) is None
+    assert parse_int("Unknown") is None
+    assert parse_int(None) is None
+
+def test_from_hertz():
+    quote = from_hertz({"name": "Fiat Panda", "category": "Mini", "passengers": "4 Passengers",
+                        "suitcases": 2, "price": "€ 120,50"}, "key")
+    assert quote == Quote("Hertz", "Fiat Panda", "Mini", 4, 2, 12050, "EUR", "", "key")
+
+def test_from_hertz_unknowns():
+    quote = from_hertz({"name": "", "passengers": "Unknown", "suitcases": "Unknown"})
+    assert (quote.name, quote.category, quote.passengers, quote.suitcases) == ("Unknown", "Unknown", None, None)
+    assert (quote.price_cents, quote.currency) == (None, None)
+
+def test_from_avis_one_quote_per_payment_type():
+    quotes = from_avis({
+        "name": "VW Polo",
+        "price_pay_online": "€ 140,00",
+        "price_pay_collection": "€ 155,90",
+        "details": ["5 θέσεις", "2 βαλίτσες", "Manual"],
+    }, "key")
+    assert quotes == [
+        Quote("Avis", "VW Polo", "Unknown", 5, 2, 14000, "EUR", "pay_online", "key"),
+        Quote("Avis", "VW Polo", "Unknown", 5, 2, 15590, "EUR", "pay_collection", "key"),
+    ]
+
+def test_from_avis_skips_missing_payment_types():
+    quotes = from_avis({"name": "VW Polo", "price_pay_online": "N/A", "price_pay_collection": "€ 155,90"})
+    assert [(quote.payment_type, quote.price_cents) for quote in quotes] == [("pay_collection", 15590)]
+
+def test_from_avis_single_price_from_captured_vehicle():
+    quotes = from_avis({"name": "Toyota Yaris", "category": "Economy", "passengers": 5, "suitcases": 1,
+                        "price": 150.5, "currency": "EUR"})
+    assert quotes == [Quote("Avis", "Toyota Yaris", "Economy", 5, 1, 15050, "EUR", "", "")]
+
+def test_from_avis_keeps_a_zero_count():
+    # A real 0 must not fall through to the feature list
+    quotes = from_avis({"name": "Smart", "passengers": 2, "suitcases": 0, "price": 80,
+                        "details": ["3 bags"]})
+    assert (quotes[0].passengers, quotes[0].suitcases) == (2, 0)
+
+def test_from_avis_counts_from_details_when_missing():
+    quotes = from_avis({"name": "Smart", "price": 80, "details": ["2 seats", "1 suitcase"]})
+    assert (quotes[0].passengers, quotes[0].suitcases) == (2, 1)
+
+def test_to_quotes_maps_by_company():
+    quotes = to_quotes("Avis", [{"name": "VW Polo", "price_pay_online": "€ 140,00"}], "key")
+    assert [quote.company for quote in quotes] == ["Avis"]
+    quotes = to_quotes("Sixt", [{"name": "Fiat 500", "price": "€ 90"}], "key")
+    assert [(quote.company, quote.price_cents) for quote in quotes] == [("Sixt", 9000)]
@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+import quote_cache
+from quote_cache import QuoteCache
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(quote_cache.time, "time", clock.time)
+    return clock
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = QuoteCache(str(tmp_path / "cache.sqlite3"), ttl=60, max_entries=3)
+    yield cache
+    cache.close()
+
+def test_concurrent_callers_share_one_fetch(cache):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return [{"name": "Fiat Panda"}]
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(result == [{"name": "Fiat Panda"}] for result in results)
+    assert cache.coalesced == 4
+    assert cache.in_flight == {}
+    # Written through, the next caller is served from the cache
+    assert asyncio.run(cache.get_or_fetch("k", fetch)) == [{"name": "Fiat Panda"}]
+    assert len(calls) == 1
+
+def test_one_waiter_cancelling_keeps_the_shared_fetch(cache):
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return [{"name": "Fiat Panda"}]
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        second = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    result, cancelled = asyncio.run(main())
+    assert cancelled
+    assert result == [{"name": "Fiat Panda"}]
+
+def test_last_waiter_cancelling_cancels_the_fetch(cache):
+    state = {}
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        return [{"name": "Fiat Panda"}]
+
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cache.get_or_fetch("k", fetch), timeout=0.05)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert state == {"cancelled": True}
+    assert cache.in_flight == {}
+    assert cache.get("k") is None
+
+def test_empty_results_are_not_cached(cache):
+    async def fetch():
+        return []
+
+    assert asyncio.run(cache.get_or_fetch("k", fetch)) == []
+    assert cache.get("k") is None
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("k", [{"name": "Fiat Panda"}])
+    clock.now += 59
+    assert cache.get("k") == [{"name": "Fiat Panda"}]
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    for key in ("a", "b", "c"):
+        cache.put(key, [key])
+        clock.now += 1
+    # "a" is read, so "b" is now the least recently used
+    assert cache.get("a") == ["a"]
+    clock.now += 1
+    cache.put("d", ["d"])
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == [["a"], ["c"], ["d"]]
+    assert cache.evictions == 1
@@ -0,0 +1,119 @@
+import asyncio
+from datetime import datetime
+import pytest
+from orchestrator import SearchRequest
+from quote_cache import QuoteCache
+from quote_service import HttpError, QuoteService
+
+REQUEST = SearchRequest("Greece", "Athens", datetime(2026, 11, 1, 10), datetime(2026, 11, 4, 10),
+                        pickup_location="Airport")
+
+class FakeOrchestrator:
+    def __init__(self, status="ok", delay=0.0):
+        self.scrapers = {"Hertz": None, "Avis": None}
+        self.status = status
+        self.delay = delay
+        self.searches = []
+
+    async def search(self, request, companies):
+        self.searches.append(companies[0])
+        await asyncio.sleep(self.delay)
+        if self.status != "ok":
+            return [{"company": companies[0], "status": self.status, "results": [], "quotes": [],
+                     "error": "Site down"}]
+        results = [{"name": "Fiat Panda", "price": "100.00", "currency": "EUR"}]
+        return [{"company": companies[0], "status": "ok", "results": results, "quotes": [], "error": None}]
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = QuoteCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+def run(service, *calls):
+    async def main():
+        service.start()
+        try:
+            return [await call() for call in calls]
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+def test_miss_is_looked_up_once_then_served_from_cache(cache):
+    orchestrator = FakeOrchestrator()
+    service = QuoteService(orchestrator, cache)
+    first, second = run(service, lambda: service.quote(REQUEST, ["Hertz"]),
+                        lambda: service.quote(REQUEST, ["Hertz"]))
+
+    assert orchestrator.searches == ["Hertz"]
+    assert first[0]["status"] == "ok" and not first[0]["cached"]
+    assert second[0]["status"] == "ok" and second[0]["cached"]
+    assert second[0]["results"] == first[0]["results"]
+    assert cache.misses == 1 and cache.hits == 1
+    assert service.hits == 1 and service.scrapes == 1
+
+def test_identical_requests_share_one_scrape(cache):
+    orchestrator = FakeOrchestrator(delay=0.05)
+    service = QuoteService(orchestrator, cache)
+
+    async def both():
+        return await asyncio.gather(service.quote(REQUEST, ["Hertz"]), service.quote(REQUEST, ["Hertz"]))
+
+    [(first, second)] = run(service, both)
+    assert orchestrator.searches == ["Hertz"]
+    assert first[0]["results"] == second[0]["results"]
+    assert not first[0]["cached"] and not second[0]["cached"]
+    assert service.coalesced == 1 and service.hits == 0
+
+def test_failed_search_reaches_every_caller_and_is_not_cached(cache):
+    orchestrator = FakeOrchestrator(status="error", delay=0.05)
+    service = QuoteService(orchestrator, cache)
+
+    async def both():
+        return await asyncio.gather(service.quote(REQUEST, ["Hertz"]), service.quote(REQUEST, ["Hertz"]))
+
+    [(first, second)] = run(service, both)
+    for outcomes in (first, second):
+        assert outcomes[0]["status"] == "error"
+        assert outcomes[0]["error"] == "Site down"
+        assert not outcomes[0]["cached"]
+    assert cache.stats()["entries"] == 0
+
+def test_shutdown_answers_503(cache):
+    service = QuoteService(FakeOrchestrator(delay=10), cache)
+
+    async def main():
+        service.start()
+        search = asyncio.create_task(service.route("GET", "/search?country=Greece&city=Athens"
+                                                   "&pickup_location=Airport&pickup_datetime=2026-11-01T10:00"
+                                                   "&dropoff_datetime=2026-11-04T10:00&companies=Hertz", b""))
+        await asyncio.sleep(0.01)
+        await service.stop()
+        with pytest.raises(HttpError) as error:
+            await search
+        assert error.value.status == 503
+        with pytest.raises(HttpError) as error:
+            await service.quote(REQUEST, ["Avis"])
+        assert error.value.status == 503
+
+    asyncio.run(main())
+
+def test_full_queue_rejects_only_what_did_not_fit(cache):
+    service = QuoteService(FakeOrchestrator(), cache, queue_size=1)
+
+    async def main():
+        # No workers yet, the first search fills the queue
+        outcomes = asyncio.create_task(service.quote(REQUEST, ["Hertz", "Avis"]))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HttpError) as error:
+            await service.quote(REQUEST, ["Avis"])
+        assert error.value.status == 429
+        service.start()
+        try:
+            return await outcomes
+        finally:
+            await service.stop()
+
+    hertz, avis = asyncio.run(main())
+    assert hertz["status"] == "ok"
+    assert avis["status"] == "rejected"
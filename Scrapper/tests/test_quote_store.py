@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+from comparison import QuoteFrame, cheapest_per_category
+from quote import Quote
+from quote_cache import search_key
+from quote_store import QuoteStore
+
+def quotes(company, city, pickup, categories):
+    key = search_key(company, "Greece", city, pickup, pickup + timedelta(days=3))
+    return [Quote(company, f"Car {category}", category, 5, 2, 10000 + i, "EUR", "pay_online", key)
+            for i, category in enumerate(categories)]
+
+def store_with_parts(tmp_path):
+    # One part file per flush, each missing some of the others' values
+    store = QuoteStore(str(tmp_path), file_format="qcol")
+    store.append(quotes("Hertz", "Athens", datetime(2026, 11, 1, 10), ["Economy", "Compact"]))
+    store.flush()
+    store.append(quotes("Hertz", "Athens", datetime(2026, 11, 8, 10), ["SUV"]))
+    store.flush()
+    store.append(quotes("Hertz", "Patras", datetime(2026, 12, 1, 10), ["Economy"]))
+    store.flush()
+    store.append(quotes("Avis", "Athens", datetime(2026, 11, 1, 10), ["SUV", "Economy"]))
+    store.flush()
+    assert len(store.files()) == 4
+    return store
+
+def test_scan_with_value_missing_from_some_parts(tmp_path):
+    store = store_with_parts(tmp_path)
+
+    result = store.scan(company="Hertz", category="SUV")
+    assert result["category"].tolist() == ["SUV"]
+    assert result["pickup_day"].tolist() == [date(2026, 11, 8)]
+
+    result = store.scan(location="greece/patras")
+    assert result["company"].tolist() == ["Hertz"]
+    assert result["category"].tolist() == ["Economy"]
+
+def test_scan_with_value_missing_everywhere(tmp_path):
+    store = store_with_parts(tmp_path)
+
+    result = store.scan(company="Hertz", category="Van")
+    assert len(result["company"]) == 0
+    assert result["pickup_day"].dtype == np.dtype("datetime64[D]")
+
+def test_scan_prunes_on_pickup_day(tmp_path):
+    store = store_with_parts(tmp_path)
+
+    result = store.scan(category=["Economy", "SUV"], pickup_from=date(2026, 11, 5), pickup_to=date(2026, 11, 30))
+    assert result["category"].tolist() == ["SUV"]
+
+    result = store.scan(pickup_from=date(2027, 1, 1))
+    assert len(result["company"]) == 0
+
+def test_read_quotes_round_trip(tmp_path):
+    store = store_with_parts(tmp_path)
+
+    read = store.read_quotes(company="Avis")
+    assert sorted((quote.category, quote.price_cents) for quote in read) == [("Economy", 10001), ("SUV", 10000)]
+    assert all(quote.passengers == 5 and quote.currency == "EUR" for quote in read)
+
+def test_frame_from_columns_matches_from_quotes(tmp_path):
+    store = store_with_parts(tmp_path)
+    store.append([Quote("Avis", "Fiat Panda", "", None, None, None, "", "", "not a key")])
+    store.flush()
+
+    from_columns = QuoteFrame.from_columns(store.scan())
+    from_quotes = QuoteFrame.from_quotes(store.read_quotes())
+    assert len(from_columns) == len(from_quotes) == 7
+
+    def rows(frame):
+        labels = frame.vocabulary.labels
+        return sorted((labels[company], labels[name], int(klass), labels[location], labels[payment], int(price),
+                       str(pickup), int(days))
+                      for company, name, klass, location, payment, price, pickup, days in zip(
+                          *(frame[column] for column in ("company", "name", "class", "location", "payment",
+                                                         "price_cents", "pickup_date", "rental_days"))))
+
+    assert rows(from_columns) == rows(from_quotes) == rows(store.frame())
+    assert cheapest_per_category(from_columns) == cheapest_per_category(from_quotes)
+
+def test_scan_codes_share_one_dictionary_across_parts(tmp_path):
+    store = store_with_parts(tmp_path)
+    columns, labels = store.scan_codes(columns=["company", "name", "price_cents"])
+    decoded = store.scan(columns=["company", "name", "price_cents"])
+    assert columns["name"].dtype == np.int32
+    assert len(labels["name"]) == len(set(labels["name"]))
+    for name in ("company", "name"):
+        assert [labels[name][code] for code in columns[name]] == decoded[name].tolist()
+    assert columns["price_cents"].tolist() == decoded["price_cents"].tolist()
+
+def test_frame_from_empty_scan(tmp_path):
+    store = QuoteStore(str(tmp_path), file_format="qcol")
+    frame = QuoteFrame.from_columns(store.scan())
+    assert len(frame) == 0
+    assert len(store.frame()) == 0
+    assert cheapest_per_category(frame) == []
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from safeguards import COMPANY_RULES, DEFAULT_RULES, CompanyRules, SafeGuards, validate_batch
+
+NOW = datetime(2026, 11, 1, 9, 7)
+
+def test_company_rule_tables():
+    assert COMPANY_RULES["Hertz"].minute_step == 15
+    assert COMPANY_RULES["Avis"].minute_step == 30
+    assert DEFAULT_RULES == CompanyRules(minute_step=15, min_lead=timedelta(0), max_rental_days=90)
+
+@pytest.mark.parametrize("company, minute, valid", [
+    ("Hertz", 0, True), ("Hertz", 15, True), ("Hertz", 45, True), ("Hertz", 20, False),
+    ("Avis", 0, True), ("Avis", 30, True), ("Avis", 15, False), ("Avis", 45, False),
+    ("NoName", 45, True), ("NoName", 10, False),
+])
+def test_minute_grid_per_company(company, minute, valid):
+    pickup = datetime(2026, 11, 10, 10, minute)
+    mask, reasons = validate_batch(company, [pickup], [pickup + timedelta(days=2)], NOW)
+    assert mask.tolist() == [valid]
+    if not valid:
+        step = COMPANY_RULES.get(company, DEFAULT_RULES).minute_step
+        assert reasons[0] == (f"Pick-Up: minutes must be a multiple of {step}; "
+                              f"Drop-Off: minutes must be a multiple of {step}")
+
+def test_per_row_masks_and_reasons():
+    pickups = [
+        datetime(2026, 11, 10, 10, 0),     # valid
+        datetime(2026, 11, 1, 9, 0),       # before now
+        datetime(2026, 11, 10, 10, 0),     # dropoff before pickup
+        datetime(2026, 11, 10, 10, 0),     # too long
+        None,                              # missing
+        datetime(2026, 11, 10, 10, 10),    # off the grid, and dropoff before pickup
+    ]
+    dropoffs = [
+        datetime(2026, 11, 12, 10, 0),
+        datetime(2026, 11, 3, 9, 0),
+        datetime(2026, 11, 10, 10, 0),
+        datetime(2027, 3, 1, 10, 0),
+        datetime(2026, 11, 12, 10, 0),
+        datetime(2026, 11, 9, 10, 0),
+    ]
+    mask, reasons = validate_batch("Hertz", pickups, dropoffs, NOW)
+    assert mask.tolist() == [True, False, False, False, False, False]
+    assert reasons.tolist() == [
+        "",
+        "Pick-Up: must not be before 01/11/2026 09:07",
+        "Drop-Off: must be after Pick-Up",
+        "Rental longer than 90 days",
+        "Missing date",
+        "Pick-Up: minutes must be a multiple of 15; Drop-Off: must be after Pick-Up",
+    ]
+
+@pytest.mark.parametrize("pickup, dropoff, reason", [
+    (datetime(2026, 11, 10, 10, 30, 45), datetime(2026, 11, 12, 10, 30), "Pick-Up: seconds must be 0"),
+    (datetime(2026, 11, 10, 10, 30), datetime(2026, 11, 12, 10, 30, 0, 500), "Drop-Off: seconds must be 0"),
+])
+def test_seconds_are_rejected_before_the_minute_cast(pickup, dropoff, reason):
+    for company in ("Hertz", "Avis"):
+        mask, reasons = validate_batch(company, [pickup], [dropoff], NOW)
+        assert mask.tolist() == [False]
+        assert reasons[0] == reason
+
+def test_datetime64_arrays_and_lead_time():
+    rules = CompanyRules(minute_step=30, min_lead=timedelta(hours=2), max_rental_days=7)
+    pickups = np.array(["2026-11-01T10:00", "2026-11-01T11:30"], dtype="datetime64[m]")
+    dropoffs = pickups + np.timedelta64(1, "D")
+    mask, reasons = validate_batch("Avis", pickups, dropoffs, NOW, rules)
+    assert mask.tolist() == [False, True]
+    assert reasons[0] == "Pick-Up: must not be before 01/11/2026 11:07"
+
+def test_shape_mismatch():
+    with pytest.raises(ValueError):
+        validate_batch("Hertz", [NOW, NOW], [NOW], NOW)
+
+def test_single_search_api():
+    pickup = datetime(2026, 11, 10, 10, 15)
+    guards = SafeGuards(["Hertz", "Avis", "NoName"], pickup, pickup + timedelta(days=3))
+    valid, reasons = guards.check(NOW)
+    assert valid.tolist() == [True, False, True]
+    assert reasons[1] == "Pick-Up: minutes must be a multiple of 30; Drop-Off: minutes must be a multiple of 30"
+
+def test_safeguard_reports_and_keeps_valid_companies(capsys):
+    pickup = datetime.now().replace(second=0, microsecond=0) + timedelta(days=5)
+    pickup = pickup.replace(minute=15)
+    guards = SafeGuards(["Hertz", "Avis"], pickup, pickup + timedelta(days=3))
+    assert guards.safeguard() == ["Hertz"]
+    output = capsys.readouterr().out
+    assert "Valid Pick-Up/Drop-Off for Hertz" in output
+    assert "Skipping Avis: Pick-Up: minutes must be a multiple of 30" in output
@@ -0,0 +1,44 @@
+import asyncio
+import io
+import json
+from datetime import datetime
+from concurrency import ConcurrencyController
+from metrics import MetricsRecorder
+from orchestrator import SearchRequest
+from sweep import SweepJob, SweepScheduler
+
+class SlowOrchestrator:
+    # Searches take 0.1 s, remembering when each started
+    def __init__(self):
+        self.started = []
+
+    def supports_dropoffs(self, company, request):
+        return False
+
+    async def search(self, request, companies):
+        self.started.append((companies[0], request.pickup_datetime.day, asyncio.get_running_loop().time()))
+        await asyncio.sleep(0.1)
+        return [{"company": companies[0], "status": "ok", "results": [], "quotes": [], "error": None,
+                 "elapsed": 0.1}]
+
+def job(company: str, day: int) -> SweepJob:
+    return SweepJob(company, SearchRequest("Greece", "Athens", datetime(2026, 11, day, 10),
+                                           datetime(2026, 11, day + 2, 10), pickup_location="Airport"))
+
+def test_site_throttled_jobs_leave_global_slots_to_other_sites():
+    orchestrator = SlowOrchestrator()
+    # One search at a time on each site, two globally
+    controller = ConcurrencyController(recorder=MetricsRecorder(), initial=1, max_limit=1, min_interval=0)
+    scheduler = SweepScheduler(orchestrator, concurrency=2, controller=controller)
+    jobs = [job("Hertz", 1), job("Hertz", 2), job("Hertz", 3), job("Avis", 1)]
+    output = io.StringIO()
+
+    async def main():
+        await asyncio.gather(*(scheduler.run_jobs([each], output) for each in jobs))
+
+    asyncio.run(main())
+    started = {(company, day): at for company, day, at in orchestrator.started}
+    # Avis starts with the first Hertz search instead of after the queued Hertz ones
+    assert started[("Avis", 1)] - started[("Hertz", 1)] < 0.05
+    assert scheduler.completed == 4
+    assert len([json.loads(line) for line in output.getvalue().splitlines()]) == 4
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+import timeout
+from metrics import MetricsRecorder
+from timeout import CircuitBreaker, CircuitOpenError, Timeout
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(timeout.time, "monotonic", clock.monotonic)
+    return clock
+
+@pytest.fixture(autouse=True)
+def breakers(monkeypatch):
+    # Every test starts without the per-site breakers of the others
+    monkeypatch.setattr(Timeout, "breakers", {})
+
+def open_breaker(clock, breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+        clock.now += 1
+
+def test_breaker_opens_after_threshold_failures_in_window(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    # Failures older than the window no longer count
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    open_breaker(clock, breaker)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=60)
+    open_breaker(clock, breaker)
+    clock.now += 60
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=60)
+    open_breaker(clock, breaker)
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=60)
+    open_breaker(clock, breaker)
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 60
+    assert breaker.state == "half-open"
+
+def test_probe_ending_without_verdict_frees_the_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_after=60)
+    open_breaker(clock, breaker)
+    clock.now += 60
+    assert breaker.allow()
+    breaker.end_probe()
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+
+def test_backoff_is_full_jitter_capped(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(timeout.random, "uniform", lambda low, high: bounds.append((low, high)) or high)
+    handler = Timeout(base_delay=0.5, max_delay=4.0, recorder=MetricsRecorder())
+    delays = [handler.backoff(attempt) for attempt in range(1, 6)]
+    assert bounds == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 4.0), (0, 4.0)]
+    assert delays == [0.5, 1.0, 2.0, 4.0, 4.0]
+
+def test_retry_step_retries_timeouts_then_opens_the_circuit(clock, monkeypatch):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(timeout.asyncio, "sleep", sleep)
+    recorder = MetricsRecorder()
+    handler = Timeout(site="Site", failure_threshold=2, reset_after=60, recorder=recorder)
+    calls = []
+
+    async def step():
+        calls.append(1)
+        raise asyncio.TimeoutError()
+
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(handler.retry_step("Step", step, retries=1))
+    # One retry per call, each after a backoff sleep
+    assert len(calls) == 4 and len(sleeps) == 2
+    assert handler.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(handler.retry_step("Step", step))
+    assert len(calls) == 4
+    assert recorder.events[-1].outcome == "circuit_open"
+
+def test_half_open_probe_in_retry_step(clock):
+    handler = Timeout(site="Site", failure_threshold=1, reset_after=60, recorder=MetricsRecorder())
+    handler.breaker.record_failure()
+    clock.now += 60
+
+    async def probe_and_second_caller():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_step():
+            started.set()
+            await release.wait()
+            return "ok"
+
+        probe = asyncio.ensure_future(handler.retry_step("Step", slow_step))
+        await started.wait()
+        # A second caller is refused while the probe runs
+        with pytest.raises(CircuitOpenError):
+            await handler.retry_step("Step", slow_step)
+        release.set()
+        return await probe
+
+    assert asyncio.run(probe_and_second_caller()) == "ok"
+    assert handler.breaker.state == "closed"
+
+def test_non_site_errors_do_not_count(clock):
+    handler = Timeout(site="Site", failure_threshold=1, recorder=MetricsRecorder())
+
+    async def step():
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        asyncio.run(handler.retry_step("Step", step))
+    assert handler.breaker.state == "closed"
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import datetime
+import pytest
+import workers
+from orchestrator import SearchRequest
+from sweep import SweepJob
+from workers import JobQueue, Worker
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(workers.time, "time", clock.time)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease=60, max_attempts=2)
+    yield queue
+    queue.close()
+
+def job(day: int = 1) -> SweepJob:
+    return SweepJob("Hertz", SearchRequest("Greece", "Athens", datetime(2026, 11, day, 10),
+                                           datetime(2026, 11, day + 2, 10), pickup_location="Athens Airport"))
+
+def exported(queue, tmp_path) -> list:
+    path = tmp_path / "export.jsonl"
+    queue.export(str(path))
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+def test_expired_lease_is_handed_to_another_worker(queue, clock):
+    queue.enqueue([job()])
+    [(job_id, _)] = queue.lease_jobs("a")
+    assert queue.lease_jobs("b") == []
+
+    clock.now += 61
+    [(retried_id, retried)] = queue.lease_jobs("b")
+    assert retried_id == job_id and retried.request.city == "Athens"
+    assert queue.stats()["leased"] == 1
+
+    # The first worker lost the job, its late result is ignored
+    queue.complete("a", job_id, {"status": "ok", "error": None})
+    assert queue.stats()["leased"] == 1
+
+def test_lease_expiring_too_often_fails_with_a_result_row(queue, clock, tmp_path):
+    queue.enqueue([job()])
+    for worker in ("a", "b"):
+        assert len(queue.lease_jobs(worker)) == 1
+        clock.now += 61
+
+    assert queue.lease_jobs("c") == []
+    assert queue.stats() == {"pending": 0, "leased": 0, "done": 0, "failed": 1}
+    [record] = exported(queue, tmp_path)
+    assert record["company"] == "Hertz" and record["pickup_datetime"] == "2026-11-01T10:00:00"
+    assert (record["status"], record["error"], record["results"]) == ("error", "Lease expired too often", [])
+
+def test_failed_attempts_are_retried_until_max_attempts(queue, tmp_path):
+    queue.enqueue([job()])
+    [(job_id, _)] = queue.lease_jobs("a")
+    queue.complete("a", job_id, {"status": "timeout", "error": "slow"})
+    assert queue.stats()["pending"] == 1
+    assert exported(queue, tmp_path) == []
+
+    [(job_id, _)] = queue.lease_jobs("a")
+    queue.complete("a", job_id, {"status": "timeout", "error": "slow"})
+    assert queue.stats()["failed"] == 1
+    assert exported(queue, tmp_path) == [{"status": "timeout", "error": "slow"}]
+
+class EmptyOrchestrator:
+    async def search(self, request, companies):
+        return []
+
+def test_empty_search_result_completes_the_job(tmp_path):
+    worker = Worker("w", str(tmp_path / "jobs.sqlite3"), site_interval=0)
+    worker.queue.max_attempts = 1
+    try:
+        worker.queue.enqueue([job()])
+        [(job_id, leased)] = worker.queue.lease_jobs(worker.name)
+        asyncio.run(worker.run_job(EmptyOrchestrator(), job_id, leased))
+
+        assert worker.queue.stats()["failed"] == 1
+        [record] = exported(worker.queue, tmp_path)
+        assert (record["status"], record["error"]) == ("error", "No outcome for Hertz")
+    finally:
+        worker.controller.close()
+        worker.queue.close()
@@ -1,24 +1,126 @@
+import asyncio
+import random
+import time
+from collections import deque
+from metrics import MetricsRecorder, TimingEvent, default_recorder
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+TIMEOUT_ERRORS = (PlaywrightTimeoutError, asyncio.TimeoutError)
+
+# Errors that say something about the site's health (as opposed to bad input)
+SITE_ERRORS = (PlaywrightError, asyncio.TimeoutError)
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 60):
+        # Opens after failure_threshold failures within reset_after seconds
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failure_times = deque()
+        self.opened_at = None
+        self.probing = False  # A half-open probe is running
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        # Half-open lets a single probe through, its outcome closes or re-opens the circuit
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open" or self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def end_probe(self):
+        # The probe ended without saying anything about the site (bad input, cancelled)
+        self.probing = False
+
+    def record_success(self):
+        self.probing = False
+        if self.state == "half-open":
+            self.failure_times.clear()
+            self.opened_at = None
+
+    def record_failure(self):
+        self.probing = False
+        now = time.monotonic()
+        self.failure_times.append(now)
+        while self.failure_times and now - self.failure_times[0] > self.reset_after:
+            self.failure_times.popleft()
+        if self.state == "half-open" or len(self.failure_times) >= self.failure_threshold:
+            self.opened_at = now
 
 class Timeout:
-    def __init__(self):
-        pass
-    
+    # One breaker per site, shared by every scraper of that site
+    breakers = {}
+
+    def __init__(self, site: str = None, base_delay: float = 0.5, max_delay: float = 8.0,
+                 failure_threshold: int = 5, reset_after: float = 60, recorder: MetricsRecorder = None,
+                 breakers: dict = None):
+        self.site = site
+        self.recorder = recorder or default_recorder
+        self.traffic = None  # PageTraffic of the page the steps run on, if any
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # The shared per-site breakers unless a dict of its own is given
+        self.breakers = Timeout.breakers if breakers is None else breakers
+        if site is not None and site not in self.breakers:
+            self.breakers[site] = CircuitBreaker(failure_threshold, reset_after)
+
+    @property
+    def breaker(self):
+        return self.breakers.get(self.site)
+
+    def backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
     async def retry_step(self, step_name: str, func, *args, retries: int = 1, **kwargs):
+            breaker = self.breaker
+            probe = breaker is not None and breaker.state == "half-open"
+            if breaker is not None and not breaker.allow():
+                self.recorder.record(TimingEvent("step", step_name, self.site, 0.0, "circuit_open"))
+                raise CircuitOpenError(f"{self.site} is failing, circuit open for {step_name}")
+            try:
+                return await self._attempt(step_name, func, args, kwargs, retries, breaker)
+            finally:
+                if probe:
+                    breaker.end_probe()
+
+    async def _attempt(self, step_name: str, func, args, kwargs, retries: int, breaker: CircuitBreaker):
             attempt = 0
             while True:
                 try:
                     attempt += 1
                     print(f"➡️  Step: {step_name} (attempt {attempt})")
-                    return await func(*args, **kwargs)
+                    async with self.recorder.time("step", step_name, self.site, attempt, self.traffic):
+                        result = await func(*args, **kwargs)
+                    if breaker is not None:
+                        breaker.record_success()
+                    return result
+                except TIMEOUT_ERRORS as e:
+                    if attempt <= retries:
+                        delay = self.backoff(attempt)
+                        print(f"⚠️  Timeout in {step_name}, retrying in {delay:.2f}s (attempt {attempt}/{retries+1})...")
+                        await asyncio.sleep(delay)
+                        continue
+                    print(f"❌ Failed {step_name} after {attempt} attempts: {e}")
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise
                 except Exception as e:
-                    if "TimeoutError" in str(type(e)) or "Timeout" in str(e):
-                        if attempt <= retries:
-                            print(f"⚠️  Timeout in {step_name}, retrying (attempt {attempt}/{retries+1})...")
-                            continue
-                        else:
-                            print(f"❌ Failed {step_name} after {attempt} attempts: {e}")
-                            raise
-                    else:
-                        # other error, don't retry
-                        print(f"❌ Error in {step_name}: {e}")
-                        raise
\ No newline at end of file
+                    # other error, don't retry
+                    print(f"❌ Error in {step_name}: {e}")
+                    if breaker is not None and isinstance(e, SITE_ERRORS):
+                        breaker.record_failure()
+                    raise
@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import time
+from dataclasses import asdict
+from datetime import datetime
+from browser_pool import BrowserPool
+from concurrency import ConcurrencyController
+from location_catalog import LocationCatalog
+from metrics import default_recorder
+from network_filter import NetworkFilter
+from orchestrator import SearchRequest, default_orchestrator, request_key
+from quote_cache import QuoteCache
+from session_store import SessionStore
+from sweep import SweepJob, add_spec_arguments, expand, job_record, rejected_records, spec_from_args, validate
+from sys_msg import system_message
+
+def request_to_dict(request: SearchRequest) -> dict:
+    data = asdict(request)
+    data["pickup_datetime"] = request.pickup_datetime.isoformat()
+    data["dropoff_datetime"] = request.dropoff_datetime.isoformat()
+    return data
+
+def request_from_dict(data: dict) -> SearchRequest:
+    data = dict(data)
+    data["pickup_datetime"] = datetime.fromisoformat(data["pickup_datetime"])
+    data["dropoff_datetime"] = datetime.fromisoformat(data["dropoff_datetime"])
+    return SearchRequest(**data)
+
+class JobQueue:
+    # Durable job queue and result store shared by the worker processes through one SQLite file
+    def __init__(self, path: str = "jobs.sqlite3", lease: float = 300, max_attempts: int = 3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Every process opens its own connection, WAL lets readers run next to the writer
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                company TEXT NOT NULL,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                lease_until REAL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+            CREATE TABLE IF NOT EXISTS results (
+                job_id INTEGER PRIMARY KEY REFERENCES jobs (id),
+                record TEXT NOT NULL,
+                finished_at REAL NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def enqueue(self, jobs: list) -> int:
+        # Searches already in the queue are not added twice
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        added = 0
+        for job in jobs:
+            added += self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (key, company, request, updated_at) VALUES (?, ?, ?, ?)",
+                (request_key(job.company, job.request), job.company,
+                 json.dumps(request_to_dict(job.request)), now),
+            ).rowcount
+        self.connection.execute("COMMIT")
+        return added
+
+    def lease_jobs(self, worker: str, count: int = 1) -> list:
+        # Hand out pending jobs and jobs whose worker died (expired lease) to this worker
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose workers kept dying fail, with a result row so the export still lists them
+            expired = self.connection.execute("""
+                SELECT id, company, request FROM jobs
+                WHERE status = 'leased' AND lease_until < ? AND attempts >= ?
+            """, (now, self.max_attempts)).fetchall()
+            for job_id, company, request in expired:
+                job = SweepJob(company, request_from_dict(json.loads(request)))
+                record = job_record(job, {"status": "error", "error": "Lease expired too often", "elapsed": 0.0,
+                                          "results": []})
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                    (record["error"], now, job_id),
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO results (job_id, record, finished_at) VALUES (?, ?, ?)",
+                    (job_id, json.dumps(record, default=str), now),
+                )
+            rows = self.connection.execute("""
+                SELECT id, company, request, status FROM jobs
+                WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?)
+                ORDER BY attempts, id LIMIT ?
+            """, (now, count)).fetchall()
+            for job_id, _, _, status in rows:
+                if status == "leased":
+                    print(f"{system_message('I')} Retrying orphaned job {job_id}")
+                self.connection.execute("""
+                    UPDATE jobs SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1,
+                                    updated_at = ?
+                    WHERE id = ?
+                """, (worker, now + self.lease, now, job_id))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return [(job_id, SweepJob(company, request_from_dict(json.loads(request))))
+                for job_id, company, request, _ in rows]
+
+    def heartbeat(self, worker: str, job_ids: list):
+        # Extend the leases of jobs still running
+        if not job_ids:
+            return
+        now = time.time()
+        self.connection.executemany(
+            "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            [(now + self.lease, now, job_id, worker) for job_id in job_ids],
+        )
+
+    def complete(self, worker: str, job_id: int, record: dict):
+        # Store the result, failed searches go back to the queue until max_attempts
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        row = self.connection.execute("SELECT attempts, worker FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[1] != worker:
+            # The lease expired and another worker took the job over
+            self.connection.execute("COMMIT")
+            return
+        if record["status"] == "ok":
+            status = "done"
+        elif row[0] < self.max_attempts:
+            status = "pending"
+        else:
+            status = "failed"
+        self.connection.execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+            (status, record["error"], now, job_id),
+        )
+        if status != "pending":
+            self.connection.execute(
+                "INSERT OR REPLACE INTO results (job_id, record, finished_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(record, default=str), now),
+            )
+        self.connection.execute("COMMIT")
+
+    def release(self, worker: str, job_ids: list):
+        # Give unfinished jobs back on shutdown without counting the attempt
+        now = time.time()
+        self.connection.executemany("""
+            UPDATE jobs SET status = 'pending', attempts = MAX(attempts - 1, 0), worker = NULL,
+                            lease_until = NULL, updated_at = ?
+            WHERE id = ? AND worker = ? AND status = 'leased'
+        """, [(now, job_id, worker) for job_id in job_ids])
+
+    def remaining(self) -> int:
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def stats(self) -> dict:
+        counts = dict(self.connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("pending", "leased", "done", "failed")}
+
+    def export(self, output_path: str) -> int:
+        with open(output_path, "w", encoding="utf-8") as output:
+            count = 0
+            for (record,) in self.connection.execute("SELECT record FROM results ORDER BY finished_at"):
+                output.write(record + "\n")
+                count += 1
+        return count
+
+class Worker:
+    def __init__(self, name: str, queue_path: str, concurrency: int = 2, site_interval: float = 5.0,
+                 deadline: float = 180, headless: bool = True, lease: float = 300, poll_interval: float = 2.0,
+                 grace_period: float = 30):
+        self.name = name
+        self.queue = JobQueue(queue_path, lease=lease)
+        self.concurrency = concurrency
+        self.site_interval = site_interval
+        self.deadline = deadline
+        self.headless = headless
+        self.poll_interval = poll_interval
+        self.grace_period = grace_period
+        self.controller = ConcurrencyController(initial=1, max_limit=concurrency, min_interval=site_interval)
+        self.running = {}  # job id -> task
+        self.stopping = None
+
+    def stop(self):
+        if not self.stopping.is_set():
+            print(f"{system_message('I')} {self.name}: stopping after the running jobs")
+            self.stopping.set()
+
+    async def run_job(self, orchestrator, job_id: int, job: SweepJob):
+        async with self.controller.permit(job.company):
+            outcomes = await orchestrator.search(job.request, [job.company])
+        if not outcomes:
+            # Completed as a failed attempt, the job would otherwise stay leased until its lease expires
+            outcomes = [{"status": "error", "error": f"No outcome for {job.company}", "elapsed": 0.0,
+                         "results": []}]
+        for outcome in outcomes:
+            self.queue.complete(self.name, job_id, job_record(job, outcome))
+
+    async def keep_leases(self):
+        while True:
+            await asyncio.sleep(self.queue.lease / 3)
+            self.queue.heartbeat(self.name, list(self.running))
+
+    async def run(self):
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+
+        cache = QuoteCache()
+        heartbeat = asyncio.create_task(self.keep_leases())
+        async with BrowserPool(size=self.concurrency, headless=self.headless, network_filter=NetworkFilter(),
+                               sessions=SessionStore(), controller=self.controller) as pool:
+            orchestrator = default_orchestrator(deadline=self.deadline, pool=pool, cache=cache,
+                                                catalog=LocationCatalog())
+            while not self.stopping.is_set():
+                free = self.concurrency - len(self.running)
+                leased = self.queue.lease_jobs(self.name, free) if free > 0 else []
+                for job_id, job in leased:
+                    task = asyncio.create_task(self.run_job(orchestrator, job_id, job))
+                    task.add_done_callback(lambda _, job_id=job_id: self.running.pop(job_id, None))
+                    self.running[job_id] = task
+
+                if not self.running and not leased and self.queue.remaining() == 0:
+                    print(f"{system_message('S')} {self.name}: queue drained")
+                    break
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            # Graceful shutdown, let running jobs finish and give the rest back
+            if self.running:
+                done, pending = await asyncio.wait(list(self.running.values()), timeout=self.grace_period)
+                unfinished = [job_id for job_id, task in self.running.items() if task in pending]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                self.queue.release(self.name, unfinished)
+                if unfinished:
+                    print(f"{system_message('I')} {self.name}: released {len(unfinished)} unfinished jobs")
+
+        heartbeat.cancel()
+        cache.close()
+        self.controller.close()
+        self.queue.close()
+        default_recorder.write_prometheus(f"metrics-{self.name}.prom")
+
+def worker_main(index: int, queue_path: str, options: dict):
+    # Entry point of a worker process: own event loop, own browser pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Until the loop installs its handlers
+    worker = Worker(f"worker-{index}-{os.getpid()}", queue_path, **options)
+    asyncio.run(worker.run())
+
+def run_workers(queue_path: str, processes: int, **options):
+    # Spawn (not fork) so every worker starts with a clean Playwright and event loop
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=worker_main, args=(index, queue_path, options), name=f"worker-{index}")
+               for index in range(processes)]
+    started = time.perf_counter()
+    for process in workers:
+        process.start()
+    print(f"{system_message('S')} Started {processes} workers on {queue_path}")
+
+    try:
+        for process in workers:
+            process.join()
+    except KeyboardInterrupt:
+        # Ask every worker to finish its running jobs, then stop
+        for process in workers:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        deadline = time.monotonic() + options.get("grace_period", 30) + 30
+        for process in workers:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+
+    queue = JobQueue(queue_path)
+    print(f"{system_message('S')} Workers finished in {time.perf_counter() - started:.1f}s: {queue.stats()}")
+    queue.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run sweep jobs on several worker processes")
+    parser.add_argument("--queue", default="jobs.sqlite3", help="SQLite job queue and result store")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="Add the jobs of a sweep to the queue")
+    add_spec_arguments(enqueue_parser)
+
+    run_parser = commands.add_parser("run", help="Work through the queue")
+    run_parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    run_parser.add_argument("--concurrency", type=int, default=2, help="Browsers per process")
+    run_parser.add_argument("--site-interval", type=float, default=5.0,
+                            help="Seconds between searches on one site, across all processes")
+    run_parser.add_argument("--deadline", type=float, default=180, help="Seconds allowed per search")
+    run_parser.add_argument("--lease", type=float, default=300, help="Seconds before a silent worker's job is retried")
+    run_parser.add_argument("--headed", action="store_true", help="Show the browsers")
+
+    commands.add_parser("stats", help="Print job counts")
+
+    export_parser = commands.add_parser("export", help="Write finished jobs as JSON lines")
+    export_parser.add_argument("--output", default="sweep.jsonl")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        all_jobs = expand(spec_from_args(args))
+        jobs = validate(all_jobs)
+        for record in rejected_records(all_jobs):
+            print(f"{system_message('E')} Rejected {record['company']} {record['pickup_datetime']} -> "
+                  f"{record['dropoff_datetime']}: {record['error']}")
+        queue = JobQueue(args.queue)
+        print(f"{system_message('I')} Queued {queue.enqueue(jobs)} new jobs")
+    elif args.command == "run":
+        # Every process spaces its searches so the whole fleet keeps the per-site interval
+        run_workers(args.queue, args.processes, concurrency=args.concurrency,
+                    site_interval=args.site_interval * args.processes, deadline=args.deadline,
+                    headless=not args.headed, lease=args.lease)
+        return
+    elif args.command == "stats":
+        queue = JobQueue(args.queue)
+        print(queue.stats())
+    else:
+        queue = JobQueue(args.queue)
+        print(f"{system_message('I')} Exported {queue.export(args.output)} results to {args.output}")
+    queue.close()
+
+if __name__ == "__main__":
+    main()